@@ -0,0 +1,6 @@
+"""Замеры производительности блога на синтетических данных.
+
+Сценарии (benchmarks.scenarios) запускает команда `manage.py benchmark`.
+Пакет лежит вне приложения blog: он нужен только для замеров и
+использует тестовые инструменты Django.
+"""
@@ -0,0 +1,794 @@
+"""Сценарии для команды `manage.py benchmark`.
+
+Каждый сценарий создаёт синтетические данные и возвращает строки отчёта.
+Команда выполняет сценарий внутри транзакции и откатывает её, так что
+рабочая база не меняется.
+"""
+import asyncio
+import importlib
+import json
+import os
+import random
+import re
+import resource
+import shutil
+import statistics
+import tempfile
+import time
+import tracemalloc
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import timedelta
+from functools import partial
+from io import BytesIO
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib import admin as django_admin
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.handlers.wsgi import WSGIRequest
+from django.core.management import call_command
+from django.core.paginator import Paginator
+from django.core.signals import request_finished, request_started
+from django.db import (DEFAULT_DB_ALIAS, OperationalError, connection,
+                       connections)
+from django.db.models import Count, F
+from django.template.loader import render_to_string
+from django.test import AsyncClient, RequestFactory, override_settings
+from django.test.client import BOUNDARY, MULTIPART_CONTENT, encode_multipart
+from django.urls import clear_url_caches
+from django.utils import timezone
+from PIL import Image
+
+import blog.urls
+import blogicum.urls
+from blog.async_views import ASYNC_VIEWS
+from blog.models import Category, Comment, Post
+from blog.pagination import CursorPaginator, EstimatedCountPaginator
+from blog.search.analyzers import Analyzer
+from blog.search.backends import DatabaseSearchBackend, SQLiteSearchBackend
+from blog.service import get_objects, paginate_comments
+from blog.transfer import Importer
+from blogicum import settings_production
+from constants import PAGINATE_COUNT
+
+BATCH_SIZE = 5000
+
+SCENARIOS = {}
+
+
+def scenario(name, default_size):
+    """Зарегистрировать сценарий под именем name."""
+    def decorator(func):
+        func.default_size = default_size
+        SCENARIOS[name] = func
+        return func
+    return decorator
+
+
+def measure(func, repeat):
+    """Медианное время выполнения func в миллисекундах."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def peak_memory(func):
+    """Пиковый объём памяти, выделенной при выполнении func, в МБ."""
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1] / 2**20
+    finally:
+        tracemalloc.stop()
+
+
+def make_posts(size):
+    """Создать size опубликованных постов одного автора и категории."""
+    author = User.objects.create(username='benchmark_author')
+    category = Category.objects.create(
+        title='Benchmark', description='Benchmark', slug='benchmark')
+    now = timezone.now()
+    for start in range(0, size, BATCH_SIZE):
+        Post.objects.bulk_create(
+            Post(
+                title=f'Пост {number}',
+                text=f'Текст поста {number}',
+                pub_date=now - timedelta(minutes=number),
+                author=author,
+                category=category,
+            )
+            for number in range(start, min(start + BATCH_SIZE, size))
+        )
+    return author, category
+
+
+@scenario('cursor', default_size=100_000)
+def cursor_pagination(size, repeat):
+    """Первая и последняя страницы ленты: OFFSET против курсора."""
+    make_posts(size)
+    last_page = size // PAGINATE_COUNT
+    feed = get_objects(feed=True)
+    boundary = feed.order_by('-pub_date', '-id')[
+        (last_page - 1) * PAGINATE_COUNT - 1]
+    cursors = {
+        1: None,
+        last_page: CursorPaginator(feed, PAGINATE_COUNT).encode_cursor(
+            'next', boundary),
+    }
+    for number, cursor in cursors.items():
+        offset_ms = measure(
+            lambda: list(Paginator(feed, PAGINATE_COUNT).page(number)),
+            repeat)
+        cursor_ms = measure(
+            lambda: list(CursorPaginator(feed, PAGINATE_COUNT).get_page(
+                cursor)),
+            repeat)
+        yield (f'страница {number}: offset {offset_ms:.2f} мс, '
+               f'курсор {cursor_ms:.2f} мс')
+
+
+@scenario('comment_count', default_size=1_000_000)
+def comment_count(size, repeat):
+    """Первая страница ленты: COUNT(comments) против поля comment_count."""
+    author, _ = make_posts(max(size // 100, PAGINATE_COUNT))
+    post_ids = list(Post.objects.values_list('id', flat=True))
+    for start in range(0, size, BATCH_SIZE):
+        Comment.objects.bulk_create(
+            Comment(text='Комментарий', author=author,
+                    post_id=post_ids[number % len(post_ids)])
+            for number in range(start, min(start + BATCH_SIZE, size))
+        )
+    feed = get_objects(feed=True)
+    annotated = feed.defer('comment_count').annotate(
+        comments_total=Count('comments'))
+    annotate_ms = measure(lambda: list(annotated[:PAGINATE_COUNT]), repeat)
+    column_ms = measure(lambda: list(feed[:PAGINATE_COUNT]), repeat)
+    yield f'annotate(Count): {annotate_ms:.2f} мс'
+    yield f'поле comment_count: {column_ms:.2f} мс'
+
+
+@scenario('post_cards', default_size=PAGINATE_COUNT)
+def post_cards(size, repeat):
+    """Отрисовка страницы ленты без кеша карточек и с прогретым кешем."""
+    make_posts(size)
+    request = RequestFactory().get('/')
+    request.user = AnonymousUser()
+    page = Paginator(get_objects(feed=True), size).page(1)
+    list(page)
+
+    def render():
+        render_to_string('blog/index.html', {'page_obj': page}, request)
+
+    with override_settings(BLOG_POST_CARD_TIMEOUT=0):
+        uncached_ms = measure(render, repeat)
+    render()
+    cached_ms = measure(render, repeat)
+    yield f'без кеша карточек: {uncached_ms:.2f} мс на страницу'
+    yield f'с кешем карточек: {cached_ms:.2f} мс на страницу'
+
+
+@scenario('comments', default_size=100_000)
+def comments(size, repeat):
+    """Комментарии поста (10, 10 000, size): все сразу против страницы."""
+    author, category = make_posts(1)
+    request = RequestFactory().get('/')
+    request.user = AnonymousUser()
+    counts = sorted({count for count in (10, 10_000, size) if count <= size})
+    for count in counts:
+        post = Post.objects.create(
+            title=f'Пост с {count} комментариями', text='Текст',
+            pub_date=timezone.now(), author=author, category=category)
+        for start in range(0, count, BATCH_SIZE):
+            Comment.objects.bulk_create(
+                Comment(text=f'Комментарий {number}', author=author,
+                        post=post)
+                for number in range(start, min(start + BATCH_SIZE, count))
+            )
+
+        def render(comments):
+            render_to_string('includes/comments.html',
+                             {'post': post, 'comments': comments}, request)
+
+        def render_all():
+            render(post.comments.select_related('author'))
+
+        def render_page():
+            render(paginate_comments(post))
+
+        for label, func in (('все', render_all), ('страница', render_page)):
+            elapsed_ms = measure(func, repeat)
+            peak_mb = peak_memory(func)
+            yield (f'{count} комментариев, {label}: {elapsed_ms:.2f} мс, '
+                   f'пик памяти {peak_mb:.1f} МБ')
+
+
+def peak_rss_mb():
+    """Пиковый RSS процесса в МБ (ru_maxrss в Linux — в килобайтах)."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def upload_request(body_path):
+    """POST-запрос с телом из файла: тело читается потоком, как с сокета."""
+    return WSGIRequest({
+        'REQUEST_METHOD': 'POST',
+        'PATH_INFO': '/posts/create/',
+        'SERVER_NAME': 'testserver',
+        'SERVER_PORT': '80',
+        'wsgi.url_scheme': 'http',
+        'CONTENT_TYPE': MULTIPART_CONTENT,
+        'CONTENT_LENGTH': str(os.path.getsize(body_path)),
+        'wsgi.input': open(body_path, 'rb'),
+    })
+
+
+@scenario('uploads', default_size=50)
+def uploads(size, repeat):
+    """Одновременные загрузки (size) изображения 20 МБ: пиковый RSS."""
+    side = 2600
+    buffer = BytesIO()
+    Image.frombytes('RGB', (side, side), os.urandom(side * side * 3)).save(
+        buffer, 'PNG', compress_level=0)
+    body = encode_multipart(BOUNDARY, {
+        'image': SimpleUploadedFile('big.png', buffer.getvalue())})
+    del buffer
+    with tempfile.NamedTemporaryFile(suffix='.multipart') as body_file:
+        body_file.write(body)
+        body_file.flush()
+        yield f'размер тела запроса: {len(body) / 2**20:.1f} МБ'
+        del body
+
+        def upload():
+            request = upload_request(body_file.name)
+            try:
+                image = request.FILES['image']
+                image.close()
+            finally:
+                request.environ['wsgi.input'].close()
+
+        # ru_maxrss только растёт, поэтому потоковый вариант идёт первым.
+        for label, handlers in (
+                ('потоком во временный файл',
+                 ['blog.uploads.ImageUploadHandler']),
+                ('в памяти', [
+                    'django.core.files.uploadhandler.MemoryFileUploadHandler'
+                ]),
+        ):
+            with override_settings(FILE_UPLOAD_HANDLERS=handlers,
+                                   FILE_UPLOAD_MAX_MEMORY_SIZE=2**31):
+                before = peak_rss_mb()
+                start = time.perf_counter()
+                for _ in range(repeat):
+                    with ThreadPoolExecutor(size) as pool:
+                        for future in [pool.submit(upload)
+                                       for _ in range(size)]:
+                            future.result()
+                elapsed = (time.perf_counter() - start) / repeat
+                yield (f'{label}: {elapsed:.2f} с на {size} загрузок, '
+                       f'рост пикового RSS {peak_rss_mb() - before:.0f} МБ')
+
+
+@scenario('search', default_size=1_000_000)
+def search(size, repeat):
+    """Первая страница поиска: FTS5 против LIKE."""
+    make_posts(size)
+    fts = SQLiteSearchBackend()
+    start = time.perf_counter()
+    fts.rebuild()
+    yield f'построение индекса: {time.perf_counter() - start:.1f} с'
+    feed = get_objects(feed=True)
+    queries = {
+        'редкое слово': str(size // 2),
+        'слово во всех постах': 'поста',
+    }
+    for label, query in queries.items():
+        for name, backend in (('FTS5', fts),
+                              ('LIKE', DatabaseSearchBackend())):
+            results = backend.search_posts(feed, query)
+            elapsed_ms = measure(
+                lambda: list(results[:PAGINATE_COUNT]), repeat)
+            yield f'{label}, {name}: {elapsed_ms:.2f} мс'
+
+
+CORPUS_PATH = settings.BASE_DIR.parent / 'db.json'
+# Запросы к корпусу db.json и формы слова, по которым пост считается
+# релевантным: запрос не всегда совпадает с формой в тексте.
+RELEVANT_FORMS = {
+    'школа': {'школы', 'школ', 'школу', 'школе'},
+    'губернатор': {'губернатор', 'губернатора', 'губернатору',
+                   'губернатором'},
+    'Колышкин': {'колышкин', 'колышкина', 'колышкину', 'колышкиным'},
+    'искусство': {'искусство', 'искусства', 'искусстве'},
+    'Биарриц': {'биарриц', 'биаррица', 'биаррице'},
+    'редакция': {'редакция', 'редакции'},
+    'художники': {'художник', 'художника', 'художником'},
+    'купцы': {'купец', 'купца', 'купцу', 'купцов'},
+    'обед': {'обед', 'обеда', 'обеде', 'обедом'},
+    'спокойствия': {'спокойствие'},
+    'город': {'город', 'города', 'городу', 'городе'},
+}
+
+
+class PlainSearchBackend(SQLiteSearchBackend):
+    """Тот же индекс FTS5 без стемминга и стоп-слов, в своих таблицах."""
+
+    analyzer = Analyzer()
+    POST_TABLE = 'benchmark_post_search'
+    COMMENT_TABLE = 'benchmark_comment_search'
+    COLUMNS = {POST_TABLE: ('title', 'text'), COMMENT_TABLE: ('text',)}
+
+    def create_tables(self):
+        for table, columns in self.COLUMNS.items():
+            self.execute(
+                f'CREATE VIRTUAL TABLE {table} USING fts5('
+                f'{", ".join(columns)}, '
+                "tokenize = 'unicode61 remove_diacritics 2')")
+            self.execute(
+                f"CREATE VIRTUAL TABLE {table}_vocab "
+                f"USING fts5vocab({table}, 'row')")
+            self.execute(
+                f'CREATE TABLE {table}_terms ('
+                'term TEXT PRIMARY KEY, docs INTEGER NOT NULL) WITHOUT ROWID')
+
+
+def load_corpus():
+    """Заголовки и тексты постов из db.json."""
+    with open(CORPUS_PATH, encoding='utf-8') as file:
+        return [
+            (item['fields']['title'], item['fields']['text'])
+            for item in json.load(file) if item['model'] == 'blog.post'
+        ]
+
+
+def make_corpus_posts(corpus, size):
+    """Посты корпуса и синтетические посты до общего числа size.
+
+    Синтетические посты составлены из случайных слов корпуса, кроме
+    форм из RELEVANT_FORMS, поэтому релевантны только посты корпуса.
+    Возвращает id постов корпуса по порядку.
+    """
+    author = User.objects.create(username='benchmark_author')
+    category = Category.objects.create(
+        title='Benchmark', description='Benchmark', slug='benchmark')
+    excluded = set().union(*RELEVANT_FORMS.values())
+    words = [
+        word for title, text in corpus
+        for word in re.findall(r'\w+', f'{title} {text}')
+        if word.lower() not in excluded
+    ]
+    text_lengths = [len(text.split()) for _, text in corpus]
+    generator = random.Random(0)
+    now = timezone.now()
+
+    def synthetic(number):
+        return Post(
+            title=' '.join(
+                generator.choices(words, k=generator.randint(1, 4))),
+            text=' '.join(generator.choices(
+                words, k=generator.choice(text_lengths))),
+            pub_date=now - timedelta(minutes=number),
+            author=author, category=category)
+
+    originals = Post.objects.bulk_create(
+        Post(title=title, text=text, pub_date=now - timedelta(minutes=number),
+             author=author, category=category)
+        for number, (title, text) in enumerate(corpus))
+    for start in range(len(corpus), size, BATCH_SIZE):
+        Post.objects.bulk_create(
+            synthetic(number)
+            for number in range(start, min(start + BATCH_SIZE, size)))
+    return [post.id for post in originals]
+
+
+@scenario('search_ru', default_size=100_000)
+def search_russian(size, repeat):
+    """Поиск по корпусу db.json, размноженному синтетическими постами."""
+    corpus = load_corpus()
+    original_ids = make_corpus_posts(corpus, size)
+    relevant = {
+        query: {
+            post_id for post_id, (title, text) in zip(original_ids, corpus)
+            if forms & set(re.findall(r'\w+', f'{title} {text}'.lower()))
+        }
+        for query, forms in RELEVANT_FORMS.items()
+    }
+    plain = PlainSearchBackend()
+    plain.create_tables()
+    backends = (('FTS5 + анализатор', SQLiteSearchBackend()),
+                ('FTS5 без анализатора', plain),
+                ('LIKE по основам', DatabaseSearchBackend()))
+    for name, backend in backends[:2]:
+        start = time.perf_counter()
+        backend.rebuild()
+        yield (f'{name}: построение индекса '
+               f'{time.perf_counter() - start:.1f} с')
+    feed = get_objects(feed=True)
+    for name, backend in backends:
+        precision, recall, timings, empty = [], [], [], 0
+        for query, expected in relevant.items():
+            results = backend.search_posts(feed, query)
+            found = list(results[:PAGINATE_COUNT].values_list('id', flat=True))
+            hits = len(expected.intersection(found))
+            if found:
+                precision.append(hits / len(found))
+            else:
+                empty += 1
+            recall.append(hits / min(len(expected), PAGINATE_COUNT))
+            timings.append(measure(
+                lambda: list(backend.search_posts(feed, query)[
+                    :PAGINATE_COUNT]), repeat))
+        yield (f'{name}: точность {statistics.mean(precision or [0]):.2f}, '
+               f'полнота {statistics.mean(recall):.2f} на первой странице, '
+               f'пустых выдач {empty} из {len(relevant)}; время — медиана '
+               f'{statistics.median(timings):.2f} мс, '
+               f'максимум {max(timings):.2f} мс')
+    # Самое частое слово корпуса встречается и в большинстве синтетических
+    # постов: ранжирование bm25() против сортировки по дате
+    # (см. SEARCH_RANK_MAX_DOCS).
+    backend = SQLiteSearchBackend()
+    word, _ = Counter(
+        word for title, text in corpus
+        for word in re.findall(r'\w+', f'{title} {text}'.lower())
+        if backend.query_terms(word)
+    ).most_common(1)[0]
+    term = backend.query_terms(word)[0]
+    docs = backend.term_docs(backend.POST_TABLE, [term])[term]
+    for label, limit in (('bm25', size), ('по дате', 0)):
+        with mock.patch('blog.search.backends.SEARCH_RANK_MAX_DOCS', limit):
+            elapsed_ms = measure(lambda: list(backend.search_posts(
+                feed, word)[:PAGINATE_COUNT]), repeat)
+        yield (f'частое слово «{word}» ({docs} постов), {label}: '
+               f'{elapsed_ms:.2f} мс')
+
+
+def write_jsonl(path, size, first_pk=1):
+    """Файл JSON Lines: size постов и комментарий к каждому десятому."""
+    with open(path, 'w', encoding='utf-8') as file:
+        def write(model, pk, **fields):
+            file.write(json.dumps({'model': model, 'pk': pk, 'fields': fields},
+                                  ensure_ascii=False) + '\n')
+
+        write('blog.category', first_pk, title='Импорт', description='',
+              slug=f'import-{first_pk}', is_published=True,
+              created_at='2024-01-01T00:00:00Z')
+        write('blog.location', first_pk, name='Импорт', is_published=True,
+              created_at='2024-01-01T00:00:00Z')
+        for number in range(first_pk, first_pk + size):
+            write('blog.post', number, title=f'Пост {number}',
+                  text=f'Текст поста {number}', is_published=True,
+                  pub_date='2024-01-01T00:00:00Z',
+                  created_at='2024-01-01T00:00:00Z',
+                  updated_at='2024-01-01T00:00:00Z',
+                  author=['benchmark_author'], category=first_pk,
+                  location=first_pk)
+        for number in range(first_pk, first_pk + size, 10):
+            write('blog.comment', number, text='Комментарий', post=number,
+                  author=['benchmark_author'],
+                  created_at='2024-01-01T00:00:00Z')
+
+
+@scenario('import', default_size=1_000_000)
+def import_posts(size, repeat):
+    """Загрузка JSON Lines: import_blog против loaddata."""
+    User.objects.create(username='benchmark_author')
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'posts.jsonl')
+        write_jsonl(path, size)
+        yield f'файл: {os.path.getsize(path) / 2**20:.0f} МБ'
+        before = peak_rss_mb()
+        start = time.perf_counter()
+        importer = Importer(batch_size=2000)
+        # С DEBUG журнал запросов занимает память сам по себе.
+        with override_settings(DEBUG=False):
+            with open(path, encoding='utf-8') as lines:
+                importer.load(lines)
+            loaded = time.perf_counter() - start
+            importer.finish()
+        elapsed = time.perf_counter() - start
+        yield (f'import_blog, {size} постов: {elapsed:.1f} с '
+               f'(загрузка {loaded:.1f} с, индекс и счётчики '
+               f'{elapsed - loaded:.1f} с), {size / elapsed:.0f} постов/с, '
+               f'рост пикового RSS {peak_rss_mb() - before:.0f} МБ')
+        # loaddata сохраняет объекты по одному, поэтому берётся выборка.
+        sample = min(size, 20_000)
+        path = os.path.join(directory, 'sample.jsonl')
+        write_jsonl(path, sample, first_pk=size + 1)
+        start = time.perf_counter()
+        call_command('loaddata', path, verbosity=0)
+        elapsed = time.perf_counter() - start
+        yield (f'loaddata, {sample} постов: {elapsed:.1f} с, '
+               f'{sample / elapsed:.0f} постов/с')
+
+
+@contextmanager
+def default_database(settings_dict):
+    """Открывать соединения default внутри блока к другой базе.
+
+    Действует на соединения, которые открываются в новых потоках:
+    соединение текущего потока уже создано.
+    """
+    original = connections.settings
+    connections.settings = {
+        **original,
+        **connections.configure_settings({DEFAULT_DB_ALIAS: settings_dict}),
+    }
+    try:
+        yield
+    finally:
+        connections.settings = original
+
+
+def in_thread(func):
+    """Выполнить func в отдельном потоке со своими соединениями с БД."""
+    def run():
+        try:
+            return func()
+        finally:
+            connections.close_all()
+
+    with ThreadPoolExecutor(1) as pool:
+        return pool.submit(run).result()
+
+
+def simulate_request(func):
+    """Выполнить func между сигналами начала и конца запроса.
+
+    По этим сигналам Django закрывает соединения, чей CONN_MAX_AGE истёк,
+    как при обработке настоящего запроса.
+    """
+    request_started.send(sender=None)
+    try:
+        func()
+    finally:
+        request_finished.send(sender=None)
+
+
+def mixed_load(threads, requests, write_share):
+    """Чтение ленты и запись комментариев в threads потоков.
+
+    Возвращает число запросов в секунду и счётчик ошибок БД.
+    """
+    author, post_ids = in_thread(lambda: (
+        User.objects.get(username='benchmark_author'),
+        list(Post.objects.values_list('pk', flat=True))))
+    errors = Counter()
+
+    def read():
+        list(get_objects(feed=True)[:PAGINATE_COUNT])
+        post = Post.objects.get(pk=random.choice(post_ids))
+        list(paginate_comments(post))
+
+    def write():
+        Comment.objects.create(
+            post_id=random.choice(post_ids), author=author,
+            text='Комментарий')
+
+    def worker():
+        for _ in range(requests // threads):
+            try:
+                simulate_request(
+                    write if random.random() < write_share else read)
+            except OperationalError as error:
+                errors[str(error)] += 1
+        connections.close_all()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        for future in [pool.submit(worker) for _ in range(threads)]:
+            future.result()
+    return requests / (time.perf_counter() - start), errors
+
+
+@scenario('concurrency', default_size=10_000)
+def concurrency(size, repeat):
+    """Лента и комментарии в 16 потоков: settings_production и умолчания."""
+    with tempfile.TemporaryDirectory() as directory:
+        template = os.path.join(directory, 'template.sqlite3')
+        path = os.path.join(directory, 'db.sqlite3')
+        engine = {'ENGINE': 'django.db.backends.sqlite3'}
+
+        def prepare():
+            call_command('migrate', verbosity=0)
+            make_posts(size)
+
+        with default_database({**engine, 'NAME': template}):
+            in_thread(prepare)
+        profiles = {
+            'по умолчанию': {**engine, 'NAME': path},
+            'settings_production': {
+                **settings_production.DATABASES[DEFAULT_DB_ALIAS],
+                'NAME': path,
+            },
+        }
+        for label, settings_dict in profiles.items():
+            throughputs, errors = [], Counter()
+            for _ in range(repeat):
+                # Каждый прогон начинается с одной и той же базы.
+                for suffix in ('-wal', '-shm'):
+                    if os.path.exists(path + suffix):
+                        os.remove(path + suffix)
+                shutil.copyfile(template, path)
+                with default_database(settings_dict):
+                    throughput, run_errors = mixed_load(
+                        threads=16, requests=4000, write_share=0.2)
+                throughputs.append(throughput)
+                errors.update(run_errors)
+            yield (f'{label}: {statistics.median(throughputs):.0f} '
+                   f'запросов/с, ошибок БД {sum(errors.values())}'
+                   + ''.join(f'; «{message}»: {count}'
+                             for message, count in errors.items()))
+
+
+def reload_urls():
+    """Заново собрать URL: blog.urls выбирает представления при импорте."""
+    importlib.reload(blog.urls)
+    importlib.reload(blogicum.urls)
+    clear_url_caches()
+
+
+@contextmanager
+def async_views(names):
+    """Подключить асинхронные представления для имён URL names."""
+    try:
+        with override_settings(BLOG_ASYNC_VIEWS=names):
+            reload_urls()
+            yield
+    finally:
+        reload_urls()
+
+
+async def asgi_load(user, urls, concurrency, requests):
+    """Запросы к urls через ASGI-обработчик с concurrency одновременно.
+
+    Возвращает число запросов в секунду и задержки в миллисекундах.
+    """
+    client = AsyncClient()
+    await client.aforce_login(user)
+    latencies = []
+
+    async def worker():
+        for number in range(requests // concurrency):
+            start = time.perf_counter()
+            response = await client.get(urls[number % len(urls)])
+            latencies.append((time.perf_counter() - start) * 1000)
+            assert response.status_code == 200, response.status_code
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return len(latencies) / (time.perf_counter() - start), latencies
+
+
+@scenario('asgi', default_size=10_000)
+def asgi(size, repeat):
+    """Лента и страница поста под ASGI: асинхронные и синхронные views."""
+    author, category = make_posts(size)
+    post = Post.objects.order_by('-pub_date').first()
+    urls = ['/', f'/posts/{post.pk}/']
+    requests = 400
+    for concurrency in (1, 10, 50):
+        for label, names in (('синхронные', []),
+                             ('асинхронные', list(ASYNC_VIEWS))):
+            throughputs, latencies = [], []
+            with override_settings(
+                    DEBUG=False,
+                    ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'],
+            ), async_views(names):
+                for _ in range(repeat):
+                    throughput, run_latencies = async_to_sync(asgi_load)(
+                        author, urls, concurrency, requests)
+                    throughputs.append(throughput)
+                    latencies += run_latencies
+            p50, p99 = (statistics.quantiles(latencies, n=100)[index]
+                        for index in (49, 98))
+            yield (f'{concurrency} одновременно, {label}: '
+                   f'{statistics.median(throughputs):.0f} запросов/с, '
+                   f'p50 {p50:.1f} мс, p99 {p99:.1f} мс')
+
+
+def fill_comments(size, author, posts):
+    """Вставить size комментариев к постам posts одним запросом SQL."""
+    post_ids = list(posts.values_list('pk', flat=True))
+    low, high = post_ids[0], post_ids[-1]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'WITH RECURSIVE seq(n) AS (SELECT 0 UNION ALL SELECT n + 1 '
+            'FROM seq WHERE n < %s) '
+            f'INSERT INTO {Comment._meta.db_table} '
+            '(text, post_id, author_id, created_at) '
+            "SELECT 'Комментарий', %s + n %% %s, %s, %s FROM seq",
+            [size - 1, low, high - low + 1, author.pk, timezone.now()])
+
+
+@scenario('admin_count', default_size=5_000_000)
+def admin_count(size, repeat):
+    """Список комментариев в админке: точный COUNT против оценки."""
+    author, category = make_posts(size // 100)
+    categories = [category] + [
+        Category.objects.create(title=f'Категория {number}',
+                                description='', slug=f'category-{number}')
+        for number in range(1, 10)
+    ]
+    for number, category in enumerate(categories):
+        Post.objects.alias(bucket=F('pk') % len(categories)).filter(
+            bucket=number).update(category=category)
+    start = time.perf_counter()
+    fill_comments(size, author, Post.objects.order_by('pk'))
+    yield (f'{size} комментариев вставлено за '
+           f'{time.perf_counter() - start:.0f} с')
+    superuser = User.objects.create(username='benchmark_admin',
+                                    is_staff=True, is_superuser=True)
+    comment_admin = django_admin.site._registry[Comment]
+    pages = {
+        'без фильтров': {},
+        'с фильтром по категории': {
+            'post__category__id__exact': categories[1].pk},
+    }
+    configs = {
+        'точный COUNT': {'paginator': Paginator,
+                         'show_full_result_count': True},
+        'оценка': {'paginator': EstimatedCountPaginator,
+                   'show_full_result_count': False},
+    }
+    for label, params in pages.items():
+        for config, attributes in configs.items():
+            def changelist():
+                request = RequestFactory().get('/admin/blog/comment/', params)
+                request.user = superuser
+                comment_admin.changelist_view(request).render()
+
+            cache.clear()
+            with override_settings(DEBUG=False), mock.patch.multiple(
+                    comment_admin, **attributes):
+                first_ms = measure(changelist, 1)
+                elapsed_ms = measure(changelist, repeat)
+            yield (f'{label}, {config}: первый запрос {first_ms:.0f} мс, '
+                   f'дальше {elapsed_ms:.0f} мс')
+
+
+@scenario('admin_search', default_size=1_000_000)
+def admin_search(size, repeat):
+    """Поиск в списке постов админки: индекс против LIKE."""
+    author, _ = make_posts(size)
+    start = time.perf_counter()
+    SQLiteSearchBackend().rebuild()
+    yield f'построение индекса: {time.perf_counter() - start:.1f} с'
+    superuser = User.objects.create(username='benchmark_admin',
+                                    is_staff=True, is_superuser=True)
+    post_admin = django_admin.site._registry[Post]
+    like_search = partial(django_admin.ModelAdmin.get_search_results,
+                          post_admin)
+    queries = {
+        'редкое слово': str(size // 2),
+        'слово во всех постах': 'поста',
+        'имя автора': author.username,
+    }
+    for label, query in queries.items():
+        for name, search in (('индекс', post_admin.get_search_results),
+                             ('LIKE', like_search)):
+            def request():
+                request = RequestFactory().get('/admin/blog/post/',
+                                               {'q': query})
+                request.user = superuser
+                return request
+
+            def results():
+                changelist = post_admin.get_changelist_instance(request())
+                list(changelist.result_list)
+
+            def changelist():
+                post_admin.changelist_view(request()).render()
+
+            cache.clear()
+            with override_settings(DEBUG=False), mock.patch.object(
+                    post_admin, 'get_search_results', search):
+                results_ms = measure(results, repeat)
+                elapsed_ms = measure(changelist, repeat)
+            yield (f'{label}, {name}: запросы {results_ms:.0f} мс, '
+                   f'вся страница {elapsed_ms:.0f} мс')
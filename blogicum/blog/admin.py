@@ -1,10 +1,117 @@
-from django.contrib import admin
+from functools import partial
 
-from blog.models import Category, Comment, Location, Post
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin import helpers
+from django.contrib.admin.helpers import ActionForm
+from django.contrib.admin.views.main import ORDER_VAR
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Q, Sum
+from django.template.response import TemplateResponse
+
+from blog.models import Category, Comment, Job, Location, Post
+from blog.moderation import (moderate_posts, set_categories_published,
+                             set_locations_published)
+from blog.pagination import EstimatedCountPaginator
+from blog.search import estimate_matches, search_comments, search_posts
 from constants import EMPTY_VALUE_DISPLAY
 
 
-class PostAdmin(admin.ModelAdmin):
+class CachedChoicesMixin:
+    """Mixin для list_editable с внешними ключами.
+
+    Каждая строка списка — своя форма, и поле внешнего ключа в ней
+    заново читает все варианты из БД. Здесь варианты читаются один раз
+    за запрос и общие для всех строк, а вместо виджетов из
+    autocomplete_fields и raw_id_fields используется обычный <select>.
+    """
+
+    def get_changelist_formset(self, request, **kwargs):
+        kwargs['formfield_callback'] = partial(
+            self.formfield_for_changelist, request=request)
+        return super().get_changelist_formset(request, **kwargs)
+
+    def formfield_for_changelist(self, db_field, request, **kwargs):
+        if not db_field.many_to_one:
+            return self.formfield_for_dbfield(db_field, request, **kwargs)
+        kwargs['widget'] = forms.Select
+        formfield = db_field.formfield(**kwargs)
+        formfield.choices = self.get_cached_choices(request, db_field)
+        return formfield
+
+    def get_cached_choices(self, request, db_field):
+        """Варианты поля db_field, прочитанные один раз за запрос."""
+        choices = request.__dict__.setdefault('_admin_choices', {})
+        if db_field.name not in choices:
+            choices[db_field.name] = list(db_field.formfield().choices)
+        return choices[db_field.name]
+
+
+class IndexedSearchMixin:
+    """Поиск в админке по индексу blog.search вместо LIKE.
+
+    Запрос ищется функцией search_function (search_posts или
+    search_comments) в полнотекстовом индексе. Если слово запроса
+    совпадает с именем пользователя (уникальный индекс
+    auth_user.username), к найденному добавляются записи этого автора,
+    в которых есть остальные слова: имя может быть и обычным словом
+    текста. search_fields только включают поле поиска и описывают, где
+    ищется запрос.
+
+    Найденное упорядочено по релевантности, если бэкенд её посчитал
+    (столбец search_rank) и сортировка по столбцу списка не выбрана.
+    Слишком частые запросы бэкенд не ранжирует, тогда новые записи
+    идут первыми по первичному ключу: страница набирается без сортировки
+    всех совпадений. Оценка числа совпадений по статистике индекса
+    передаётся EstimatedCountPaginator, чтобы не считать их.
+    """
+
+    search_function = None
+
+    def get_search_results(self, request, queryset, search_term):
+        words = search_term.split()
+        if not words:
+            return queryset, False
+        authors = dict(User.objects.filter(
+            username__in=words).values_list('username', 'pk'))
+        results = self.search_function(queryset, search_term)
+        if authors:
+            by_authors = Q(author__in=authors.values())
+            text = ' '.join(word for word in words if word not in authors)
+            if text:
+                by_authors &= Q(pk__in=self.search_function(
+                    queryset, text).values('pk'))
+            results = queryset.filter(
+                Q(pk__in=results.values('pk')) | by_authors)
+        else:
+            request._search_matches = estimate_matches(queryset, search_term)
+        if ORDER_VAR in request.GET:
+            # Список уже упорядочен, а поиск заменил этот порядок своим.
+            results = results.order_by(*queryset.query.order_by)
+        elif 'search_rank' not in results.query.annotations:
+            results = results.order_by('-pk')
+        return results, False
+
+    def get_paginator(self, request, queryset, per_page, **kwargs):
+        return self.paginator(
+            queryset, per_page,
+            estimate=getattr(request, '_search_matches', None), **kwargs)
+
+
+class PostActionForm(ActionForm):
+    """Форма действий над постами: с категорией для переноса."""
+
+    category = forms.ModelChoiceField(
+        Category.objects.all(), required=False, label='Категория')
+
+
+class PostAdmin(IndexedSearchMixin, CachedChoicesMixin, admin.ModelAdmin):
+    action_form = PostActionForm
+    actions = ('publish', 'unpublish', 'move_to_category',
+               'delete_with_comments')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     list_display = (
         'title',
         'location',
@@ -17,13 +124,106 @@ class PostAdmin(admin.ModelAdmin):
         'is_published',
         'category'
     )
-    search_fields = ('title',)
+    list_select_related = ('location', 'category', 'author')
+    autocomplete_fields = ('category', 'location')
+    raw_id_fields = ('author',)
+    search_fields = ('title', 'text', 'author__username')
+    search_help_text = 'Слова из заголовка и текста или имя автора.'
+    search_function = staticmethod(search_posts)
     list_filter = ('category',)
     list_display_links = ('title',)
     empty_value_display = EMPTY_VALUE_DISPLAY
 
+    def get_actions(self, request):
+        # Стандартное удаление загружает и удаляет посты по одному.
+        actions = super().get_actions(request)
+        actions.pop('delete_selected', None)
+        return actions
 
-class CategoryAdmin(admin.ModelAdmin):
+    def moderate(self, request, queryset, action, **options):
+        """Применить action к выбранным постам и сообщить результат."""
+        count, background = moderate_posts(queryset, action, **options)
+        if background:
+            self.message_user(
+                request, f'Постов в обработке: {count}. Изменения появятся '
+                'после выполнения фоновых задач.', messages.INFO)
+        else:
+            self.message_user(
+                request, f'Обработано постов: {count}.', messages.SUCCESS)
+
+    @admin.action(description='Опубликовать выбранные посты',
+                  permissions=('change',))
+    def publish(self, request, queryset):
+        self.moderate(request, queryset, 'publish', is_published=True)
+
+    @admin.action(description='Снять выбранные посты с публикации',
+                  permissions=('change',))
+    def unpublish(self, request, queryset):
+        self.moderate(request, queryset, 'publish', is_published=False)
+
+    @admin.action(description='Перенести выбранные посты в категорию',
+                  permissions=('change',))
+    def move_to_category(self, request, queryset):
+        try:
+            category = PostActionForm.base_fields['category'].clean(
+                request.POST.get('category'))
+        except ValidationError:
+            category = None
+        if category is None:
+            self.message_user(
+                request, 'Выберите категорию для переноса.', messages.ERROR)
+            return
+        self.moderate(request, queryset, 'move', category_id=category.pk)
+
+    @admin.action(description='Удалить выбранные посты с комментариями',
+                  permissions=('delete',))
+    def delete_with_comments(self, request, queryset):
+        if request.POST.get('confirm'):
+            self.moderate(request, queryset, 'delete')
+            return None
+        totals = queryset.aggregate(
+            posts=Count('pk'), comments=Sum('comment_count'))
+        template = 'admin/blog/confirm_bulk_delete.html'
+        return TemplateResponse(request, template, {
+            **self.admin_site.each_context(request),
+            'title': 'Удаление постов',
+            'opts': self.model._meta,
+            'posts': totals['posts'],
+            'comments': totals['comments'] or 0,
+            'selected': request.POST.getlist(helpers.ACTION_CHECKBOX_NAME),
+            'select_across': request.POST.get('select_across', '0'),
+            'action_checkbox_name': helpers.ACTION_CHECKBOX_NAME,
+        })
+
+
+class PublishActionsMixin:
+    """Действия публикации для категорий и местоположений.
+
+    Подкласс задаёт set_published(queryset, is_published) — функцию из
+    blog.moderation, которая меняет строки одним UPDATE и сбрасывает
+    кеши.
+    """
+
+    actions = ('publish', 'unpublish')
+
+    def moderate(self, request, queryset, is_published):
+        count = self.set_published(queryset, is_published)
+        self.message_user(
+            request, f'Обработано записей: {count}.', messages.SUCCESS)
+
+    @admin.action(description='Опубликовать выбранные',
+                  permissions=('change',))
+    def publish(self, request, queryset):
+        self.moderate(request, queryset, True)
+
+    @admin.action(description='Снять выбранные с публикации',
+                  permissions=('change',))
+    def unpublish(self, request, queryset):
+        self.moderate(request, queryset, False)
+
+
+class CategoryAdmin(PublishActionsMixin, admin.ModelAdmin):
+    set_published = staticmethod(set_categories_published)
     list_display = (
         'title',
         'description',
@@ -40,7 +240,8 @@ class CategoryAdmin(admin.ModelAdmin):
     empty_value_display = EMPTY_VALUE_DISPLAY
 
 
-class LocationAdmin(admin.ModelAdmin):
+class LocationAdmin(PublishActionsMixin, admin.ModelAdmin):
+    set_published = staticmethod(set_locations_published)
     list_display = (
         'name',
         'is_published',
@@ -54,18 +255,44 @@ class LocationAdmin(admin.ModelAdmin):
     empty_value_display = EMPTY_VALUE_DISPLAY
 
 
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(IndexedSearchMixin, admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     list_display = (
         'text',
         'post',
         'created_at',
     )
-    search_fields = ('text',)
+    # Пост в списке выводится с именем автора.
+    list_select_related = ('post__author',)
+    # Новые первыми по первичному ключу: сортировка по created_at без
+    # индекса перебирает всю таблицу ради одной страницы.
+    ordering = ('-pk',)
+    raw_id_fields = ('post', 'author')
+    search_fields = ('text', 'author__username')
+    search_help_text = 'Слова из текста комментария или имя автора.'
+    search_function = staticmethod(search_comments)
+    list_filter = ('post__category',)
     list_display_links = ('text',)
     empty_value_display = EMPTY_VALUE_DISPLAY
 
 
+class JobAdmin(admin.ModelAdmin):
+    list_display = (
+        'kind',
+        'payload',
+        'status',
+        'attempts',
+        'run_after',
+        'last_error',
+    )
+    list_filter = ('status', 'kind')
+    list_display_links = ('kind',)
+    empty_value_display = EMPTY_VALUE_DISPLAY
+
+
 admin.site.register(Post, PostAdmin)
 admin.site.register(Category, CategoryAdmin)
 admin.site.register(Location, LocationAdmin)
 admin.site.register(Comment, CommentAdmin)
+admin.site.register(Job, JobAdmin)
@@ -5,3 +5,8 @@ class BlogConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'blog'
     verbose_name = 'Блог'
+
+    def ready(self):
+        # Обработчики фоновых задач и системные проверки регистрируются
+        # при импорте модулей.
+        from blog import checks, moderation, signals  # noqa: F401
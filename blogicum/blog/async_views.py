@@ -0,0 +1,172 @@
+"""Асинхронные версии страниц, которые только читают данные.
+
+Подключаются вместо синхронных для имён URL из настройки
+BLOG_ASYNC_VIEWS (см. blog.urls). Под ASGI такая страница не занимает
+поток на всё время запроса: запросы к БД и кешу идут через асинхронный
+API Django.
+
+Всё, что нужно шаблону из БД, читается заранее: строки страницы —
+списком, пользователь — через request.auser(). Сам шаблон синхронный
+и читает кеш ({% cache %} карточек постов, контекстные процессоры),
+поэтому отрисовывается в потоке через sync_to_async. Чтение из реплики,
+кеш страниц для анонимных посетителей и ETag работают так же, как
+у синхронных представлений.
+"""
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.http import Http404, HttpResponse
+from django.shortcuts import aget_object_or_404, render
+from django.utils.cache import (get_conditional_response, patch_cache_control,
+                                patch_vary_headers, set_response_etag)
+from django.views import View
+
+from blog.cache import (acache_page, aget_cached_page, areplica_may_be_stale,
+                        feed_count_key)
+from blog.forms import CommentForm
+from blog.models import Category, Post
+from blog.routers import read_from, replica_for
+from blog.service import (apaginate_comments, apaginate_queryset,
+                          check_post_visible, get_objects)
+
+
+class AsyncPageView(View):
+    """Асинхронная страница только для чтения."""
+
+    template_name = None
+    http_method_names = ['get', 'head', 'options']
+    # Кешировать ли страницу целиком для анонимных посетителей.
+    anonymous_cache = True
+
+    def get_cache_tags(self):
+        return ['posts']
+
+    async def get_context_data(self):
+        raise NotImplementedError
+
+    async def get(self, request, *args, **kwargs):
+        with read_from(replica_for(request)):
+            # Иначе request.user в шаблоне загрузит пользователя синхронно.
+            request.user = await request.auser()
+            if not self.anonymous_cache:
+                return await self.render_page()
+            if request.user.is_authenticated:
+                response = await self.render_page()
+                patch_cache_control(response, private=True)
+            else:
+                response = await self.get_anonymous_response()
+                set_response_etag(response)
+                response = get_conditional_response(
+                    request, etag=response.get('ETag'), response=response)
+        patch_vary_headers(response, ('Cookie',))
+        return response
+
+    async def get_anonymous_response(self):
+        cached = await aget_cached_page(self.request)
+        if cached is not None:
+            return HttpResponse(
+                cached['content'], content_type=cached['content_type'])
+        response = await self.render_page()
+        if not await areplica_may_be_stale():
+            await acache_page(self.request, response, self.get_cache_tags(),
+                              settings.BLOG_PAGE_CACHE_TIMEOUT)
+        return response
+
+    async def render_page(self):
+        context = await self.get_context_data()
+        context['view'] = self
+        return await sync_to_async(render)(
+            self.request, self.template_name, context)
+
+
+class AsyncPublishedPostsView(AsyncPageView):
+    """Асинхронная версия PublishedPostsView."""
+
+    template_name = 'blog/index.html'
+
+    async def get_context_data(self):
+        page = await apaginate_queryset(
+            get_objects(feed=True), self.request,
+            count_key=feed_count_key())
+        return {
+            'paginator': getattr(page, 'paginator', None),
+            'page_obj': page,
+            'is_paginated': page.has_other_pages(),
+            'object_list': page.object_list,
+            'post_list': page.object_list,
+        }
+
+
+class AsyncPostDetailView(AsyncPageView):
+    """Асинхронная версия PostDetailView."""
+
+    template_name = 'blog/detail.html'
+
+    async def get_context_data(self):
+        post = await aget_object_or_404(
+            Post.objects.select_related('author', 'category', 'location'),
+            id=self.kwargs['post_id'])
+        self.object = check_post_visible(self.request, post)
+        return {
+            'object': post,
+            'post': post,
+            'form': CommentForm(),
+            'comments': await apaginate_comments(post),
+        }
+
+    def get_cache_tags(self):
+        return [f'post:{self.object.pk}',
+                f'author:{self.object.author_id}',
+                f'category:{self.object.category_id}',
+                f'location:{self.object.location_id}']
+
+
+class AsyncCategoryDetailView(AsyncPageView):
+    """Асинхронная версия CategoryDetailView."""
+
+    template_name = 'blog/category.html'
+
+    async def get_context_data(self):
+        category = await aget_object_or_404(Category, slug=self.kwargs['slug'])
+        if not category.is_published:
+            raise Http404('Категория недоступна.')
+        self.object = category
+        posts = get_objects(feed=True).filter(category=category)
+        return {
+            'object': category,
+            'category': category,
+            'page_obj': await apaginate_queryset(
+                posts, self.request,
+                count_key=feed_count_key(category=category)),
+        }
+
+    def get_cache_tags(self):
+        return ['posts', f'category:{self.object.pk}']
+
+
+class AsyncProfileDetailView(AsyncPageView):
+    """Асинхронная версия ProfileDetailView."""
+
+    template_name = 'blog/profile.html'
+    anonymous_cache = False
+
+    async def get_context_data(self):
+        profile = await aget_object_or_404(
+            User, username=self.kwargs['username'])
+        posts = get_objects(profile_user=profile, feed=True)
+        return {
+            'object': profile,
+            'profile': profile,
+            'page_obj': await apaginate_queryset(
+                posts, self.request,
+                count_key=feed_count_key(author=profile)),
+        }
+
+
+# Имена URL из blog.urls, для которых есть асинхронная версия.
+ASYNC_VIEWS = {
+    'index': AsyncPublishedPostsView,
+    'post_detail': AsyncPostDetailView,
+    'category_posts': AsyncCategoryDetailView,
+    'profile': AsyncProfileDetailView,
+}
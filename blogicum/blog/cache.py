@@ -0,0 +1,215 @@
+import hashlib
+import time
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from blog.routers import reading_replica
+from blog.scheduler import scheduler
+from constants import CHOICES_TIMEOUT
+
+FEED_COUNT_KEY = 'feed_count:{feed}'
+ADMIN_COUNT_KEY = 'admin_count:{digest}'
+POST_CARD_VERSION_KEY = 'post_card_version'
+PAGE_KEY = 'page:{digest}'
+TAG_KEY = 'tag:{tag}'
+LAST_WRITE_KEY = 'last_write'
+CHOICES_KEY = 'choices:{model}'
+
+
+def after_commit(func, *args, **kwargs):
+    """Сбросить кеш после фиксации транзакции, вне транзакции — сразу.
+
+    Если сбросить раньше, параллельный запрос успеет прочитать ещё не
+    изменённые данные и снова положить их в кеш.
+    """
+    transaction.on_commit(partial(func, *args, **kwargs))
+
+
+def mark_write():
+    """Запомнить время последнего изменения, сбросившего кеш."""
+    cache.set(LAST_WRITE_KEY, time.time(), timeout=settings.BLOG_REPLICA_LAG)
+
+
+def replica_may_be_stale():
+    """Может ли реплика, из которой идёт чтение, не знать о недавних записях.
+
+    Данные, прочитанные из такой реплики, нельзя класть в кеш: сброс
+    кеша после записи уже прошёл, и устаревшая копия прожила бы в кеше
+    весь свой таймаут.
+    """
+    if not reading_replica():
+        return False
+    return _recent_write(cache.get(LAST_WRITE_KEY))
+
+
+async def areplica_may_be_stale():
+    """То же, что replica_may_be_stale(), для асинхронного кода."""
+    if not reading_replica():
+        return False
+    return _recent_write(await cache.aget(LAST_WRITE_KEY))
+
+
+def _recent_write(last_write):
+    return (last_write is not None
+            and time.time() - last_write < settings.BLOG_REPLICA_LAG)
+
+
+def feed_count_key(category=None, author=None):
+    """Ключ кеша с числом постов в ленте: общей, категории или автора."""
+    if category is not None:
+        return FEED_COUNT_KEY.format(feed=f'category:{category.pk}')
+    if author is not None:
+        return FEED_COUNT_KEY.format(feed=f'author:{author.pk}')
+    return FEED_COUNT_KEY.format(feed='global')
+
+
+def admin_count_key(queryset):
+    """Ключ кеша с числом строк queryset для пагинатора админки."""
+    sql, params = queryset.query.sql_with_params()
+    digest = hashlib.md5(f'{queryset.db}:{sql}:{params}'.encode()).hexdigest()
+    return ADMIN_COUNT_KEY.format(digest=digest)
+
+
+def invalidate_feed_counts(category_ids=(), author_ids=()):
+    """Сбросить счётчики общей ленты и лент указанных категорий/авторов."""
+    keys = [FEED_COUNT_KEY.format(feed='global')]
+    keys += [FEED_COUNT_KEY.format(feed=f'category:{pk}')
+             for pk in category_ids if pk is not None]
+    keys += [FEED_COUNT_KEY.format(feed=f'author:{pk}')
+             for pk in author_ids if pk is not None]
+    cache.delete_many(keys)
+    mark_write()
+
+
+def published_rows(model):
+    """Поля опубликованных записей model для выбора в формах.
+
+    Список строк (values_list по всем полям) хранится в кеше и
+    сбрасывается invalidate_choices() при изменении записей.
+    """
+    key = CHOICES_KEY.format(model=model._meta.label_lower)
+    rows = cache.get(key)
+    if rows is None:
+        rows = list(model.objects.filter(is_published=True).order_by(
+            'pk').values_list(*choice_fields(model)))
+        if not replica_may_be_stale():
+            cache.set(key, rows, CHOICES_TIMEOUT)
+    return rows
+
+
+def choice_fields(model):
+    """Имена полей в строках published_rows()."""
+    return [field.attname for field in model._meta.concrete_fields]
+
+
+def invalidate_choices(*models):
+    """Сбросить закешированные варианты выбора записей models."""
+    cache.delete_many([CHOICES_KEY.format(model=model._meta.label_lower)
+                       for model in models])
+
+
+def new_version():
+    """Значение версии, которого ещё не было.
+
+    Кеш может вытеснить ключ версии, поэтому версии не считаются от
+    единицы: повторившаяся версия снова сделала бы действительными
+    страницы и фрагменты, сохранённые до сброса.
+    """
+    return time.time_ns()
+
+
+def post_card_version():
+    """Общая версия закешированных карточек постов.
+
+    Входит в ключ фрагмента includes/post_card.html вместе с id поста,
+    его updated_at и comment_count. Меняется, когда меняются данные,
+    которые карточка берёт не из самого поста: категории, местоположения
+    и имена авторов.
+    """
+    version = cache.get(POST_CARD_VERSION_KEY)
+    if version is None:
+        version = new_version()
+        if not cache.add(POST_CARD_VERSION_KEY, version, timeout=None):
+            version = cache.get(POST_CARD_VERSION_KEY, version)
+    return version
+
+
+def invalidate_post_cards():
+    """Сбросить все закешированные карточки постов."""
+    cache.set(POST_CARD_VERSION_KEY, new_version(), timeout=None)
+
+
+def page_cache_key(request):
+    url = request.build_absolute_uri().encode()
+    return PAGE_KEY.format(digest=hashlib.md5(url).hexdigest())
+
+
+def tag_versions(tags):
+    """Текущие версии тегов; отсутствующим в кеше тегам даётся новая."""
+    keys = {TAG_KEY.format(tag=tag): tag for tag in tags}
+    versions = cache.get_many(keys)
+    missing = {key: new_version() for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, timeout=None)
+        versions.update(missing)
+    return {keys[key]: version for key, version in versions.items()}
+
+
+async def atag_versions(tags):
+    """То же, что tag_versions(), для асинхронного кода."""
+    keys = {TAG_KEY.format(tag=tag): tag for tag in tags}
+    versions = await cache.aget_many(keys)
+    missing = {key: new_version() for key in keys if key not in versions}
+    if missing:
+        await cache.aset_many(missing, timeout=None)
+        versions.update(missing)
+    return {keys[key]: version for key, version in versions.items()}
+
+
+def invalidate_tags(*tags):
+    """Сбросить страницы, помеченные любым из тегов."""
+    mark_write()
+    version = new_version()
+    cache.set_many(
+        {TAG_KEY.format(tag=tag): version for tag in tags}, timeout=None)
+
+
+def get_cached_page(request):
+    """Вернуть сохранённую страницу, если ни один её тег не сброшен."""
+    entry = cache.get(page_cache_key(request))
+    if entry is None or tag_versions(entry['tags']) != entry['tags']:
+        return None
+    return entry
+
+
+async def aget_cached_page(request):
+    """То же, что get_cached_page(), для асинхронного кода."""
+    entry = await cache.aget(page_cache_key(request))
+    if entry is None or await atag_versions(entry['tags']) != entry['tags']:
+        return None
+    return entry
+
+
+def cache_page(request, response, tags, timeout):
+    """Сохранить отрисованную страницу с текущими версиями тегов.
+
+    Страница живёт не дольше, чем до ближайшей отложенной публикации,
+    чтобы такой пост появился в ленте вовремя.
+    """
+    cache.set(page_cache_key(request), {
+        'content': response.content,
+        'content_type': response['Content-Type'],
+        'tags': tag_versions(tags),
+    }, scheduler.limit_timeout(timeout))
+
+
+async def acache_page(request, response, tags, timeout):
+    """То же, что cache_page(), для асинхронного кода."""
+    await cache.aset(page_cache_key(request), {
+        'content': response.content,
+        'content_type': response['Content-Type'],
+        'tags': await atag_versions(tags),
+    }, await scheduler.alimit_timeout(timeout))
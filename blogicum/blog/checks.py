@@ -0,0 +1,38 @@
+"""Системные проверки настроек блога (manage.py check)."""
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+# Бэкенды кеша, которые хранят данные в памяти одного процесса.
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+DATABASE_CACHE = 'django.core.cache.backends.db.DatabaseCache'
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    """Кеш по умолчанию должен быть общим для процессов и не лежать в БД."""
+    backend = settings.CACHES.get('default', {}).get('BACKEND')
+    if backend in PROCESS_LOCAL_CACHES:
+        return [Warning(
+            f'Кеш по умолчанию ({backend}) не общий для процессов сайта.',
+            hint=(
+                'Сброс кеша после записи увидит только процесс, который '
+                'записал. Настройте Redis, файловый или другой общий кеш, '
+                'либо запускайте сайт в одном процессе.'
+            ),
+            id='blog.W001',
+        )]
+    if backend == DATABASE_CACHE:
+        return [Warning(
+            'Кеш по умолчанию хранится в базе данных.',
+            hint=(
+                'Карточки постов читают кеш по одному запросу к БД каждая, '
+                'асинхронные страницы не могут к нему обращаться, а '
+                'анонимные посетители пишут в основную базу. Настройте '
+                'Redis или файловый кеш.'
+            ),
+            id='blog.W002',
+        )]
+    return []
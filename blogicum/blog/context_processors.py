@@ -0,0 +1,12 @@
+from django.conf import settings
+from django.utils.functional import SimpleLazyObject
+
+from blog.cache import post_card_version
+
+
+def post_cards(request):
+    """Параметры кеша фрагментов для includes/post_card.html."""
+    return {
+        'post_card_timeout': settings.BLOG_POST_CARD_TIMEOUT,
+        'post_card_version': SimpleLazyObject(post_card_version),
+    }
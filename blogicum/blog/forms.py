@@ -1,7 +1,10 @@
 from django import forms
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User
+from django.db import DEFAULT_DB_ALIAS
+from django.forms.models import ModelChoiceIterator
 
+from .cache import choice_fields, published_rows
 from .models import Comment, Post
 
 
@@ -30,7 +33,78 @@ class CommentForm(forms.ModelForm):
         fields = ('text',)
 
 
+class PublishedChoiceIterator(ModelChoiceIterator):
+    """Варианты PublishedChoiceField: из кеша, без запроса к БД."""
+
+    def __iter__(self):
+        if self.field.empty_label is not None:
+            yield ('', self.field.empty_label)
+        for obj in self.field.published_objects().values():
+            yield self.choice(obj)
+
+    def __len__(self):
+        return (len(self.field.published_objects())
+                + (self.field.empty_label is not None))
+
+    def __bool__(self):
+        return (self.field.empty_label is not None
+                or bool(self.field.published_objects()))
+
+
+class PublishedChoiceField(forms.ModelChoiceField):
+    """Выбор опубликованной записи модели queryset.
+
+    Варианты берутся из blog.cache.published_rows(), и выбранное значение
+    проверяется по тем же закешированным id: ни вывод формы, ни её
+    проверка не обращаются к БД, пока кеш не сброшен.
+    """
+
+    iterator = PublishedChoiceIterator
+
+    def published_objects(self):
+        """Опубликованные записи по id, собранные из строк кеша."""
+        model = self.queryset.model
+        names = choice_fields(model)
+        objects = (model.from_db(DEFAULT_DB_ALIAS, names, row)
+                   for row in published_rows(model))
+        return {obj.pk: obj for obj in objects}
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        if isinstance(value, self.queryset.model):
+            value = value.pk
+        try:
+            obj = self.published_objects().get(int(value))
+        except (TypeError, ValueError):
+            obj = None
+        if obj is None:
+            raise forms.ValidationError(
+                self.error_messages['invalid_choice'],
+                code='invalid_choice', params={'value': value})
+        return obj
+
+
 class PostForm(forms.ModelForm):
+    """Форма поста.
+
+    upload_errors — причины, по которым blog.uploads.ImageUploadHandler
+    отклонил загруженные файлы, по именам полей.
+    """
+
+    def __init__(self, *args, upload_errors=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.upload_errors = upload_errors or {}
+
+    def _get_validation_exclusions(self):
+        # PublishedChoiceField уже проверил id по кешу; модель проверила бы
+        # существование записи отдельным запросом.
+        return super()._get_validation_exclusions() | {'category', 'location'}
+
+    def clean_image(self):
+        if 'image' in self.upload_errors:
+            raise forms.ValidationError(self.upload_errors['image'])
+        return self.cleaned_data['image']
 
     class Meta:
         model = Post
@@ -43,6 +117,10 @@ class PostForm(forms.ModelForm):
             'category',
             'is_published'
         )
+        field_classes = {
+            'category': PublishedChoiceField,
+            'location': PublishedChoiceField,
+        }
         widgets = {
             'pub_date': forms.DateTimeInput(
                 format='%Y-%m-%d %H:%M', attrs={'type': 'datetime-local'}
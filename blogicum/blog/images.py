@@ -0,0 +1,116 @@
+"""Уменьшенные копии (рендишены) изображений постов.
+
+Для каждой ширины из IMAGE_RENDITION_WIDTHS, меньшей ширины оригинала,
+сохраняются две копии: WebP и запасная в JPEG (PNG, если у изображения
+есть прозрачность). Копии лежат в том же хранилище, что и оригинал,
+а их описание хранится в Post.image_renditions:
+
+    {'source': 'post_images/<sha256>.jpg', 'width': 1920, 'height': 1080,
+     'webp': [['post_images/<sha256>.webp', 320], ...],
+     'fallback': [['post_images/<sha256>.jpg', 320], ...]}
+
+Копии одного и того же оригинала побайтно совпадают, поэтому посты
+с одинаковым изображением делят и их файлы.
+
+Модуль не обращается к БД, поэтому make_renditions() можно выполнять
+в отдельных процессах (см. команду make_renditions).
+"""
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+from blog.storage import post_image_storage
+from constants import (IMAGE_CARD_WIDTH, IMAGE_RENDITION_WIDTHS, JPEG_QUALITY,
+                       WEBP_QUALITY)
+
+
+class Renditions:
+    """Описание рендишенов в виде, удобном для шаблона."""
+
+    def __init__(self, data, storage):
+        self.data = data
+        self.storage = storage
+
+    @property
+    def width(self):
+        return self.data['width']
+
+    @property
+    def height(self):
+        return self.data['height']
+
+    @property
+    def src(self):
+        """Запасная копия, которой хватает для ширины карточки."""
+        fallback = self.data['fallback']
+        for name, width in fallback:
+            if width >= IMAGE_CARD_WIDTH:
+                return self.storage.url(name)
+        return self.storage.url(fallback[-1][0])
+
+    @property
+    def srcset(self):
+        return self._srcset(self.data['fallback'])
+
+    @property
+    def webp_srcset(self):
+        return self._srcset(self.data['webp'])
+
+    @property
+    def sizes(self):
+        return f'(max-width: {IMAGE_CARD_WIDTH}px) 100vw, {IMAGE_CARD_WIDTH}px'
+
+    def _srcset(self, items):
+        return ', '.join(
+            f'{self.storage.url(name)} {width}w' for name, width in items)
+
+
+def rendition_widths(width):
+    """Ширины копий для оригинала шириной width.
+
+    Оригинал никогда не увеличивается: если он уже меньше всех ширин,
+    создаётся одна копия его собственного размера.
+    """
+    return [w for w in IMAGE_RENDITION_WIDTHS if w < width] or [width]
+
+
+def make_renditions(name, storage=None):
+    """Создать копии изображения name и вернуть их описание."""
+    storage = storage or post_image_storage()
+    with storage.open(name, 'rb') as file:
+        image = Image.open(file)
+        image.load()
+    image = ImageOps.exif_transpose(image)
+    has_alpha = (
+        image.mode in ('RGBA', 'LA')
+        or (image.mode == 'P' and 'transparency' in image.info))
+    image = image.convert('RGBA' if has_alpha else 'RGB')
+    fallback_format, fallback_ext = (
+        ('PNG', 'png') if has_alpha else ('JPEG', 'jpg'))
+
+    stem = os.path.splitext(name)[0]
+    data = {'source': name, 'width': image.width, 'height': image.height,
+            'webp': [], 'fallback': []}
+    for width in rendition_widths(image.width):
+        height = max(round(image.height * width / image.width), 1)
+        resized = image.resize((width, height), Image.Resampling.LANCZOS)
+        for key, image_format, ext, options in (
+                ('webp', 'WEBP', 'webp', {'quality': WEBP_QUALITY}),
+                ('fallback', fallback_format, fallback_ext,
+                 {'quality': JPEG_QUALITY, 'optimize': True}),
+        ):
+            buffer = BytesIO()
+            resized.save(buffer, image_format, **options)
+            saved_name = storage.save(
+                f'{stem}_{width}w.{ext}', ContentFile(buffer.getvalue()))
+            data[key].append([saved_name, width])
+    return data
+
+
+def rendition_names(data):
+    """Имена файлов всех копий, описанных в data."""
+    return {
+        name for key in ('webp', 'fallback') for name, _ in data.get(key, ())
+    }
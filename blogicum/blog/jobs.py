@@ -0,0 +1,103 @@
+"""Очередь фоновых задач в БД, без внешнего брокера.
+
+Задача ставится в очередь через enqueue() — в той же транзакции, что и
+изменения, которые её породили (для этого они должны идти внутри
+transaction.atomic()), — и выполняется командой
+`manage.py run_worker`. Несколько воркеров могут работать одновременно:
+задачу забирает тот, чей условный UPDATE сработал первым.
+"""
+from datetime import timedelta
+
+from django.db.models import F, Q
+from django.utils import timezone
+
+from blog.models import Job, Post
+from blog.service import update_renditions
+from constants import JOB_MAX_ATTEMPTS, JOB_RETRY_DELAY, JOB_STALE_TIMEOUT
+
+HANDLERS = {}
+
+
+def handler(kind):
+    """Зарегистрировать обработчик задач типа kind."""
+    def decorator(func):
+        HANDLERS[kind] = func
+        return func
+    return decorator
+
+
+def enqueue(kind, **payload):
+    return Job.objects.create(kind=kind, payload=payload)
+
+
+def claim_job():
+    """Забрать следующую готовую задачу или вернуть None.
+
+    Готовы задачи в очереди, у которых наступил run_after, и задачи,
+    зависшие в выполнении дольше JOB_STALE_TIMEOUT (воркер упал).
+    """
+    now = timezone.now()
+    ready = Job.objects.filter(
+        Q(status=Job.PENDING, run_after__lte=now)
+        | Q(status=Job.RUNNING,
+            started_at__lt=now - timedelta(seconds=JOB_STALE_TIMEOUT)))
+    while (job := ready.first()) is not None:
+        claimed = Job.objects.filter(
+            pk=job.pk, status=job.status, attempts=job.attempts,
+        ).update(status=Job.RUNNING, started_at=now,
+                 attempts=F('attempts') + 1)
+        if claimed:
+            job.status, job.started_at = Job.RUNNING, now
+            job.attempts += 1
+            return job
+    return None
+
+
+def run_job(job):
+    """Выполнить задачу и записать результат.
+
+    Упавшая задача возвращается в очередь с экспоненциальной задержкой,
+    после JOB_MAX_ATTEMPTS попыток она помечается ошибочной.
+    """
+    try:
+        HANDLERS[job.kind](**job.payload)
+    except Exception as error:
+        job.last_error = f'{type(error).__name__}: {error}'
+        if job.attempts >= JOB_MAX_ATTEMPTS:
+            job.status = Job.FAILED
+        else:
+            job.status = Job.PENDING
+            job.run_after = timezone.now() + timedelta(
+                seconds=JOB_RETRY_DELAY * 2 ** (job.attempts - 1))
+    else:
+        job.status = Job.DONE
+        job.last_error = ''
+    job.save(update_fields=('status', 'run_after', 'last_error'))
+    return job
+
+
+def run_pending(limit=None):
+    """Выполнять готовые задачи, пока они есть (не больше limit).
+
+    Возвращает список выполненных задач.
+    """
+    jobs = []
+    while limit is None or len(jobs) < limit:
+        job = claim_job()
+        if job is None:
+            break
+        jobs.append(run_job(job))
+    return jobs
+
+
+@handler('renditions')
+def make_post_renditions(post_id):
+    """Создать копии изображения поста; удалённый пост пропускается.
+
+    Пока задача работала, изображение могло смениться ещё раз, а новая
+    задача не ставится, пока эта не завершена. Поэтому копии
+    пересоздаются, пока не совпадут с текущим изображением.
+    """
+    posts = Post.objects.filter(pk=post_id)
+    while (post := posts.first()) is not None and update_renditions(post):
+        pass
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from benchmarks.scenarios import SCENARIOS
+
+
+class Command(BaseCommand):
+    help = ('Замеряет производительность на синтетических данных. '
+            'Данные создаются в транзакции, которая затем откатывается.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('scenario', choices=sorted(SCENARIOS))
+        parser.add_argument(
+            '--size', type=int,
+            help='Объём синтетических данных (по умолчанию свой у сценария).')
+        parser.add_argument(
+            '--repeat', type=int, default=5,
+            help='Сколько раз повторять каждый замер.')
+
+    def handle(self, *args, **options):
+        run = SCENARIOS[options['scenario']]
+        size = options['size'] or run.default_size
+        self.stdout.write(f'{options["scenario"]}: {run.__doc__} '
+                          f'(размер {size})')
+        with transaction.atomic():
+            for line in run(size=size, repeat=options['repeat']):
+                self.stdout.write(line)
+            transaction.set_rollback(True)
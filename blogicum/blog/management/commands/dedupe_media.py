@@ -0,0 +1,85 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from blog.images import rendition_names
+from blog.jobs import enqueue
+from blog.models import Post
+from blog.service import recently_written, release_files
+from blog.storage import post_image_storage
+
+
+class Command(BaseCommand):
+    help = ('Переносит изображения постов в хранилище по содержимому: '
+            'одинаковые файлы сливаются в один.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--delete-orphans', action='store_true',
+            help='Удалить файлы, на которые не ссылается ни один пост.')
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать, что будет сделано.')
+
+    def handle(self, *args, **options):
+        storage = post_image_storage()
+        names = (
+            Post.objects.exclude(image='').order_by('image')
+            .values_list('image', flat=True).distinct()
+        )
+        moved, merged, freed = 0, set(), 0
+        for name in names.iterator():
+            if storage.is_content_name(name):
+                continue
+            if not storage.exists(name):
+                self.stderr.write(f'Нет файла: {name}')
+                continue
+            if options['dry_run']:
+                self.stdout.write(f'{name}: будет перенесён')
+                continue
+            size = storage.size(name)
+            with storage.open(name) as file:
+                new_name = storage.save(name, file)
+            self.move_posts(storage, name, new_name)
+            moved += 1
+            if new_name in merged:
+                freed += size
+            merged.add(new_name)
+            self.stdout.write(f'{name} -> {new_name}')
+        if options['delete_orphans']:
+            freed += self.delete_orphans(storage, options['dry_run'])
+        self.stdout.write(
+            f'Перенесено файлов: {moved}, уникальных: {len(merged)}, '
+            f'освобождено {freed / 2**20:.1f} МБ.')
+
+    @staticmethod
+    def move_posts(storage, name, new_name):
+        """Перевести посты на новое имя и пересоздать их копии."""
+        with transaction.atomic():
+            post_ids = list(
+                Post.objects.filter(image=name).values_list('id', flat=True))
+            Post.objects.filter(id__in=post_ids).update(
+                image=new_name, updated_at=timezone.now())
+            for post_id in post_ids:
+                enqueue('renditions', post_id=post_id)
+            release_files(storage, [name])
+
+    def delete_orphans(self, storage, dry_run):
+        """Удалить файлы каталога изображений, не нужные ни одному посту."""
+        directory = Post._meta.get_field('image').upload_to
+        used = set()
+        for image, renditions in Post.objects.values_list(
+                'image', 'image_renditions').iterator():
+            used.add(image)
+            used |= rendition_names(renditions)
+        freed = 0
+        for filename in storage.listdir(directory)[1]:
+            name = f'{directory}/{filename}'
+            if (filename.startswith('.') or name in used
+                    or recently_written(storage, name)):
+                continue
+            freed += storage.size(name)
+            self.stdout.write(f'{name}: не используется, удаляется')
+            if not dry_run:
+                storage.delete(name)
+        return freed
@@ -0,0 +1,32 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from blog.transfer import export_lines
+
+
+class Command(BaseCommand):
+    help = ('Выгружает категории, местоположения, посты и комментарии '
+            'в JSON Lines для команды import_blog.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '-o', '--output',
+            help='Файл для выгрузки (по умолчанию стандартный вывод).')
+        parser.add_argument(
+            '--batch-size', type=int, default=2000,
+            help='Сколько строк читать из БД за раз.')
+
+    def handle(self, *args, **options):
+        output = (
+            open(options['output'], 'w', encoding='utf-8')
+            if options['output'] else sys.stdout)
+        count = 0
+        try:
+            for line in export_lines(options['batch_size']):
+                output.write(line + '\n')
+                count += 1
+        finally:
+            if output is not sys.stdout:
+                output.close()
+        self.stderr.write(f'Выгружено объектов: {count}')
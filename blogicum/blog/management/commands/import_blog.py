@@ -0,0 +1,38 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from blog.transfer import FIELDS, Importer, TransferError
+
+
+class Command(BaseCommand):
+    help = ('Загружает JSON Lines от export_blog или '
+            '`dumpdata --format jsonl` пачками через bulk_create().')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', help='Файл .jsonl; "-" — стандартный ввод.')
+        parser.add_argument(
+            '--batch-size', type=int, default=2000,
+            help='Сколько объектов сохранять в одной транзакции.')
+
+    def handle(self, *args, **options):
+        importer = Importer(options['batch_size'])
+        path = options['path']
+        try:
+            if path == '-':
+                importer.load(sys.stdin)
+            else:
+                with open(path, encoding='utf-8') as lines:
+                    importer.load_users(lines)
+                    lines.seek(0)
+                    importer.load(lines, models=set(FIELDS))
+            importer.finish()
+        except (OSError, TransferError) as error:
+            raise CommandError(error)
+        for label in sorted(importer.created | importer.updated):
+            self.stdout.write(
+                f'{label}: создано {importer.created[label]}, '
+                f'обновлено {importer.updated[label]}')
+        for label, count in sorted(importer.skipped.items()):
+            self.stdout.write(f'{label}: пропущено {count}')
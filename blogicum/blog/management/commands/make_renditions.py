@@ -0,0 +1,62 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.core.management.base import BaseCommand
+
+from blog.images import make_renditions
+from blog.models import Post
+from blog.service import set_renditions
+
+
+def render_post_image(name):
+    """Создать копии в процессе пула; ошибка не останавливает команду.
+
+    Процессы пула не обращаются к БД: описание копий сохраняет
+    основной процесс.
+    """
+    try:
+        return make_renditions(name), None
+    except (OSError, ValueError) as error:
+        return None, str(error)
+
+
+class Command(BaseCommand):
+    help = ('Создаёт уменьшенные копии изображений постов, у которых '
+            'их ещё нет. Изображения обрабатываются в пуле процессов.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count(),
+            help='Число процессов (по умолчанию — число ядер).')
+        parser.add_argument(
+            '--batch-size', type=int, default=100,
+            help='Сколько изображений отдавать пулу за раз.')
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Пересоздать копии и у постов, где они уже есть.')
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image='').only(
+            'id', 'image', 'image_renditions').order_by('id')
+        if not options['force']:
+            posts = posts.filter(image_renditions={})
+        batch_size = options['batch_size']
+        done = failed = 0
+        last_id = 0
+        with ProcessPoolExecutor(
+                options['workers'], initializer=django.setup) as pool:
+            while batch := list(posts.filter(id__gt=last_id)[:batch_size]):
+                last_id = batch[-1].id
+                results = pool.map(
+                    render_post_image, [post.image.name for post in batch])
+                for post, (renditions, error) in zip(batch, results):
+                    if error is not None:
+                        failed += 1
+                        self.stderr.write(f'Пост {post.id}: {error}')
+                        continue
+                    set_renditions(post, renditions)
+                    done += 1
+                self.stdout.write(f'Обработано изображений: {done}')
+        self.stdout.write(
+            f'Готово: копии созданы для {done}, ошибок {failed}.')
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from blog.scheduler import scheduler
+
+
+class Command(BaseCommand):
+    help = ('Рассылает post_became_visible для отложенных постов, '
+            'время публикации которых наступило. Для запуска по cron.')
+
+    def handle(self, *args, **options):
+        posts = scheduler.check()
+        self.stdout.write(f'Опубликовано постов: {len(posts)}')
+        next_pub_date = scheduler.next_publication()
+        if next_pub_date is not None:
+            self.stdout.write(f'Следующая публикация: {next_pub_date}')
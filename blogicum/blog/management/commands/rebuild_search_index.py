@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from blog.cache import invalidate_tags
+from blog.search import get_backend
+
+
+class Command(BaseCommand):
+    help = ('Заново строит поисковый индекс постов и комментариев, '
+            'например после bulk_create() или загрузки дампа.')
+
+    def handle(self, *args, **options):
+        backend = get_backend()
+        with transaction.atomic():
+            backend.rebuild()
+        invalidate_tags('posts')
+        self.stdout.write(f'Индекс перестроен: {type(backend).__name__}')
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max
+
+from blog.models import Post
+from blog.service import recount_comments
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает и исправляет Post.comment_count.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=10_000,
+            help='Сколько постов пересчитывать в одной транзакции.')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        last_id = Post.objects.aggregate(last_id=Max('id'))['last_id'] or 0
+        fixed = 0
+        for start in range(0, last_id, batch_size):
+            with transaction.atomic():
+                fixed += recount_comments(Post.objects.filter(
+                    id__gt=start, id__lte=start + batch_size))
+        self.stdout.write(f'Исправлено счётчиков: {fixed}')
@@ -0,0 +1,51 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from blog.jobs import claim_job, run_job
+from blog.models import Job
+
+
+class Command(BaseCommand):
+    help = 'Выполняет фоновые задачи из очереди (см. blog.jobs).'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Выполнить готовые задачи и завершиться.')
+        parser.add_argument(
+            '--sleep', type=float, default=1.0,
+            help='Сколько секунд ждать новых задач, когда очередь пуста.')
+
+    def handle(self, *args, **options):
+        done = failed = 0
+        try:
+            while True:
+                job = claim_job()
+                if job is None:
+                    if options['once']:
+                        break
+                    time.sleep(options['sleep'])
+                    continue
+                run_job(job)
+                if job.status == Job.DONE:
+                    done += 1
+                else:
+                    failed += 1
+                self.stdout.write(self.describe(job))
+        except KeyboardInterrupt:
+            pass
+        waiting = Job.objects.filter(status=Job.PENDING).count()
+        self.stdout.write(
+            f'Выполнено задач: {done}, с ошибкой: {failed}, '
+            f'ждут повтора или очереди: {waiting}.')
+
+    @staticmethod
+    def describe(job):
+        line = (f'#{job.pk} {job.kind} {job.payload}: '
+                f'{job.get_status_display()}')
+        if job.status == Job.PENDING:
+            line += f', повтор после {job.run_after:%H:%M:%S}'
+        if job.last_error:
+            line += f' (попытка {job.attempts}: {job.last_error})'
+        return line
@@ -0,0 +1,51 @@
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.utils.decorators import sync_and_async_middleware
+
+from blog.routers import PRIMARY_COOKIE, SAFE_METHODS
+from blog.scheduler import scheduler
+
+
+@sync_and_async_middleware
+def publication_scheduler_middleware(get_response):
+    """Проверяет, не наступило ли время отложенной публикации.
+
+    Пока время не наступило, проверка стоит одного обращения к кешу.
+    """
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            await scheduler.acheck()
+            return await get_response(request)
+    else:
+        def middleware(request):
+            scheduler.check()
+            return get_response(request)
+
+    return middleware
+
+
+def set_primary_cookie(request, response):
+    if (settings.BLOG_READ_REPLICA is not None
+            and request.method not in SAFE_METHODS):
+        response.set_cookie(
+            PRIMARY_COOKIE, '1', max_age=settings.BLOG_REPLICA_LAG,
+            httponly=True, samesite='Lax')
+    return response
+
+
+@sync_and_async_middleware
+def replica_middleware(get_response):
+    """После изменяющего запроса читает данные пользователя из основной БД.
+
+    Ставит cookie на BLOG_REPLICA_LAG секунд: пока она есть,
+    ReplicaReadMixin не уводит запросы пользователя в реплику, которая
+    ещё могла не получить его изменения.
+    """
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            return set_primary_cookie(request, await get_response(request))
+    else:
+        def middleware(request):
+            return set_primary_cookie(request, get_response(request))
+
+    return middleware
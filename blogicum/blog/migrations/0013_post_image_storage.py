@@ -0,0 +1,20 @@
+# Generated by Django 5.1.1 on 2026-10-17 06:14
+
+from django.db import migrations, models
+
+import blog.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0012_job'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='post',
+            name='image',
+            field=models.ImageField(blank=True, storage=blog.storage.post_image_storage, upload_to='post_images', verbose_name='Изображение'),
+        ),
+    ]
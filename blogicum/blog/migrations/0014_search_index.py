@@ -0,0 +1,39 @@
+from django.db import migrations
+
+# Таблицы индекса хранят собственную копию текста: так документы можно
+# обрабатывать перед индексацией. rowid совпадает с id поста/комментария.
+CREATE_TABLES = (
+    "CREATE VIRTUAL TABLE blog_post_search USING fts5("
+    "title, text, tokenize = 'unicode61 remove_diacritics 2')",
+    "CREATE VIRTUAL TABLE blog_comment_search USING fts5("
+    "text, tokenize = 'unicode61 remove_diacritics 2')",
+    "INSERT INTO blog_post_search (rowid, title, text) "
+    "SELECT id, title, text FROM blog_post",
+    "INSERT INTO blog_comment_search (rowid, text) "
+    "SELECT id, text FROM blog_comment",
+)
+DROP_TABLES = (
+    'DROP TABLE blog_post_search',
+    'DROP TABLE blog_comment_search',
+)
+
+
+def run_on_sqlite(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0013_post_image_storage'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run_on_sqlite(CREATE_TABLES), run_on_sqlite(DROP_TABLES)),
+    ]
@@ -0,0 +1,103 @@
+import re
+import unicodedata
+
+import snowballstemmer
+from django.db import migrations
+
+ANALYZE_FUNCTION = 'blog_search_analyze'
+
+# Анализатор на момент миграции: копия blog.search.analyzers.
+# RussianAnalyzer. Миграция не импортирует живой код, чтобы его
+# изменения не меняли то, что она делает; после изменения анализатора
+# индекс перестраивает команда `manage.py rebuild_search_index`.
+WORD = re.compile(r'[^\W_]+')
+COMBINING_BREVE = '\u0306'
+RUSSIAN_STOP_WORDS = frozenset('''
+    а без бы был была были было быть в вам вас весь во вот все всего
+    всех вы где да даже для до его ее ей ему если есть еще же за зачем
+    здесь и из или им их к как какая какой когда кто ли либо между меня
+    мне мной мы на над нас наш не него нее ней нем ни нибудь них но ну о
+    об однако он она они оно от перед по под при про с свой себе себя
+    со так также там тем то тоже того той только том ту тут ты у уж уже
+    чем что чтобы чтоб чье эта эти это этого этой этом этот эту я
+'''.split())
+
+
+def strip_diacritics(text):
+    decomposed = unicodedata.normalize('NFD', text)
+    kept = []
+    for char in decomposed:
+        if unicodedata.combining(char) and not (
+                char == COMBINING_BREVE and kept and kept[-1] in 'иИ'):
+            continue
+        kept.append(char)
+    return unicodedata.normalize('NFC', ''.join(kept))
+
+
+def make_analyze():
+    stemmer = snowballstemmer.stemmer('russian')
+
+    def analyze(text):
+        words = WORD.findall(strip_diacritics(text.lower()))
+        return ' '.join(
+            stemmer.stemWord(word) for word in words
+            if word not in RUSSIAN_STOP_WORDS)
+    return analyze
+# Таблица индекса, таблица модели и её столбцы в индексе.
+INDEXES = (
+    ('blog_post_search', 'blog_post', ('title', 'text')),
+    ('blog_comment_search', 'blog_comment', ('text',)),
+)
+
+
+def reindex(schema_editor, table, source, columns, analyze):
+    """Заполнить индекс заново текстом, обработанным функцией analyze."""
+    values = ', '.join(
+        f'{analyze}({column})' if analyze else column for column in columns)
+    schema_editor.execute(f'DELETE FROM {table}')
+    schema_editor.execute(
+        f'INSERT INTO {table} (rowid, {", ".join(columns)}) '
+        f'SELECT id, {values} FROM {source}')
+
+
+def add_analyzer(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.connection.connection.create_function(
+        ANALYZE_FUNCTION, 1, make_analyze(), deterministic=True)
+    for table, source, columns in INDEXES:
+        reindex(schema_editor, table, source, columns, ANALYZE_FUNCTION)
+        # fts5vocab считает документы на лету, обходя индекс; таблица
+        # _terms хранит готовые числа, а строка '' — число документов.
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE {table}_vocab "
+            f"USING fts5vocab({table}, 'row')")
+        schema_editor.execute(
+            f'CREATE TABLE {table}_terms ('
+            'term TEXT PRIMARY KEY, docs INTEGER NOT NULL) WITHOUT ROWID')
+        schema_editor.execute(
+            f'INSERT INTO {table}_terms (term, docs) '
+            f'SELECT term, doc FROM {table}_vocab')
+        schema_editor.execute(
+            f"INSERT INTO {table}_terms (term, docs) "
+            f"SELECT '', count(*) FROM {table}")
+
+
+def remove_analyzer(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for table, source, columns in INDEXES:
+        schema_editor.execute(f'DROP TABLE {table}_terms')
+        schema_editor.execute(f'DROP TABLE {table}_vocab')
+        reindex(schema_editor, table, source, columns, None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0014_search_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_analyzer, remove_analyzer),
+    ]
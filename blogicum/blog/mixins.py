@@ -1,10 +1,39 @@
 
+from django.conf import settings
+from django.http import HttpResponse
 from django.shortcuts import redirect
+from django.utils.cache import (get_conditional_response, patch_cache_control,
+                                patch_vary_headers, set_response_etag)
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
 
+from blog.cache import cache_page, get_cached_page, replica_may_be_stale
+from blog.forms import PostForm
 from blog.models import Post
+from blog.routers import read_from, replica_for
+from blog.uploads import ImageUploadHandler
 
 
-class PostCheckMixin:
+class ObjectMemoMixin:
+    """Mixin, который запоминает объекты на время одного запроса.
+
+    Экземпляр представления создаётся заново на каждый запрос, поэтому
+    память живёт ровно один запрос. get_object() сохраняется в ней:
+    повторные вызовы (например, из dispatch() и из get()) не ходят в БД.
+    """
+
+    def memo(self, key, factory):
+        memo = self.__dict__.setdefault('_memo', {})
+        if key not in memo:
+            memo[key] = factory()
+        return memo[key]
+
+    def get_object(self, queryset=None):
+        if queryset is not None:
+            return super().get_object(queryset)
+        return self.memo('object', super().get_object)
+
+
+class PostCheckMixin(ObjectMemoMixin):
     """Mixin для проверки прав доступа к посту."""
 
     pk_url_kwarg = 'post_id'
@@ -12,7 +41,7 @@ class PostCheckMixin:
 
     def dispatch(self, request, *args, **kwargs):
         self.object = self.get_object()
-        if self.object.author != request.user:
+        if self.object.author_id != request.user.id:
             return redirect('blog:post_detail', self.kwargs['post_id'])
         return super().dispatch(request, *args, **kwargs)
 
@@ -21,3 +50,89 @@ class PostMixin:
     """Mixin для модели Post."""
 
     model = Post
+
+
+class PostFormMixin:
+    """Mixin для PostForm: принимает изображение через ImageUploadHandler
+    и передаёт форме ошибки его загрузки.
+
+    Обработчики загрузки заменяются только до первого чтения
+    request.POST, а CsrfViewMiddleware читает его ещё до представления.
+    Поэтому middleware CSRF не проверяет эти страницы, а проверка
+    делается в dispatch() после замены обработчиков.
+    """
+
+    form_class = PostForm
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    def dispatch(self, request, *args, **kwargs):
+        request.upload_handlers = [ImageUploadHandler(request)]
+        return csrf_protect(super().dispatch)(request, *args, **kwargs)
+
+    def get_form_kwargs(self):
+        kwargs = super().get_form_kwargs()
+        kwargs['upload_errors'] = getattr(self.request, 'upload_errors', None)
+        return kwargs
+
+
+class AnonymousCacheMixin:
+    """Mixin, который кеширует страницу целиком для анонимных посетителей.
+
+    Страница помечается тегами из get_cache_tags() и сбрасывается, когда
+    сигналы моделей сбрасывают любой из них. Авторизованным пользователям
+    всегда отдаётся свежая страница.
+    """
+
+    def get_cache_tags(self):
+        return ['posts']
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return super().dispatch(request, *args, **kwargs)
+        if request.user.is_authenticated:
+            response = super().dispatch(request, *args, **kwargs)
+            patch_cache_control(response, private=True)
+        else:
+            response = self.get_anonymous_response(
+                request, *args, **kwargs)
+            set_response_etag(response)
+            response = get_conditional_response(
+                request, etag=response.get('ETag'), response=response)
+        patch_vary_headers(response, ('Cookie',))
+        return response
+
+    def get_anonymous_response(self, request, *args, **kwargs):
+        cached = get_cached_page(request)
+        if cached is not None:
+            return HttpResponse(
+                cached['content'], content_type=cached['content_type'])
+        response = super().dispatch(request, *args, **kwargs)
+        if response.status_code == 200:
+            response.render()
+            if replica_may_be_stale():
+                return response
+            cache_page(request, response, self.get_cache_tags(),
+                       settings.BLOG_PAGE_CACHE_TIMEOUT)
+        return response
+
+
+class ReplicaReadMixin:
+    """Mixin, который читает данные страницы из реплики (см. blog.routers).
+
+    Шаблон отрисовывается тоже внутри read_from(): запросы из шаблона
+    идут в ту же базу, что и запросы представления. В списке базовых
+    классов должен стоять перед AnonymousCacheMixin.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        alias = replica_for(request)
+        if alias is None:
+            return super().dispatch(request, *args, **kwargs)
+        with read_from(alias):
+            response = super().dispatch(request, *args, **kwargs)
+            if not getattr(response, 'is_rendered', True):
+                response.render()
+        return response
@@ -1,6 +1,9 @@
 from django.contrib.auth.models import User
-from django.db import models
+from django.db import models, transaction
+from django.utils import timezone
 
+from blog.images import Renditions
+from blog.storage import post_image_storage
 from constants import SLUG_LENGTH, TEXT_LENGTH, TITLE_LENGTH
 
 
@@ -77,7 +80,8 @@ class Post(PublishedModel, TitleModel, AuthorModel):
         help_text=('Если установить дату и время '
                    'в будущем — можно делать отложенные публикации.'))
     image = models.ImageField(
-        'Изображение', upload_to='post_images', blank=True
+        'Изображение', upload_to='post_images', blank=True,
+        storage=post_image_storage,
     )
     location = models.ForeignKey(
         Location,
@@ -92,20 +96,66 @@ class Post(PublishedModel, TitleModel, AuthorModel):
         null=True,
         verbose_name='Категория'
     )
+    comment_count = models.PositiveIntegerField(
+        'Число комментариев', default=0, editable=False)
+    updated_at = models.DateTimeField('Изменено', auto_now=True)
+    image_renditions = models.JSONField(
+        'Копии изображения', default=dict, blank=True, editable=False)
 
     class Meta:
         default_related_name = 'posts'
         verbose_name = 'публикация'
         verbose_name_plural = 'Публикации'
         ordering = ('-pub_date',)
-
-    # @property
-    # def comment_count(self):
-    #     return self.comments.count()
+        indexes = (
+            models.Index(
+                fields=('-pub_date', '-id'), name='post_feed_idx',
+                condition=models.Q(is_published=True)),
+            models.Index(
+                fields=('category', '-pub_date', '-id'),
+                name='post_category_feed_idx',
+                condition=models.Q(is_published=True)),
+            models.Index(
+                fields=('author', '-pub_date', '-id'),
+                name='post_author_feed_idx'),
+        )
 
     def __str__(self):
         return f'{self.author} {self.title[:15]}'
 
+    def save(self, *args, **kwargs):
+        """Сохранить пост, не перезаписывая comment_count.
+
+        Счётчик меняют только атомарные UPDATE из blog.signals; значение
+        в памяти могло устареть, и полное сохранение затёрло бы
+        комментарий, добавленный тем временем. Явно переданные
+        update_fields сохраняются как есть.
+
+        Пост и всё, что пишут обработчики post_save (задача на копии
+        изображения), сохраняются в одной транзакции; кеш они сбрасывают
+        после её фиксации.
+        """
+        if (kwargs.get('update_fields') is None and not self._state.adding
+                and not kwargs.get('force_insert')
+                and self.pk is not None):
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.attname not in deferred
+                and field.name != 'comment_count'
+            ]
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+
+    @property
+    def renditions(self):
+        """Уменьшенные копии изображения или None, если их ещё нет."""
+        if not self.image or (
+                self.image_renditions.get('source') != self.image.name):
+            return None
+        return Renditions(self.image_renditions, self.image.storage)
+
 
 class Comment(AuthorModel):
     text = models.TextField('Текст комментария', max_length=TEXT_LENGTH,)
@@ -121,6 +171,52 @@ class Comment(AuthorModel):
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
         ordering = ('created_at',)
+        indexes = (
+            models.Index(
+                fields=('post', 'created_at'), name='comment_post_idx'),
+        )
 
     def __str__(self):
         return f'{self.post} {self.text[:15]}'
+
+
+class Job(models.Model):
+    """Фоновая задача в очереди, которую выполняет `manage.py run_worker`.
+
+    kind — имя обработчика из blog.jobs, payload — его аргументы.
+    Неудачная задача возвращается в очередь с задержкой run_after,
+    пока не исчерпает попытки.
+    """
+
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (PENDING, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Выполнена'),
+        (FAILED, 'Ошибка'),
+    )
+
+    kind = models.CharField('Тип', max_length=64)
+    payload = models.JSONField('Аргументы', default=dict, blank=True)
+    status = models.CharField(
+        'Состояние', max_length=16, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField('Попыток', default=0)
+    run_after = models.DateTimeField('Выполнить после', default=timezone.now)
+    started_at = models.DateTimeField('Начата', null=True, blank=True)
+    last_error = models.TextField('Последняя ошибка', blank=True)
+    created_at = models.DateTimeField('Создана', auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'фоновая задача'
+        verbose_name_plural = 'Фоновые задачи'
+        ordering = ('id',)
+        indexes = (
+            models.Index(
+                fields=('status', 'run_after'), name='job_queue_idx'),
+        )
+
+    def __str__(self):
+        return f'{self.kind} {self.payload}'
@@ -0,0 +1,164 @@
+"""Массовая модерация: публикация, перенос и удаление постов.
+
+Операции меняют выбранные строки одним UPDATE или DELETE на пачку из
+MODERATION_CHUNK_SIZE постов, а не сохраняют модели по одной. Сигналы
+при этом не срабатывают, поэтому счётчики лент, кеш страниц, поисковый
+индекс и файлы изображений обновляются здесь явно.
+
+Выборка больше MODERATION_SYNC_LIMIT постов (например, «выбрать все»
+в админке) не обрабатывается в запросе: на каждую пачку ставится
+фоновая задача blog.jobs.
+"""
+from itertools import islice
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from blog.cache import (after_commit, invalidate_choices,
+                        invalidate_feed_counts, invalidate_post_cards,
+                        invalidate_tags)
+from blog.images import rendition_names
+from blog.jobs import enqueue, handler
+from blog.models import Category, Comment, Location, Post
+from blog.scheduler import scheduler
+from blog.search import get_backend
+from blog.service import release_files
+from constants import MODERATION_CHUNK_SIZE, MODERATION_SYNC_LIMIT
+
+POST_ACTIONS = {}
+
+
+def post_action(name):
+    """Зарегистрировать операцию над пачкой постов под именем name."""
+    def decorator(func):
+        POST_ACTIONS[name] = func
+        return func
+    return decorator
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def moderate_posts(queryset, action, **options):
+    """Применить операцию action ко всем постам queryset.
+
+    Возвращает число постов и признак того, что они обрабатываются
+    в фоне.
+    """
+    post_ids = queryset.order_by('pk').values_list('pk', flat=True)
+    total = post_ids.count()
+    background = total > MODERATION_SYNC_LIMIT
+    with transaction.atomic():
+        for chunk in chunked(post_ids.iterator(MODERATION_CHUNK_SIZE),
+                             MODERATION_CHUNK_SIZE):
+            if background:
+                enqueue('moderate_posts', action=action, post_ids=chunk,
+                        **options)
+            else:
+                POST_ACTIONS[action](chunk, **options)
+    return total, background
+
+
+@handler('moderate_posts')
+def moderate_chunk(action, post_ids, **options):
+    """Обработать пачку постов из фоновой задачи."""
+    with transaction.atomic():
+        POST_ACTIONS[action](post_ids, **options)
+
+
+def post_feeds(posts):
+    """Категории и авторы постов: их ленты изменятся."""
+    return (set(posts.values_list('category_id', flat=True).distinct()),
+            set(posts.values_list('author_id', flat=True).distinct()))
+
+
+def reset_post_caches(category_ids, author_ids):
+    """Сбросить ленты и страницы, на которых были или будут посты.
+
+    Страницы постов и их комментариев помечены тегом автора, поэтому
+    теги отдельных постов не нужны: на пачку сбрасывается несколько
+    тегов лент и авторов. Вызывается через after_commit.
+    """
+    category_ids = category_ids - {None}
+    invalidate_feed_counts(category_ids, author_ids)
+    invalidate_tags(
+        'posts',
+        *(f'category:{pk}' for pk in category_ids),
+        *(f'author:{pk}' for pk in author_ids))
+    scheduler.reset()
+
+
+@post_action('publish')
+def set_published(post_ids, is_published):
+    """Опубликовать посты или снять их с публикации."""
+    posts = Post.objects.filter(pk__in=post_ids)
+    feeds = post_feeds(posts)
+    # updated_at входит в ключ кеша карточки поста.
+    posts.update(is_published=is_published, updated_at=timezone.now())
+    after_commit(reset_post_caches, *feeds)
+
+
+@post_action('move')
+def move_to_category(post_ids, category_id):
+    """Перенести посты в категорию category_id."""
+    posts = Post.objects.filter(pk__in=post_ids)
+    category_ids, author_ids = post_feeds(posts)
+    posts.update(category_id=category_id, updated_at=timezone.now())
+    after_commit(
+        reset_post_caches, category_ids | {category_id}, author_ids)
+
+
+@post_action('delete')
+def delete_with_comments(post_ids):
+    """Удалить посты вместе с комментариями и изображениями."""
+    posts = Post.objects.filter(pk__in=post_ids)
+    feeds = post_feeds(posts)
+    images = list(posts.exclude(image='').values_list(
+        'pk', 'image', 'image_renditions'))
+    get_backend().remove_posts(post_ids)
+    placeholders = ', '.join(['%s'] * len(post_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {Comment._meta.db_table} '
+            f'WHERE post_id IN ({placeholders})', post_ids)
+        cursor.execute(
+            f'DELETE FROM {Post._meta.db_table} '
+            f'WHERE id IN ({placeholders})', post_ids)
+    storage = Post._meta.get_field('image').storage
+    for pk, image, renditions in images:
+        release_files(storage, {image} | rendition_names(renditions), pk)
+    after_commit(reset_post_caches, *feeds)
+
+
+def set_categories_published(queryset, is_published):
+    """Опубликовать категории queryset или снять их с публикации."""
+    category_ids = list(queryset.values_list('pk', flat=True))
+    Category.objects.filter(pk__in=category_ids).update(
+        is_published=is_published)
+    after_commit(reset_category_caches, category_ids)
+    return len(category_ids)
+
+
+def reset_category_caches(category_ids):
+    invalidate_feed_counts(category_ids=category_ids)
+    invalidate_choices(Category)
+    invalidate_post_cards()
+    invalidate_tags('posts', *(f'category:{pk}' for pk in category_ids))
+
+
+def set_locations_published(queryset, is_published):
+    """Опубликовать местоположения queryset или снять их с публикации."""
+    location_ids = list(queryset.values_list('pk', flat=True))
+    Location.objects.filter(pk__in=location_ids).update(
+        is_published=is_published)
+    after_commit(reset_location_caches, location_ids)
+    return len(location_ids)
+
+
+def reset_location_caches(location_ids):
+    invalidate_choices(Location)
+    invalidate_post_cards()
+    invalidate_tags('posts', *(f'location:{pk}' for pk in location_ids))
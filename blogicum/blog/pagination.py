@@ -0,0 +1,269 @@
+import base64
+import binascii
+
+from django.core.cache import cache
+from django.core.paginator import Page, Paginator
+from django.db.models import Func, Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+from blog.cache import (admin_count_key, areplica_may_be_stale,
+                        replica_may_be_stale)
+from blog.scheduler import scheduler
+from constants import (ADMIN_COUNT_TIMEOUT, ADMIN_EXACT_COUNT_LIMIT,
+                       FEED_COUNT_TIMEOUT, PAGE_RANGE_ON_EACH_SIDE)
+
+
+class WindowedPage(Page):
+    """Страница, которая показывает только окно номеров вокруг текущего."""
+
+    @property
+    def elided_page_range(self):
+        return self.paginator.get_elided_page_range(
+            self.number, on_each_side=PAGE_RANGE_ON_EACH_SIDE, on_ends=1)
+
+
+class CachedCountPaginator(Paginator):
+    """Пагинатор, который берёт общее число постов ленты из кеша.
+
+    Счётчик хранится под ключом count_key и сбрасывается сигналами
+    при изменении постов и при наступлении отложенной публикации,
+    поэтому COUNT выполняется только после изменений,
+    а не на каждый запрос.
+    """
+
+    def __init__(self, object_list, per_page, count_key=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count_key = count_key
+
+    @cached_property
+    def count(self):
+        if self.count_key is None:
+            return super().count
+        count = cache.get(self.count_key)
+        if count is None:
+            count = super().count
+            if replica_may_be_stale():
+                return count
+            cache.set(self.count_key, count,
+                      scheduler.limit_timeout(FEED_COUNT_TIMEOUT))
+        return count
+
+    async def aget_page(self, number):
+        """То же, что get_page(), но запросы идут через асинхронный ORM.
+
+        Строки страницы читаются сразу: синхронный шаблон не должен
+        обращаться к БД из асинхронного кода.
+        """
+        count = None
+        if self.count_key is not None:
+            count = await cache.aget(self.count_key)
+        if count is None:
+            count = await self.object_list.acount()
+            if (self.count_key is not None
+                    and not await areplica_may_be_stale()):
+                await cache.aset(self.count_key, count,
+                                 await scheduler.alimit_timeout(
+                                     FEED_COUNT_TIMEOUT))
+        self.__dict__['count'] = count
+        page = self.get_page(number)
+        page.object_list = [obj async for obj in page.object_list]
+        return page
+
+    def _get_page(self, *args, **kwargs):
+        return WindowedPage(*args, **kwargs)
+
+
+class EstimatedCountPaginator(Paginator):
+    """Пагинатор для админки, который не считает строки больших таблиц.
+
+    Сначала строки считаются с LIMIT ADMIN_EXACT_COUNT_LIMIT + 1: для
+    небольших выборок это и есть точное число. Если строк больше, то
+    для таблицы без фильтров берётся оценка по диапазону первичного
+    ключа: два поиска по индексу вместо полного прохода. Точное число
+    строк с фильтрами считается один раз и хранится в кеше
+    ADMIN_COUNT_TIMEOUT секунд.
+
+    Если оценка сверху уже известна (estimate, например число
+    результатов поиска по статистике индекса) и она больше
+    ADMIN_EXACT_COUNT_LIMIT, строки не считаются вовсе.
+
+    Оценка не меньше настоящего числа строк, поэтому последние страницы
+    могут оказаться пустыми.
+    """
+
+    def __init__(self, object_list, per_page, estimate=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.estimate = estimate
+
+    @cached_property
+    def count(self):
+        if (self.estimate or 0) > ADMIN_EXACT_COUNT_LIMIT:
+            return self.estimate
+        queryset = self.object_list.order_by()
+        exact = queryset[:ADMIN_EXACT_COUNT_LIMIT + 1].count()
+        if exact <= ADMIN_EXACT_COUNT_LIMIT:
+            return exact
+        if not queryset.query.where:
+            return self.estimate_rows(queryset)
+        key = admin_count_key(queryset)
+        count = cache.get(key)
+        if count is None:
+            count = queryset.count()
+            cache.set(key, count, ADMIN_COUNT_TIMEOUT)
+        return count
+
+    @staticmethod
+    def estimate_rows(queryset):
+        """Оценка числа строк таблицы сверху: max(pk) - min(pk) + 1.
+
+        В SQLite нет актуальной статистики числа строк: sqlite_stat1
+        обновляется только командой ANALYZE. Минимум и максимум ищутся
+        отдельными запросами: только так SQLite берёт их из индекса.
+        """
+        pks = queryset.model._base_manager.using(queryset.db).values_list(
+            'pk', flat=True)
+        low = pks.order_by('pk').first()
+        high = pks.order_by('-pk').first()
+        return 0 if low is None else high - low + 1
+
+
+class Unindexed(Func):
+    """Значение столбца, по которому SQLite не ищет диапазон в индексе.
+
+    Унарный плюс в SQLite не меняет значение, но условие с ним не
+    используется как граница поиска по индексу. Так у запроса остаётся
+    одна граница столбца — та, которая нужна, независимо от порядка
+    условий в WHERE. В других СУБД выражение — сам столбец.
+    """
+
+    template = '%(expressions)s'
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return self.as_sql(
+            compiler, connection, template='+%(expressions)s',
+            **extra_context)
+
+
+class CursorPage:
+    """Страница, полученная по курсору."""
+
+    is_cursor = True
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """Пагинатор по ключу (поле даты, id) без OFFSET и COUNT.
+
+    По умолчанию листает ленту постов по убыванию pub_date; ordering
+    задаёт другое поле даты и направление, например 'created_at' для
+    комментариев. Курсор — непрозрачная строка, в которой закодированы
+    направление и ключ граничной записи. Стоимость запроса любой страницы
+    одинакова: условие по ключу сразу попадает в нужное место индекса.
+
+    Для этого других границ поля ordering у queryset быть не должно:
+    SQLite ищет в индексе только по одной из них. Граница ленты
+    pub_date <= now() поэтому задана через Unindexed (см. get_objects).
+    """
+
+    def __init__(self, queryset, per_page, ordering='-pub_date'):
+        self.field = ordering.lstrip('-')
+        self.descending = ordering.startswith('-')
+        self.queryset = queryset.order_by(
+            ordering, '-id' if self.descending else 'id')
+        self.per_page = per_page
+
+    def encode_cursor(self, direction, obj):
+        key = getattr(obj, self.field).isoformat()
+        raw = f'{direction}|{key}|{obj.id}'
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    @staticmethod
+    def decode_cursor(cursor):
+        """Вернуть (направление, дата, id) или None для кривого курсора."""
+        try:
+            padding = '=' * (-len(cursor) % 4)
+            raw = base64.urlsafe_b64decode(cursor + padding).decode()
+            direction, key, obj_id = raw.split('|')
+            key = parse_datetime(key)
+            obj_id = int(obj_id)
+        except (ValueError, UnicodeError, binascii.Error):
+            return None
+        if direction not in ('next', 'prev') or key is None:
+            return None
+        return direction, key, obj_id
+
+    def get_page(self, cursor):
+        queryset, key, forward = self._page_query(cursor)
+        return self._make_page(list(queryset), key, forward)
+
+    async def aget_page(self, cursor):
+        """То же, что get_page(), но строки читаются асинхронным ORM."""
+        queryset, key, forward = self._page_query(cursor)
+        return self._make_page([obj async for obj in queryset], key, forward)
+
+    def _page_query(self, cursor):
+        """Запрос строк страницы, ключ курсора и направление листания.
+
+        Запрос выбирает на одну строку больше страницы: по ней видно,
+        есть ли следующая (или предыдущая) страница.
+        """
+        decoded = self.decode_cursor(cursor) if cursor else None
+        if decoded is None:
+            return self.queryset[:self.per_page + 1], None, True
+        direction, value, obj_id = decoded
+        key = (value, obj_id)
+        forward = direction == 'next'
+        condition, bound = self._key_filter(key, forward=forward)
+        queryset = self.queryset.filter(condition, **bound)
+        if not forward:
+            queryset = queryset.reverse()
+        return queryset[:self.per_page + 1], key, forward
+
+    def _key_filter(self, key, forward):
+        """Условие «строго после key» в порядке листания (или до него)."""
+        value, obj_id = key
+        strict, inclusive = (
+            ('lt', 'lte') if self.descending == forward else ('gt', 'gte'))
+        return (
+            Q(**{f'{self.field}__{strict}': value})
+            | Q(**{f'id__{strict}': obj_id}),
+            {f'{self.field}__{inclusive}': value},
+        )
+
+    def _make_page(self, objects, key, forward):
+        has_more = len(objects) > self.per_page
+        objects = objects[:self.per_page]
+        if forward:
+            has_next, has_previous = has_more, key is not None
+        else:
+            objects = objects[::-1]
+            has_next, has_previous = True, has_more
+        next_cursor = previous_cursor = None
+        if objects and has_next:
+            next_cursor = self.encode_cursor('next', objects[-1])
+        if objects and has_previous:
+            previous_cursor = self.encode_cursor('prev', objects[0])
+        return CursorPage(objects, next_cursor, previous_cursor)
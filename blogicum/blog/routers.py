@@ -0,0 +1,67 @@
+"""Чтение из реплики БД.
+
+Страницы, которые только читают данные, помечаются ReplicaReadMixin
+(blog.mixins): на время обработки GET/HEAD-запроса ReplicaRouter
+направляет чтение в базу из настройки BLOG_READ_REPLICA. Запись всегда
+идёт в основную базу.
+
+Реплика отстаёт от основной базы не больше чем на BLOG_REPLICA_LAG
+секунд. Чтобы пользователь видел свои изменения, после любого
+изменяющего запроса replica_middleware ставит ему cookie на это время,
+и пока она есть, его запросы читают из основной базы.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PRIMARY_COOKIE = 'read_primary'
+SAFE_METHODS = ('GET', 'HEAD')
+
+_read_database = ContextVar('read_database', default=None)
+
+
+def replica_for(request):
+    """Реплика для чтения данных запроса или None — читать из основной."""
+    if (settings.BLOG_READ_REPLICA is None
+            or request.method not in SAFE_METHODS
+            or PRIMARY_COOKIE in request.COOKIES):
+        return None
+    return settings.BLOG_READ_REPLICA
+
+
+def reading_replica():
+    """Идёт ли сейчас чтение из реплики."""
+    return _read_database.get() is not None
+
+
+@contextmanager
+def read_from(alias):
+    """Направить чтение внутри блока в базу alias."""
+    token = _read_database.set(alias)
+    try:
+        yield
+    finally:
+        _read_database.reset(token)
+
+
+class ReplicaRouter:
+    """Направляет чтение в реплику внутри read_from(), запись — в основную.
+
+    Внутри транзакции основной базы чтение остаётся в ней: транзакция
+    должна видеть собственные изменения.
+    """
+
+    def db_for_read(self, model, **hints):
+        alias = _read_database.get()
+        if alias is None or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        return alias
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # В реплике те же строки, что в основной базе.
+        return True
@@ -0,0 +1,111 @@
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db.models import Min
+from django.dispatch import Signal
+from django.utils import timezone
+
+from blog.models import Post
+
+# Отправляется для каждого поста, у которого наступило время публикации.
+# Аргументы: sender=Post, post.
+post_became_visible = Signal()
+
+
+class PublicationScheduler:
+    """Следит за отложенными публикациями (pub_date в будущем).
+
+    Знает дату ближайшей публикации, чтобы кеши могли жить ровно до неё,
+    и рассылает сигнал post_became_visible, когда она наступает.
+    Дата хранится в кеше и сбрасывается при изменении постов.
+    """
+
+    NEXT_PUBLICATION_KEY = 'scheduler:next_publication'
+    LOCK_KEY = 'scheduler:published:{timestamp}'
+
+    @staticmethod
+    def _scheduled_posts():
+        return Post.objects.filter(
+            is_published=True, pub_date__gt=timezone.now())
+
+    def next_publication(self):
+        """Дата ближайшей отложенной публикации или None."""
+        cached = cache.get(self.NEXT_PUBLICATION_KEY)
+        if cached is not None:
+            return cached[0]
+        next_pub_date = self._scheduled_posts().aggregate(
+            next_pub_date=Min('pub_date'))['next_pub_date']
+        cache.set(self.NEXT_PUBLICATION_KEY, (next_pub_date,), timeout=None)
+        return next_pub_date
+
+    async def anext_publication(self):
+        """То же, что next_publication(), для асинхронного кода."""
+        cached = await cache.aget(self.NEXT_PUBLICATION_KEY)
+        if cached is not None:
+            return cached[0]
+        next_pub_date = (await self._scheduled_posts().aaggregate(
+            next_pub_date=Min('pub_date')))['next_pub_date']
+        await cache.aset(
+            self.NEXT_PUBLICATION_KEY, (next_pub_date,), timeout=None)
+        return next_pub_date
+
+    @staticmethod
+    def _limit_timeout(timeout, next_pub_date):
+        if next_pub_date is None:
+            return timeout
+        seconds = (next_pub_date - timezone.now()).total_seconds()
+        return min(timeout, max(int(seconds) + 1, 1))
+
+    def seconds_until_next(self):
+        """Секунд до ближайшей публикации (не меньше 1) или None."""
+        next_pub_date = self.next_publication()
+        if next_pub_date is None:
+            return None
+        seconds = (next_pub_date - timezone.now()).total_seconds()
+        return max(int(seconds) + 1, 1)
+
+    def limit_timeout(self, timeout):
+        """Сократить время жизни кеша до ближайшей публикации."""
+        return self._limit_timeout(timeout, self.next_publication())
+
+    async def alimit_timeout(self, timeout):
+        """То же, что limit_timeout(), для асинхронного кода."""
+        return self._limit_timeout(timeout, await self.anext_publication())
+
+    def reset(self):
+        cache.delete(self.NEXT_PUBLICATION_KEY)
+
+    def check(self):
+        """Разослать post_became_visible, если время публикации наступило.
+
+        Возвращает список опубликованных постов. Если проверку одновременно
+        выполняют несколько процессов, сигналы отправит только один.
+        """
+        next_pub_date = self.next_publication()
+        now = timezone.now()
+        if next_pub_date is None or next_pub_date > now:
+            return []
+        self.reset()
+        lock_key = self.LOCK_KEY.format(timestamp=next_pub_date.timestamp())
+        if not cache.add(lock_key, True):
+            return []
+        posts = list(Post.objects.filter(
+            is_published=True, pub_date__gte=next_pub_date,
+            pub_date__lte=now,
+        ))
+        for post in posts:
+            post_became_visible.send(sender=Post, post=post)
+        return posts
+
+    async def acheck(self):
+        """То же, что check(), для асинхронного кода.
+
+        Пока время публикации не наступило, проверка не покидает цикл
+        событий; рассылка сигналов выполняется синхронно.
+        """
+        next_pub_date = await self.anext_publication()
+        if next_pub_date is None or next_pub_date > timezone.now():
+            return []
+        return await sync_to_async(self.check)()
+
+
+scheduler = PublicationScheduler()
@@ -0,0 +1,41 @@
+"""Полнотекстовый поиск по постам и комментариям.
+
+Бэкенд задаётся настройкой BLOG_SEARCH_BACKEND (путь к классу, см.
+blog.search.backends). Если выбранный бэкенд недоступен на текущей СУБД,
+используется DatabaseSearchBackend.
+"""
+from functools import cache
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+from blog.search.backends import DatabaseSearchBackend
+
+
+@cache
+def get_backend():
+    backend_class = import_string(settings.BLOG_SEARCH_BACKEND)
+    is_available = getattr(backend_class, 'is_available', lambda: True)
+    if not is_available():
+        return DatabaseSearchBackend()
+    return backend_class()
+
+
+@receiver(setting_changed)
+def reset_backend(setting, **kwargs):
+    if setting == 'BLOG_SEARCH_BACKEND':
+        get_backend.cache_clear()
+
+
+def search_posts(queryset, query):
+    return get_backend().search_posts(queryset, query)
+
+
+def search_comments(queryset, query):
+    return get_backend().search_comments(queryset, query)
+
+
+def estimate_matches(queryset, query):
+    return get_backend().estimate_matches(queryset, query)
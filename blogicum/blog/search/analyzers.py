@@ -0,0 +1,85 @@
+"""Анализаторы текста для поискового индекса.
+
+Анализатор превращает текст в список терминов. Одним и тем же
+анализатором обрабатываются и документы перед индексацией, и запросы,
+поэтому «горах» в запросе находит «горы» в посте.
+
+Термины — слова из букв и цифр без диакритики: FTS5 с токенизатором
+unicode61 и remove_diacritics 2 разбивает на слова так же, поэтому
+термины анализатора совпадают с терминами индекса.
+"""
+import re
+import threading
+import unicodedata
+from functools import lru_cache
+
+import snowballstemmer
+
+WORD = re.compile(r'[^\W_]+')
+COMBINING_BREVE = '\u0306'
+
+# Служебные слова: местоимения, предлоги, союзы, частицы и формы
+# глагола «быть». Записаны после замены «ё» на «е».
+RUSSIAN_STOP_WORDS = frozenset('''
+    а без бы был была были было быть в вам вас весь во вот все всего
+    всех вы где да даже для до его ее ей ему если есть еще же за зачем
+    здесь и из или им их к как какая какой когда кто ли либо между меня
+    мне мной мы на над нас наш не него нее ней нем ни нибудь них но ну о
+    об однако он она они оно от перед по под при про с свой себе себя
+    со так также там тем то тоже того той только том ту тут ты у уж уже
+    чем что чтобы чтоб чье эта эти это этого этой этом этот эту я
+'''.split())
+
+_local = threading.local()
+
+
+@lru_cache(maxsize=100_000)
+def stem_russian(word):
+    """Основа слова по алгоритму Snowball.
+
+    Объекты snowballstemmer не потокобезопасны, поэтому у каждого
+    потока свой.
+    """
+    stemmer = getattr(_local, 'russian', None)
+    if stemmer is None:
+        stemmer = _local.russian = snowballstemmer.stemmer('russian')
+    return stemmer.stemWord(word)
+
+
+def strip_diacritics(text):
+    """Убрать диакритику, сохранив «й»: «ё» становится «е», «é» — «e»."""
+    decomposed = unicodedata.normalize('NFD', text)
+    kept = []
+    for char in decomposed:
+        if unicodedata.combining(char) and not (
+                char == COMBINING_BREVE and kept and kept[-1] in 'иИ'):
+            continue
+        kept.append(char)
+    return unicodedata.normalize('NFC', ''.join(kept))
+
+
+class Analyzer:
+    """Слова в нижнем регистре без диакритики."""
+
+    def words(self, text):
+        return WORD.findall(strip_diacritics(text.lower()))
+
+    def terms(self, text):
+        """Термины текста в порядке появления."""
+        return self.words(text)
+
+    def analyze(self, text):
+        """Термины через пробел — в таком виде текст хранится в индексе."""
+        return ' '.join(self.terms(text))
+
+
+class RussianAnalyzer(Analyzer):
+    """Русский текст: без служебных слов, слова сведены к основам."""
+
+    stop_words = RUSSIAN_STOP_WORDS
+
+    def terms(self, text):
+        return [
+            stem_russian(word) for word in self.words(text)
+            if word not in self.stop_words
+        ]
@@ -0,0 +1,308 @@
+"""Бэкенды полнотекстового поиска.
+
+Бэкенд хранит индекс постов и комментариев и умеет отфильтровать
+queryset по запросу, упорядочив его по релевантности. Правила видимости
+постов задаёт переданный queryset (см. blog.service.get_objects),
+поэтому поиск показывает ровно то, что видно в лентах.
+"""
+from collections import Counter
+
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.db.models import BooleanField, FloatField, Q
+from django.db.models.expressions import RawSQL
+
+from blog.models import Comment, Post
+from blog.search.analyzers import RussianAnalyzer
+from constants import SEARCH_RANK_MAX_DOCS
+
+
+class BaseSearchBackend:
+    """Интерфейс бэкенда поиска."""
+
+    analyzer = RussianAnalyzer()
+
+    def query_terms(self, query):
+        """Различные термины запроса, обработанные анализатором."""
+        return list(dict.fromkeys(self.analyzer.terms(query)))
+
+    def index_post(self, post, created=False):
+        """Добавить пост в индекс или обновить его."""
+
+    def remove_post(self, post):
+        """Убрать из индекса пост и все его комментарии."""
+        self.remove_posts([post.pk])
+
+    def remove_posts(self, post_ids):
+        """Убрать из индекса посты с id из post_ids и их комментарии."""
+
+    def index_comment(self, comment, created=False):
+        """Добавить комментарий в индекс или обновить его."""
+
+    def remove_comment(self, comment):
+        """Убрать комментарий из индекса."""
+
+    def rebuild(self):
+        """Заново проиндексировать все посты и комментарии."""
+
+    def search_posts(self, queryset, query):
+        """Посты queryset, подходящие под запрос, лучшие первыми."""
+        raise NotImplementedError
+
+    def search_comments(self, queryset, query):
+        """Комментарии queryset, подходящие под запрос, лучшие первыми."""
+        raise NotImplementedError
+
+    def estimate_matches(self, queryset, query):
+        """Оценка сверху числа результатов поиска или None, если её нет."""
+        return None
+
+
+class DatabaseSearchBackend(BaseSearchBackend):
+    """Поиск без индекса: LIKE по основам слов запроса.
+
+    Запасной вариант для СУБД без FTS5. Основа каждого слова должна
+    встретиться в заголовке или тексте; порядок — по дате публикации.
+    Текст в БД не обработан анализатором, поэтому «ё» в нём не совпадает
+    с «е» из запроса.
+    """
+
+    def search_posts(self, queryset, query):
+        terms = self.query_terms(query)
+        if not terms:
+            return queryset.none()
+        for term in terms:
+            queryset = queryset.filter(
+                Q(title__icontains=term) | Q(text__icontains=term))
+        return queryset
+
+    def search_comments(self, queryset, query):
+        terms = self.query_terms(query)
+        if not terms:
+            return queryset.none()
+        for term in terms:
+            queryset = queryset.filter(text__icontains=term)
+        return queryset
+
+
+class SQLiteSearchBackend(BaseSearchBackend):
+    """Инвертированный индекс на виртуальных таблицах SQLite FTS5.
+
+    Таблицы создают миграции 0014_search_index и 0015_search_analyzer.
+    В индекс попадает текст, обработанный анализатором, а рядом с каждой
+    таблицей FTS5 хранится статистика: в скольких документах встречается
+    каждый термин (таблица <индекс>_terms, строка с пустым термином —
+    число документов). Индекс и статистика обновляются сигналами при
+    сохранении и удалении постов и комментариев; bulk_create() и update()
+    их не обновляют — после них нужна команда
+    `manage.py rebuild_search_index`.
+
+    По статистике поиск заранее знает, сколько документов подходит:
+    если какого-то термина нет ни в одном документе, запрос к FTS5
+    не выполняется. Релевантность считается функцией bm25(), совпадение
+    в заголовке весит больше, чем в тексте. bm25() вычисляется для
+    каждого найденного документа, поэтому, если даже самый редкий термин
+    запроса встречается больше чем в SEARCH_RANK_MAX_DOCS документах,
+    результаты упорядочиваются по дате.
+    """
+
+    POST_TABLE = 'blog_post_search'
+    COMMENT_TABLE = 'blog_comment_search'
+    COLUMNS = {POST_TABLE: ('title', 'text'), COMMENT_TABLE: ('text',)}
+    # Веса столбцов title и text для bm25().
+    POST_WEIGHTS = (10.0, 1.0)
+    # Термин строки статистики, в которой хранится число документов.
+    DOCUMENTS = ''
+
+    @staticmethod
+    def is_available():
+        return connection.vendor == 'sqlite'
+
+    @staticmethod
+    def match_expression(terms):
+        """Запрос FTS5, где каждый термин — отдельная фраза в кавычках.
+
+        Так спецсимволы синтаксиса FTS5 из пользовательского ввода
+        не интерпретируются.
+        """
+        return ' '.join(f'"{term}"' for term in terms)
+
+    def execute(self, sql, params=()):
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+
+    def index_post(self, post, created=False):
+        changes = Counter()
+        if not created:
+            self._remove(self.POST_TABLE, 'rowid = %s', [post.pk], changes)
+        self._add(self.POST_TABLE, post.pk, (post.title, post.text), changes)
+        self._update_stats(self.POST_TABLE, changes)
+
+    def remove_posts(self, post_ids):
+        placeholders = ', '.join(['%s'] * len(post_ids))
+        changes = Counter()
+        self._remove(self.POST_TABLE, f'rowid IN ({placeholders})',
+                     post_ids, changes)
+        self._update_stats(self.POST_TABLE, changes)
+        changes = Counter()
+        self._remove(
+            self.COMMENT_TABLE,
+            f'rowid IN (SELECT id FROM {Comment._meta.db_table} '
+            f'WHERE post_id IN ({placeholders}))', post_ids, changes)
+        self._update_stats(self.COMMENT_TABLE, changes)
+
+    def index_comment(self, comment, created=False):
+        changes = Counter()
+        if not created:
+            self._remove(
+                self.COMMENT_TABLE, 'rowid = %s', [comment.pk], changes)
+        self._add(self.COMMENT_TABLE, comment.pk, (comment.text,), changes)
+        self._update_stats(self.COMMENT_TABLE, changes)
+
+    def remove_comment(self, comment):
+        changes = Counter()
+        self._remove(self.COMMENT_TABLE, 'rowid = %s', [comment.pk], changes)
+        self._update_stats(self.COMMENT_TABLE, changes)
+
+    def _add(self, table, rowid, values, changes):
+        values = [self.analyzer.analyze(value) for value in values]
+        columns = self.COLUMNS[table]
+        self.execute(
+            f'INSERT INTO {table} (rowid, {", ".join(columns)}) '
+            f'VALUES (%s{", %s" * len(columns)})', [rowid, *values])
+        changes.update(self._document_terms(values))
+
+    def _remove(self, table, where, params, changes):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT {", ".join(self.COLUMNS[table])} FROM {table} '
+                f'WHERE {where}', params)
+            for values in cursor.fetchall():
+                changes.subtract(self._document_terms(values))
+            cursor.execute(f'DELETE FROM {table} WHERE {where}', params)
+
+    def _document_terms(self, values):
+        """Различные термины документа и отметка о самом документе."""
+        terms = {self.DOCUMENTS}
+        for value in values:
+            terms.update(value.split())
+        return terms
+
+    @staticmethod
+    def _update_stats(table, changes):
+        # Строки с нулём остаются до rebuild(): для поиска это то же,
+        # что отсутствие термина.
+        rows = [(term, delta) for term, delta in changes.items() if delta]
+        if not rows:
+            return
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {table}_terms (term, docs) VALUES (%s, %s) '
+                'ON CONFLICT (term) DO UPDATE '
+                'SET docs = docs + excluded.docs', rows)
+
+    @property
+    def analyze_function(self):
+        """Имя SQL-функции, через которую rebuild() вызывает анализатор."""
+        return f'blog_search_{type(self.analyzer).__name__.lower()}'
+
+    def register_analyzer(self):
+        """Зарегистрировать analyze_function в текущем соединении.
+
+        Функция регистрируется один раз на соединение: заменять её, пока
+        у соединения есть незавершённые запросы, SQLite не позволяет.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT 1 FROM pragma_function_list WHERE name = %s',
+                [self.analyze_function])
+            if cursor.fetchone() is not None:
+                return
+        connection.connection.create_function(
+            self.analyze_function, 1, self.analyzer.analyze,
+            deterministic=True)
+
+    def rebuild(self):
+        self.register_analyzer()
+        for table, model in ((self.POST_TABLE, Post),
+                             (self.COMMENT_TABLE, Comment)):
+            columns = self.COLUMNS[table]
+            analyzed = ', '.join(
+                f'{self.analyze_function}({column})' for column in columns)
+            self.execute(f'DELETE FROM {table}')
+            self.execute(
+                f'INSERT INTO {table} (rowid, {", ".join(columns)}) '
+                f'SELECT id, {analyzed} FROM {model._meta.db_table}')
+            self.execute(f"INSERT INTO {table} ({table}) VALUES ('optimize')")
+            self.execute(f'DELETE FROM {table}_terms')
+            self.execute(
+                f'INSERT INTO {table}_terms (term, docs) '
+                f'SELECT term, doc FROM {table}_vocab')
+            self.execute(
+                f'INSERT INTO {table}_terms (term, docs) '
+                f'SELECT %s, count(*) FROM {table}', [self.DOCUMENTS])
+
+    def term_docs(self, table, terms, using=DEFAULT_DB_ALIAS):
+        """Число документов индекса table с каждым из терминов в базе using."""
+        placeholders = ', '.join(['%s'] * len(terms))
+        with connections[using].cursor() as cursor:
+            cursor.execute(
+                f'SELECT term, docs FROM {table}_terms '
+                f'WHERE term IN ({placeholders})', terms)
+            docs = dict(cursor.fetchall())
+        return {term: docs.get(term, 0) for term in terms}
+
+    def estimate_matches(self, queryset, query):
+        """Число документов с самым редким термином запроса.
+
+        Фильтры queryset не учитываются, поэтому это оценка сверху.
+        """
+        terms = self.query_terms(query)
+        if not terms:
+            return 0
+        table = (self.POST_TABLE if queryset.model is Post
+                 else self.COMMENT_TABLE)
+        return max(0, min(self.term_docs(table, terms, queryset.db).values()))
+
+    def search_posts(self, queryset, query):
+        weights = ', '.join(map(str, self.POST_WEIGHTS))
+        return self._search(
+            queryset, query, self.POST_TABLE,
+            f'bm25({self.POST_TABLE}, {weights})', ('-pub_date', '-id'))
+
+    def search_comments(self, queryset, query):
+        return self._search(
+            queryset, query, self.COMMENT_TABLE,
+            f'bm25({self.COMMENT_TABLE})', ('-created_at', '-id'))
+
+    def _search(self, queryset, query, table, rank, ordering):
+        terms = self.query_terms(query)
+        if not terms:
+            return queryset.none()
+        # Статистика читается из той же базы (или реплики), что и queryset.
+        matches = min(self.term_docs(table, terms, queryset.db).values())
+        if matches <= 0:
+            return queryset.none()
+        match = self.match_expression(terms)
+        model_table = queryset.model._meta.db_table
+        if matches > SEARCH_RANK_MAX_DOCS:
+            # Посты перебираются по дате, и для каждого FTS5 проверяет
+            # совпадение по rowid: частый запрос набирает страницу быстро.
+            return queryset.filter(RawSQL(
+                f'EXISTS (SELECT 1 FROM {table} WHERE {table} MATCH %s '
+                f'AND {table}.rowid = {model_table}.id)', [match],
+                output_field=BooleanField(),
+            )).order_by(*ordering)
+        # FTS5 сначала находит строки индекса по MATCH, затем строки
+        # модели выбираются по первичному ключу. Релевантность считается
+        # одним проходом MATCH: bm25() в подзапросе на каждую строку
+        # заново читал бы весь список документов термина. MATERIALIZED
+        # не даёт SQLite встроить CTE в коррелированный подзапрос, и
+        # таблица рангов строится один раз на запрос.
+        return queryset.filter(pk__in=RawSQL(
+            f'SELECT rowid FROM {table} WHERE {table} MATCH %s', [match],
+        )).annotate(search_rank=RawSQL(
+            f'WITH ranks AS MATERIALIZED (SELECT rowid AS id, {rank} AS rank '
+            f'FROM {table} WHERE {table} MATCH %s) '
+            f'SELECT rank FROM ranks WHERE ranks.id = {model_table}.id',
+            [match], output_field=FloatField(),
+        )).order_by('search_rank', *ordering)
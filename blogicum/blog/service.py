@@ -1,24 +1,50 @@
-from django.db.models import Count
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce, Left
+from django.db.models.lookups import LessThanOrEqual
 from django.http import Http404
 from django.shortcuts import get_object_or_404, render
 from django.utils import timezone
-from django.core.paginator import Paginator
 
+from blog.cache import invalidate_tags
+from blog.images import make_renditions, rendition_names
 from blog.models import Comment, Post
-from constants import PAGINATE_COUNT
+from blog.pagination import CachedCountPaginator, CursorPaginator, Unindexed
+from constants import (COMMENTS_PAGINATE_COUNT, FEED_TEXT_LENGTH,
+                       IMAGE_RELEASE_GRACE, PAGINATE_COUNT)
 
 
-def paginate_queryset(queryset, request, paginate_count=PAGINATE_COUNT):
-    """Функция для пагинации переданного queryset."""
-    paginator = Paginator(queryset, paginate_count)
+def paginate_queryset(queryset, request, paginate_count=PAGINATE_COUNT,
+                      count_key=None):
+    """Функция для пагинации переданного queryset.
+
+    Если включена настройка BLOG_CURSOR_PAGINATION, лента листается
+    по курсору (?cursor=) вместо номера страницы. Иначе общее число
+    постов берётся из кеша под ключом count_key (см. blog.cache).
+    """
+    if settings.BLOG_CURSOR_PAGINATION:
+        paginator = CursorPaginator(queryset, paginate_count)
+        return paginator.get_page(request.GET.get('cursor'))
+    paginator = CachedCountPaginator(queryset, paginate_count, count_key)
     page_number = request.GET.get('page')
     return paginator.get_page(page_number)
 
 
+async def apaginate_queryset(queryset, request, paginate_count=PAGINATE_COUNT,
+                             count_key=None):
+    """То же, что paginate_queryset(), для асинхронных представлений."""
+    if settings.BLOG_CURSOR_PAGINATION:
+        paginator = CursorPaginator(queryset, paginate_count)
+        return await paginator.aget_page(request.GET.get('cursor'))
+    paginator = CachedCountPaginator(queryset, paginate_count, count_key)
+    return await paginator.aget_page(request.GET.get('page'))
+
+
 def get_comment_and_check_permission(request, comment_id):
     """Получает комментарий и проверяет разрешение пользователя."""
     comment = get_object_or_404(Comment, id=comment_id)
-    if request.user != comment.author:
+    if request.user.id != comment.author_id:
         raise Http404('У вас нет доступа к этому комментарию.')
     return comment
 
@@ -34,23 +60,177 @@ def get_post(post_id):
     return get_object_or_404(Post, id=post_id)
 
 
+def check_post_visible(request, post):
+    """Снятый с публикации пост доступен только его автору."""
+    if request.user.id != post.author_id and not post.is_published:
+        raise Http404('Пост недоступен.')
+    return post
+
+
+def paginate_comments(post, cursor=None,
+                      paginate_count=COMMENTS_PAGINATE_COUNT):
+    """Страница комментариев к посту в порядке создания.
+
+    Комментарии листаются по курсору (created_at, id), поэтому запрос
+    любой страницы читает из индекса только paginate_count + 1 строк.
+    """
+    paginator = CursorPaginator(
+        post.comments.select_related('author'), paginate_count,
+        ordering='created_at')
+    return paginator.get_page(cursor)
+
+
+async def apaginate_comments(post, cursor=None,
+                             paginate_count=COMMENTS_PAGINATE_COUNT):
+    """То же, что paginate_comments(), для асинхронных представлений."""
+    paginator = CursorPaginator(
+        post.comments.select_related('author'), paginate_count,
+        ordering='created_at')
+    return await paginator.aget_page(cursor)
+
+
 def get_objects(
         objects=Post.objects,
         profile_user=None,
         need_count=True,
         sorted_string="-pub_date",
-        need_filter=True):
-    """Вернуть queryset"""
+        need_filter=True,
+        feed=False):
+    """Вернуть queryset.
+
+    При feed=True возвращается проекция для ленты: автор, категория и
+    местоположение подтягиваются одним запросом, а вместо полного текста
+    загружается только его начало (text_preview) для карточки поста.
+    Число комментариев хранится в поле Post.comment_count.
+    """
     if need_filter:
         if profile_user:
             objects = objects.filter(author=profile_user)
         else:
+            # Граница по pub_date не должна спорить в индексе с границей
+            # курсора (см. CursorPaginator).
             objects = objects.filter(
-                is_published=True, category__is_published=True,
-                pub_date__lte=timezone.now(),)
+                LessThanOrEqual(Unindexed('pub_date'), timezone.now()),
+                is_published=True, category__is_published=True)
 
-    if need_count:
-        objects = objects.annotate(comment_count=Count('comments'))
+    if feed:
+        objects = objects.select_related(
+            'author', 'category', 'location'
+        ).defer('text').annotate(
+            text_preview=Left('text', FEED_TEXT_LENGTH))
+    if not need_count:
+        objects = objects.defer('comment_count')
     objects = objects.order_by(sorted_string)
 
     return objects
+
+
+def recount_comments(posts=None):
+    """Пересчитать comment_count у постов с неверным счётчиком.
+
+    Возвращает число исправленных постов.
+    """
+    if posts is None:
+        posts = Post.objects.all()
+    actual_count = Coalesce(Subquery(
+        Comment.objects.filter(post=OuterRef('pk'))
+        .order_by().values('post')
+        .annotate(count=Count('pk')).values('count')
+    ), 0)
+    broken = posts.annotate(actual_count=actual_count).exclude(
+        comment_count=F('actual_count'))
+    return Post.objects.filter(pk__in=broken.values('pk')).update(
+        comment_count=actual_count)
+
+
+def set_renditions(post, renditions):
+    """Сохранить описание копий изображения поста, удалив прежние копии.
+
+    updated_at меняется, чтобы карточка поста перерисовалась с новыми
+    копиями, а закешированные страницы с ней сбрасываются.
+    """
+    previous = post.image_renditions
+    post.image_renditions = renditions
+    post.updated_at = timezone.now()
+    Post.objects.filter(pk=post.pk).update(
+        image_renditions=renditions, updated_at=post.updated_at)
+    invalidate_tags('posts', f'post:{post.pk}')
+    release_files(
+        post.image.storage,
+        rendition_names(previous) - rendition_names(renditions),
+        post_id=post.pk)
+
+
+def renditions_outdated(post):
+    """Изображение поста сменилось после создания его копий."""
+    return post.image_renditions.get('source') != (post.image.name or None)
+
+
+def update_renditions(post):
+    """Пересоздать копии изображения, если они устарели.
+
+    Возвращает True, если описание копий изменилось.
+    """
+    if not renditions_outdated(post):
+        return False
+    renditions = {}
+    if post.image:
+        renditions = shared_renditions(post) or make_renditions(
+            post.image.name, post.image.storage)
+    set_renditions(post, renditions)
+    return True
+
+
+def shared_renditions(post):
+    """Готовые копии того же изображения у другого поста или None."""
+    return Post.objects.filter(
+        image=post.image.name, image_renditions__source=post.image.name,
+    ).exclude(pk=post.pk).values_list('image_renditions', flat=True).first()
+
+
+def release_files(storage, names, post_id=None):
+    """После коммита удалить файлы изображений names, ставшие ненужными.
+
+    Файлы хранятся по содержимому: один файл может быть изображением
+    одних постов и копией изображения других. Поэтому удаляются только
+    файлы, на которые не ссылается ни один пост, кроме post_id, ни полем
+    image, ни в image_renditions. Недавно записанные файлы не удаляются
+    (см. recently_written), их подберёт `dedupe_media --delete-orphans`.
+    """
+    names = {name for name in names if name}
+    if not names:
+        return
+
+    def release():
+        for name in names - referenced_files(names, exclude=post_id):
+            if not recently_written(storage, name):
+                storage.delete(name)
+
+    transaction.on_commit(release)
+
+
+def referenced_files(names, exclude=None):
+    """Имена из names, на которые ссылается хоть один пост, кроме exclude."""
+    # Имена файлов — хеши содержимого, поэтому поиск подстроки в JSON
+    # копий не даёт ложных совпадений.
+    condition = Q(image__in=names)
+    for name in names:
+        condition |= Q(image_renditions__icontains=name)
+    used = set()
+    for image, renditions in Post.objects.filter(condition).exclude(
+            pk=exclude).values_list('image', 'image_renditions'):
+        used |= {image} | rendition_names(renditions)
+    return used & names
+
+
+def recently_written(storage, name):
+    """Файл записан или повторно загружен меньше IMAGE_RELEASE_GRACE назад.
+
+    Такой файл мог только что получить пост, который ещё не сохранён:
+    проверка ссылок перед удалением его не увидит.
+    """
+    try:
+        modified = storage.get_modified_time(name)
+    except FileNotFoundError:
+        return False
+    return (timezone.now() - modified).total_seconds() < IMAGE_RELEASE_GRACE
@@ -0,0 +1,212 @@
+from django.contrib.auth.models import User
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+
+from blog.cache import (after_commit, invalidate_choices,
+                        invalidate_feed_counts, invalidate_post_cards,
+                        invalidate_tags)
+from blog.images import rendition_names
+from blog.jobs import enqueue
+from blog.models import Category, Comment, Job, Location, Post
+from blog.scheduler import post_became_visible, scheduler
+from blog.search import get_backend
+from blog.service import release_files, renditions_outdated
+
+
+@receiver(pre_save, sender=Post)
+def remember_post_state(sender, instance, **kwargs):
+    """Запомнить ленты и изображение поста до сохранения."""
+    previous = (
+        sender.objects.filter(pk=instance.pk)
+        .values_list('category_id', 'author_id', 'image').first()
+        if instance.pk else None
+    )
+    instance._previous_feeds = previous and previous[:2]
+    instance._previous_image = previous and previous[2]
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def reset_post_feed_counts(sender, instance, **kwargs):
+    """Сбросить счётчики лент, в которые пост входит или входил."""
+    category_ids, author_ids = {instance.category_id}, {instance.author_id}
+    previous = getattr(instance, '_previous_feeds', None)
+    if previous:
+        category_ids.add(previous[0])
+        author_ids.add(previous[1])
+    after_commit(invalidate_feed_counts, category_ids, author_ids)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def reset_category_feed_counts(sender, instance, **kwargs):
+    """Публикация категории влияет на общую ленту и ленту категории."""
+    after_commit(invalidate_feed_counts, category_ids=[instance.pk])
+
+
+def change_comment_count(post_id, delta):
+    """Атомарно изменить счётчик комментариев поста на delta.
+
+    Счётчик не опускается ниже нуля: если он разошёлся с настоящим
+    числом комментариев (его исправляет `manage.py recount_comments`),
+    удаление комментария не должно падать на CHECK поля.
+    """
+    Post.objects.filter(pk=post_id).update(
+        comment_count=Greatest(F('comment_count') + delta, 0))
+
+
+@receiver(pre_save, sender=Comment)
+def remember_comment_post(sender, instance, **kwargs):
+    """Запомнить пост комментария до сохранения (его могут перенести)."""
+    instance._previous_post_id = (
+        sender.objects.filter(pk=instance.pk)
+        .values_list('post_id', flat=True).first()
+        if instance.pk else None
+    )
+
+
+@receiver(post_save, sender=Comment)
+def count_saved_comment(sender, instance, created, **kwargs):
+    previous_post_id = getattr(instance, '_previous_post_id', None)
+    if created:
+        change_comment_count(instance.post_id, 1)
+    elif previous_post_id and previous_post_id != instance.post_id:
+        change_comment_count(previous_post_id, -1)
+        change_comment_count(instance.post_id, 1)
+
+
+def deleted_with_post(origin):
+    """Комментарий удаляется каскадом вместе со своим постом."""
+    return isinstance(origin, Post) or getattr(origin, 'model', None) is Post
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, origin=None, **kwargs):
+    """Уменьшить счётчик, если пост не удаляется вместе с комментарием."""
+    if not deleted_with_post(origin):
+        change_comment_count(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Location)
+@receiver(post_delete, sender=Location)
+def reset_post_cards(sender, **kwargs):
+    """Карточки показывают название категории и местоположения."""
+    after_commit(invalidate_post_cards)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Location)
+@receiver(post_delete, sender=Location)
+def reset_form_choices(sender, **kwargs):
+    """Форма поста предлагает опубликованные категории и местоположения."""
+    after_commit(invalidate_choices, sender)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def reset_post_pages(sender, instance, **kwargs):
+    after_commit(invalidate_tags, 'posts', f'post:{instance.pk}')
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def reset_next_publication(sender, **kwargs):
+    after_commit(scheduler.reset)
+
+
+@receiver(post_save, sender=Post)
+def make_post_renditions(sender, instance, raw=False, **kwargs):
+    """Поставить в очередь создание копий нового изображения поста.
+
+    Если задача для поста уже ждёт или выполняется, вторая не нужна:
+    задача читает изображение из БД и доводит копии до текущего.
+    """
+    if not raw and renditions_outdated(instance) and not Job.objects.filter(
+            kind='renditions', payload__post_id=instance.pk,
+            status__in=(Job.PENDING, Job.RUNNING)).exists():
+        enqueue('renditions', post_id=instance.pk)
+
+
+@receiver(post_save, sender=Post)
+def release_replaced_image(sender, instance, raw=False, **kwargs):
+    """Удалить прежнее изображение, если оно больше никому не нужно.
+
+    Его копии удалит фоновая задача, когда создаст копии нового.
+    """
+    previous = getattr(instance, '_previous_image', None)
+    if not raw and previous and previous != instance.image.name:
+        release_files(instance.image.storage, [previous], instance.pk)
+
+
+@receiver(post_delete, sender=Post)
+def release_post_image(sender, instance, **kwargs):
+    name = instance.image.name
+    release_files(
+        instance.image.storage,
+        {name} | rendition_names(instance.image_renditions), instance.pk)
+
+
+@receiver(post_became_visible)
+def reset_published_post_caches(sender, post, **kwargs):
+    """Отложенный пост появился в лентах без сохранения модели."""
+    after_commit(invalidate_feed_counts, [post.category_id], [post.author_id])
+    after_commit(invalidate_tags, 'posts', f'post:{post.pk}')
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def reset_comment_pages(sender, instance, origin=None, **kwargs):
+    """Комментарии видны на странице поста, их число — в лентах."""
+    if not deleted_with_post(origin):
+        after_commit(invalidate_tags, 'posts', f'post:{instance.post_id}')
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def reset_category_pages(sender, instance, **kwargs):
+    after_commit(invalidate_tags, 'posts', f'category:{instance.pk}')
+
+
+@receiver(post_save, sender=Location)
+@receiver(post_delete, sender=Location)
+def reset_location_pages(sender, instance, **kwargs):
+    after_commit(invalidate_tags, 'posts', f'location:{instance.pk}')
+
+
+@receiver(post_save, sender=User)
+def reset_author_caches(sender, instance, created, update_fields=None,
+                        **kwargs):
+    """Карточки и страницы показывают имя автора; вход их не меняет."""
+    if created:
+        return
+    if update_fields is None or 'username' in update_fields:
+        after_commit(invalidate_post_cards)
+        after_commit(invalidate_tags, 'posts', f'author:{instance.pk}')
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, created, **kwargs):
+    get_backend().index_post(instance, created)
+
+
+@receiver(pre_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    """Удаляется до каскада, пока комментарии поста ещё в БД."""
+    get_backend().remove_post(instance)
+
+
+@receiver(post_save, sender=Comment)
+def index_comment(sender, instance, created, **kwargs):
+    get_backend().index_comment(instance, created)
+
+
+@receiver(post_delete, sender=Comment)
+def unindex_comment(sender, instance, origin=None, **kwargs):
+    if not deleted_with_post(origin):
+        get_backend().remove_comment(instance)
@@ -0,0 +1,59 @@
+import hashlib
+import os
+import re
+import tempfile
+
+from django.core.files.storage import FileSystemStorage, storages
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """Хранилище, в котором имя файла — SHA-256 его содержимого.
+
+    Файл хешируется прямо при записи во временный файл, без лишнего
+    чтения. Одинаковые загрузки получают одно имя и хранятся один раз:
+    post_images/<sha256>.<расширение>. Поэтому удалять файл можно, только
+    когда на него не ссылается ни один пост (см. blog.service.release_files).
+    Повторная загрузка обновляет время изменения файла: пока пост с ним
+    не сохранён, файл считается недавно записанным и не удаляется.
+    """
+
+    CONTENT_NAME = re.compile(r'[0-9a-f]{64}(\.\w+)?')
+
+    def is_content_name(self, name):
+        """Имя уже образовано хешем содержимого."""
+        return bool(self.CONTENT_NAME.fullmatch(os.path.basename(name)))
+
+    def get_available_name(self, name, max_length=None):
+        # Итоговое имя зависит от содержимого и выбирается в _save().
+        return name
+
+    def _save(self, name, content):
+        directory = os.path.dirname(name)
+        extension = os.path.splitext(name)[1].lower()
+        os.makedirs(self.path(directory), exist_ok=True)
+        digest = hashlib.sha256()
+        fd, temp_path = tempfile.mkstemp(
+            dir=self.path(directory), prefix='.upload-')
+        try:
+            with os.fdopen(fd, 'wb') as temp_file:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    temp_file.write(chunk)
+            name = os.path.join(directory, digest.hexdigest() + extension)
+            if os.path.exists(self.path(name)):
+                os.remove(temp_path)
+                os.utime(self.path(name))
+            else:
+                os.replace(temp_path, self.path(name))
+                if self.file_permissions_mode is not None:
+                    os.chmod(self.path(name), self.file_permissions_mode)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return name.replace('\\', '/')
+
+
+def post_image_storage():
+    """Хранилище изображений постов из настройки STORAGES."""
+    return storages['post_images']
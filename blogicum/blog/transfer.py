@@ -0,0 +1,357 @@
+"""Выгрузка и загрузка данных блога в формате JSON Lines.
+
+Каждая строка — один объект в том же виде, что у
+`manage.py dumpdata --format jsonl`:
+
+    {"model": "blog.post", "pk": 1, "fields": {"title": "...", ...}}
+
+Внешние ключи записываются как pk объектов из того же файла, автор —
+натуральным ключом ["username"] (как с --natural-foreign). Поэтому
+загружать можно и выгрузку export_blog, и вывод
+`dumpdata auth.user blog --format jsonl`.
+
+Загрузка читает файл построчно и сохраняет объекты пачками через
+bulk_create(), каждая пачка — в своей транзакции. Объекты получают
+новые id, соответствие pk из файла новым id хранится в памяти отрезками
+(см. IdMap). Объект должен идти в файле после тех, на кого ссылается;
+только пользователей import_blog загружает отдельным первым проходом.
+bulk_create() не вызывает сигналы, так что счётчики комментариев,
+поисковый индекс и кеш обновляются в конце загрузки одним проходом.
+"""
+import json
+from bisect import bisect_right
+from collections import Counter
+from datetime import datetime
+
+from django.contrib.auth.models import User
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.utils import timezone
+
+from blog.cache import (invalidate_feed_counts, invalidate_post_cards,
+                        invalidate_tags)
+from blog.jobs import enqueue
+from blog.models import Category, Comment, Location, Post
+from blog.scheduler import scheduler
+from blog.search import get_backend
+from blog.service import recount_comments, renditions_outdated
+
+# Порядок выгрузки: объект идёт после тех, на кого ссылается.
+FIELDS = {
+    Category: ('created_at', 'is_published', 'title', 'description',
+               'slug'),
+    Location: ('created_at', 'is_published', 'name'),
+    Post: ('created_at', 'is_published', 'title', 'text', 'pub_date',
+           'author', 'location', 'category', 'image', 'image_renditions'),
+    Comment: ('created_at', 'post', 'author', 'text'),
+}
+# Пользователи только создаются, права из файла не переносятся.
+USER_FIELDS = ('username', 'password', 'email', 'first_name', 'last_name',
+               'is_active', 'date_joined')
+# По этим полям загружаемый объект совпадает с уже существующим.
+NATURAL_KEYS = {User: 'username', Category: 'slug', Location: 'name'}
+MODELS = {
+    model._meta.label_lower: model for model in (User, *FIELDS)
+}
+
+
+class TransferError(Exception):
+    """Файл не удаётся загрузить."""
+
+
+class TransferEncoder(DjangoJSONEncoder):
+    """Даты без округления до миллисекунд, в отличие от DjangoJSONEncoder."""
+
+    def default(self, o):
+        if isinstance(o, datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def model_fields(model):
+    return USER_FIELDS if model is User else FIELDS[model]
+
+
+def export_lines(batch_size):
+    """Строки JSON Lines: все категории, места, посты и комментарии."""
+    for model, fields in FIELDS.items():
+        columns = [
+            'author__username' if name == 'author'
+            else model._meta.get_field(name).attname
+            for name in fields
+        ]
+        rows = model.objects.order_by('pk').values_list('pk', *columns)
+        for pk, *values in rows.iterator(chunk_size=batch_size):
+            record = dict(zip(fields, values))
+            if 'author' in record:
+                record['author'] = [record['author']]
+            yield json.dumps(
+                {'model': model._meta.label_lower, 'pk': pk,
+                 'fields': record},
+                cls=TransferEncoder, ensure_ascii=False)
+
+
+class IdMap:
+    """Соответствие pk из файла новым id.
+
+    Подряд идущие pk, получившие подряд идущие id, хранятся одним
+    отрезком, так что для выгрузки, упорядоченной по pk, соответствие
+    занимает несколько записей, а не по записи на объект. pk не по
+    возрастанию хранятся в обычном словаре.
+    """
+
+    def __init__(self):
+        self.starts, self.targets, self.lengths = [], [], []
+        self.unordered = {}
+
+    def __setitem__(self, source, target):
+        if self.starts and source < self.starts[-1] + self.lengths[-1]:
+            self.unordered[source] = target
+        elif self.starts and (
+                source == self.starts[-1] + self.lengths[-1]
+                and target == self.targets[-1] + self.lengths[-1]):
+            self.lengths[-1] += 1
+        else:
+            self.starts.append(source)
+            self.targets.append(target)
+            self.lengths.append(1)
+
+    def __getitem__(self, source):
+        if source in self.unordered:
+            return self.unordered[source]
+        index = bisect_right(self.starts, source) - 1
+        if index < 0 or source >= self.starts[index] + self.lengths[index]:
+            raise KeyError(source)
+        return self.targets[index] + source - self.starts[index]
+
+
+class Importer:
+    """Загружает строки JSON Lines пачками по batch_size объектов."""
+
+    def __init__(self, batch_size):
+        self.batch_size = batch_size
+        self.ids = {model: IdMap() for model in MODELS.values()}
+        self.usernames = {}
+        self.model, self.records = None, []
+        self.created, self.updated, self.skipped = (
+            Counter(), Counter(), Counter())
+        self.category_ids, self.author_ids = set(), set()
+        self.page_tags = set()
+        self.new_post_ids = None
+
+    def load(self, lines, models=None):
+        """Загрузить строки; если задано models — только эти модели."""
+        for number, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                label = record['model']
+            except (ValueError, KeyError, TypeError) as error:
+                raise TransferError(f'Строка {number}: {error}')
+            model = MODELS.get(label)
+            if model is None:
+                # Первый проход по пользователям чужие модели не считает.
+                if User not in (models or ()):
+                    self.skipped[label] += 1
+                continue
+            if models is not None and model not in models:
+                continue
+            if model is not self.model:
+                self.flush()
+                self.model = model
+            self.records.append(record)
+            if len(self.records) >= self.batch_size:
+                self.flush()
+        self.flush()
+
+    def load_users(self, lines):
+        """Загрузить только пользователей.
+
+        dumpdata выгружает auth.user после blog, поэтому для такого файла
+        пользователи загружаются первым проходом. Строки без "auth.user"
+        отбрасываются без разбора JSON.
+        """
+        self.load((line for line in lines if '"auth.user"' in line),
+                  models={User})
+
+    def flush(self):
+        """Сохранить накопленную пачку одной транзакцией."""
+        if not self.records:
+            return
+        records, self.records = self.records, []
+        with transaction.atomic():
+            objects = [self.build(record) for record in records]
+            existing = self.find_existing(records, objects)
+            new = [obj for obj, current in zip(objects, existing)
+                   if current is None]
+            self.create(new)
+            changed = self.update_existing(objects, existing)
+            # На комментарии никто не ссылается, их id не запоминаются.
+            for record, obj, current in zip(records, objects, existing):
+                if self.model is Comment:
+                    break
+                if current is not None:
+                    obj.pk = current.pk
+                self.ids[self.model][record['pk']] = obj.pk
+            self.after_save(new, changed)
+        self.created[self.model._meta.label_lower] += len(new)
+        self.updated[self.model._meta.label_lower] += len(changed)
+
+    def find_existing(self, records, objects):
+        """Уже существующие в БД объекты для объектов пачки или None.
+
+        Объекты сопоставляются по NATURAL_KEYS. Имя местоположения
+        не уникально: из нескольких мест с одним именем подходит то,
+        чей pk совпадает с pk в файле, а если такого нет, загрузка
+        останавливается — иначе посты попали бы не в то место.
+        """
+        key = NATURAL_KEYS.get(self.model)
+        if key is None:
+            return [None] * len(objects)
+        matches = {}
+        for current in self.model.objects.filter(**{
+                f'{key}__in': [getattr(obj, key) for obj in objects]}):
+            matches.setdefault(getattr(current, key), []).append(current)
+        existing = []
+        for record, obj in zip(records, objects):
+            candidates = matches.get(getattr(obj, key), [])
+            if len(candidates) > 1:
+                candidates = [
+                    current for current in candidates
+                    if current.pk == record.get('pk')]
+                if not candidates:
+                    raise TransferError(
+                        f'{record["model"]} {record.get("pk")}: в БД '
+                        f'несколько объектов с {key} '
+                        f'«{getattr(obj, key)}», и ни у одного нет '
+                        'такого pk.')
+            existing.append(candidates[0] if candidates else None)
+        return existing
+
+    def create(self, objects):
+        """Создать объекты пачки, сохранив created_at из файла.
+
+        auto_now_add перезаписывает created_at и в bulk_create(),
+        поэтому значения из файла записываются следом одним
+        подготовленным UPDATE по первичному ключу: bulk_update() строит
+        для этого CASE на всю пачку и втрое замедляет загрузку.
+        """
+        meta = self.model._meta
+        if not any(field.name == 'created_at'
+                   for field in meta.concrete_fields):
+            self.model.objects.bulk_create(
+                objects, batch_size=self.batch_size)
+            return
+        field = meta.get_field('created_at')
+        created_at = [obj.created_at for obj in objects]
+        self.model.objects.bulk_create(objects, batch_size=self.batch_size)
+        for obj, value in zip(objects, created_at):
+            obj.created_at = value
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'UPDATE {meta.db_table} SET {field.column} = %s '
+                f'WHERE {meta.pk.column} = %s',
+                [(field.get_db_prep_save(obj.created_at, connection), obj.pk)
+                 for obj in objects])
+
+    def build(self, record):
+        """Объект модели из записи; ссылки переводятся в новые id."""
+        obj = self.model()
+        fields = record.get('fields', {})
+        for name in model_fields(self.model):
+            if name not in fields:
+                continue
+            field = self.model._meta.get_field(name)
+            value = fields[name]
+            if field.is_relation:
+                setattr(obj, field.attname, self.resolve(
+                    field.related_model, value, record))
+            else:
+                setattr(obj, name, field.to_python(value))
+        if self.model is User and not obj.password:
+            obj.set_unusable_password()
+        if getattr(obj, 'created_at', False) is None:
+            obj.created_at = timezone.now()
+        return obj
+
+    def resolve(self, model, value, record):
+        """Новый id объекта model, на который ссылается запись."""
+        if value is None:
+            return None
+        if model is User and isinstance(value, list):
+            return self.user_id(*value)
+        try:
+            return self.ids[model][value]
+        except (KeyError, TypeError):
+            raise TransferError(
+                f'{record["model"]} {record.get("pk")}: нет объекта '
+                f'{model._meta.label_lower} {value} выше в файле. '
+                'Авторов можно указывать по имени: dumpdata '
+                '--natural-foreign.')
+
+    def user_id(self, username):
+        """Найти id пользователя по имени; недостающий создаётся без пароля."""
+        if username not in self.usernames:
+            user = User.objects.filter(username=username).first()
+            if user is None:
+                user = User.objects.create_user(username)
+                self.created['auth.user'] += 1
+            self.usernames[username] = user.pk
+        return self.usernames[username]
+
+    def update_existing(self, objects, existing):
+        """Обновить категории и места, уже существующие в БД.
+
+        Пользователи из файла существующих не меняют.
+        """
+        if self.model is User:
+            return []
+        changed = []
+        for obj, current in zip(objects, existing):
+            if current is None:
+                continue
+            for name in FIELDS[self.model]:
+                setattr(current, name, getattr(obj, name))
+            changed.append(current)
+        if changed:
+            self.model.objects.bulk_update(
+                changed, FIELDS[self.model], batch_size=self.batch_size)
+        return changed
+
+    def after_save(self, new, changed):
+        """Запомнить, что нужно обновить после загрузки."""
+        if self.model is User:
+            self.usernames.update((obj.username, obj.pk) for obj in new)
+        elif self.model is Category:
+            self.category_ids.update(obj.pk for obj in changed)
+            self.page_tags.update(f'category:{obj.pk}' for obj in changed)
+        elif self.model is Location:
+            self.page_tags.update(f'location:{obj.pk}' for obj in changed)
+        elif self.model is Post and new:
+            first, last = new[0].pk, new[-1].pk
+            if self.new_post_ids is not None:
+                first = min(first, self.new_post_ids[0])
+                last = max(last, self.new_post_ids[1])
+            self.new_post_ids = (first, last)
+            self.category_ids.update(obj.category_id for obj in new)
+            self.author_ids.update(obj.author_id for obj in new)
+            for post in new:
+                if renditions_outdated(post):
+                    enqueue('renditions', post_id=post.pk)
+
+    def finish(self):
+        """Пересчитать то, что при сохранении по одному делают сигналы."""
+        if self.new_post_ids is not None:
+            first, last = self.new_post_ids
+            for start in range(first, last + 1, self.batch_size):
+                with transaction.atomic():
+                    recount_comments(Post.objects.filter(
+                        pk__gte=start, pk__lt=start + self.batch_size))
+        if self.created['blog.post'] or self.created['blog.comment']:
+            with transaction.atomic():
+                get_backend().rebuild()
+        invalidate_feed_counts(self.category_ids, self.author_ids)
+        invalidate_post_cards()
+        invalidate_tags('posts', *self.page_tags)
+        scheduler.reset()
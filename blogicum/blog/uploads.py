@@ -0,0 +1,119 @@
+"""Потоковый приём загружаемых изображений.
+
+ImageUploadHandler пишет файл во временный файл на диске частями
+по мере чтения запроса, поэтому память процесса не зависит от размера
+загрузки. Файл отклоняется, как только:
+
+* первые байты не похожи на JPEG, PNG, GIF или WebP;
+* загружено больше settings.BLOG_IMAGE_MAX_SIZE байт;
+* заголовок изображения объявляет больше settings.BLOG_IMAGE_MAX_PIXELS
+  пикселей (защита от «бомб распаковки»). Заголовок читается без
+  декодирования самого изображения.
+
+Обработчик ставится только страницам создания и редактирования поста
+(blog.mixins.PostFormMixin); остальные загрузки идут через обработчики
+Django по умолчанию.
+
+Остаток отклонённого файла дочитывается из запроса без сохранения.
+Причина отказа попадает в request.upload_errors[имя поля], откуда её
+берёт PostForm.
+"""
+import warnings
+
+from django.conf import settings
+from django.core.files.uploadhandler import (SkipFile,
+                                             TemporaryFileUploadHandler)
+from PIL import Image
+
+IMAGE_SIGNATURES = (
+    (b'\xff\xd8\xff', 'JPEG'),
+    (b'\x89PNG\r\n\x1a\n', 'PNG'),
+    (b'GIF87a', 'GIF'),
+    (b'GIF89a', 'GIF'),
+    (b'RIFF', 'WEBP'),
+)
+ALLOWED_FORMATS = frozenset(image_format for _, image_format in
+                            IMAGE_SIGNATURES)
+
+NOT_AN_IMAGE = 'Загрузите изображение в формате JPEG, PNG, GIF или WebP.'
+TOO_LARGE = 'Файл больше {size} МБ.'
+TOO_MANY_PIXELS = 'Изображение больше {pixels} мегапикселей.'
+
+
+def sniff_format(header):
+    """Формат изображения по первым байтам или None."""
+    for signature, image_format in IMAGE_SIGNATURES:
+        if header.startswith(signature):
+            if image_format == 'WEBP' and header[8:12] != b'WEBP':
+                return None
+            return image_format
+    return None
+
+
+def check_image_header(path):
+    """Проверить заголовок изображения, не декодируя пиксели.
+
+    Возвращает текст ошибки или None.
+    """
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', Image.DecompressionBombWarning)
+            with Image.open(path) as image:
+                image_format, (width, height) = image.format, image.size
+    except (OSError, Image.DecompressionBombError,
+            Image.DecompressionBombWarning):
+        return NOT_AN_IMAGE
+    if image_format not in ALLOWED_FORMATS:
+        return NOT_AN_IMAGE
+    if width * height > settings.BLOG_IMAGE_MAX_PIXELS:
+        return TOO_MANY_PIXELS.format(
+            pixels=settings.BLOG_IMAGE_MAX_PIXELS // 10**6)
+    return None
+
+
+class ImageUploadHandler(TemporaryFileUploadHandler):
+    """Принимает загрузки во временный файл и отклоняет негодные."""
+
+    def new_file(self, field_name, file_name, content_type,
+                 content_length, charset=None, content_type_extra=None):
+        self.received = 0
+        self.field_name = field_name
+        if (content_length is not None
+                and content_length > settings.BLOG_IMAGE_MAX_SIZE):
+            self.reject(self.too_large())
+        super().new_file(field_name, file_name, content_type,
+                         content_length, charset, content_type_extra)
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > settings.BLOG_IMAGE_MAX_SIZE:
+            self.reject(self.too_large())
+        if start == 0 and sniff_format(raw_data) is None:
+            self.reject(NOT_AN_IMAGE)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        error = check_image_header(file.temporary_file_path())
+        if error is not None:
+            # Файл уже принят целиком: вместо SkipFile он просто
+            # не попадает в request.FILES.
+            file.close()
+            self.remember_error(error)
+            return None
+        return file
+
+    def reject(self, message):
+        """Пропустить текущий файл и запомнить причину для формы."""
+        self.remember_error(message)
+        raise SkipFile(message)
+
+    def remember_error(self, message):
+        if self.request is not None:
+            if not hasattr(self.request, 'upload_errors'):
+                self.request.upload_errors = {}
+            self.request.upload_errors[self.field_name] = message
+
+    @staticmethod
+    def too_large():
+        return TOO_LARGE.format(size=settings.BLOG_IMAGE_MAX_SIZE // 2**20)
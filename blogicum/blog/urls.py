@@ -1,27 +1,44 @@
+from django.conf import settings
 from django.urls import path
 
 from blog import views
+from blog.async_views import ASYNC_VIEWS
 
 app_name = 'blog'
 
+
+def page_view(name, view_class):
+    """Представление URL name; асинхронное, если name в BLOG_ASYNC_VIEWS."""
+    if name in settings.BLOG_ASYNC_VIEWS:
+        view_class = ASYNC_VIEWS[name]
+    return view_class.as_view()
+
+
 urlpatterns = [
-    path('', views.PublishedPostsView.as_view(), name='index'),
+    path('', page_view('index', views.PublishedPostsView), name='index'),
     path('posts/create/', views.PostCreateView.as_view(), name='create_post'),
     path('posts/<int:post_id>/edit/',
          views.PostUpdateView.as_view(), name='edit_post'),
     path('posts/<int:post_id>/delete/',
          views.PostDeleteView.as_view(), name='delete_post'),
     path('posts/<int:post_id>/',
-         views.PostDetailView.as_view(), name='post_detail'),
+         page_view('post_detail', views.PostDetailView),
+         name='post_detail'),
+
+    path('search/', views.SearchView.as_view(), name='search'),
 
     path('category/<slug:slug>/',
-         views.CategoryDetailView.as_view(), name='category_posts'),
+         page_view('category_posts', views.CategoryDetailView),
+         name='category_posts'),
 
     path('profile/edit/',
          views.EditProfileView.as_view(), name='edit_profile'),
     path('profile/<str:username>/',
-         views.ProfileDetailView.as_view(), name='profile'),
+         page_view('profile', views.ProfileDetailView),
+         name='profile'),
 
+    path('posts/<int:post_id>/comments/',
+         views.PostCommentsView.as_view(), name='comments'),
     path('posts/<int:post_id>/comment/',
          views.add_comment, name='add_comment'),
     path(
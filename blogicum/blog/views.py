@@ -5,15 +5,21 @@ from django.core.paginator import Paginator
 from django.http import Http404
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse, reverse_lazy
+from django.utils.http import urlencode
 from django.views.generic import (CreateView, DeleteView, DetailView, FormView,
                                   ListView, UpdateView)
 
+from blog.cache import feed_count_key
 from blog.forms import CommentForm, PostForm, ProfileForm, RegisterForm
-from blog.models import Category
+from blog.mixins import (AnonymousCacheMixin, ObjectMemoMixin, PostCheckMixin,
+                         PostFormMixin, PostMixin, ReplicaReadMixin)
+from blog.models import Category, Post
+from blog.pagination import CachedCountPaginator
+from blog.search import search_posts
+from blog.service import (check_post_visible, get_comment_and_check_permission,
+                          get_objects, get_post, paginate_comments,
+                          paginate_queryset, render_comment_template)
 from constants import PAGINATE_COUNT
-from blog.mixins import PostCheckMixin, PostMixin
-from blog.service import (get_comment_and_check_permission, get_objects, get_post,
-                     render_comment_template, paginate_queryset)
 
 
 @login_required
@@ -65,24 +71,22 @@ class RegistrationView(FormView):
     success_url = reverse_lazy('blog:index')
 
 
-class ProfileDetailView(DetailView):
+class ProfileDetailView(ReplicaReadMixin, ObjectMemoMixin, DetailView):
     """Отображение страницы профиля."""
 
     model = User
     template_name = 'blog/profile.html'
     context_object_name = 'profile'
-
-    def get_object(self, queryset=None):
-        username = self.kwargs.get('username')
-
-        return get_object_or_404(User, username=username)
+    slug_field = 'username'
+    slug_url_kwarg = 'username'
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        user_name = self.kwargs.get('username')
-        profile_user = get_object_or_404(User, username=user_name)
-        posts = get_objects(profile_user=profile_user)
-        context['page_obj'] = paginate_queryset(posts, self.request)
+        profile_user = self.object
+        posts = get_objects(profile_user=profile_user, feed=True)
+        context['page_obj'] = paginate_queryset(
+            posts, self.request,
+            count_key=feed_count_key(author=profile_user))
         return context
 
 
@@ -98,11 +102,11 @@ class EditProfileView(LoginRequiredMixin, UpdateView):
         return self.request.user
 
 
-class PostCreateView(LoginRequiredMixin, PostMixin, CreateView):
+class PostCreateView(LoginRequiredMixin, PostMixin, PostFormMixin,
+                     CreateView):
     """Отображение страницы создания поста."""
 
     template_name = 'blog/create.html'
-    form_class = PostForm
 
     def form_valid(self, form):
         form.instance.author = self.request.user
@@ -114,11 +118,9 @@ class PostCreateView(LoginRequiredMixin, PostMixin, CreateView):
 
 
 class PostUpdateView(LoginRequiredMixin, PostMixin,
-                     PostCheckMixin, UpdateView):
+                     PostCheckMixin, PostFormMixin, UpdateView):
     """Отображение страницы редактирования поста."""
 
-    form_class = PostForm
-
     def get_success_url(self):
         return reverse(
             'blog:post_detail',
@@ -139,38 +141,73 @@ class PostDeleteView(LoginRequiredMixin, PostMixin,
         return context
 
 
-class PublishedPostsView(PostMixin, ListView):
+class PublishedPostsView(ReplicaReadMixin, AnonymousCacheMixin, PostMixin,
+                         ListView):
     """Отображает главную страницу с постами."""
 
     template_name = 'blog/index.html'
     paginate_by = PAGINATE_COUNT
 
     def get_queryset(self):
-        return get_objects()
+        return get_objects(feed=True)
 
+    def paginate_queryset(self, queryset, page_size):
+        page = paginate_queryset(
+            queryset, self.request, page_size, count_key=feed_count_key())
+        return (getattr(page, 'paginator', None), page, page.object_list,
+                page.has_other_pages())
 
-class PostDetailView(PostMixin, DetailView):
+
+class PostDetailView(ReplicaReadMixin, AnonymousCacheMixin, PostMixin,
+                     DetailView):
     """Отображает страницу поста."""
 
     template_name = 'blog/detail.html'
 
+    def get_queryset(self):
+        return super().get_queryset().select_related(
+            'author', 'category', 'location')
+
     def get_object(self, queryset=None):
         post_id = self.kwargs.get('post_id')
         post = get_object_or_404(self.get_queryset(), id=post_id)
-
-        if self.request.user != post.author and not post.is_published:
-            raise Http404('Пост недоступен.')
-        return post
+        return check_post_visible(self.request, post)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['form'] = CommentForm()
-        context['comments'] = (
-            self.object.comments.select_related('author'))
+        context['comments'] = paginate_comments(self.object)
         return context
 
+    def get_cache_tags(self):
+        return [f'post:{self.object.pk}',
+                f'author:{self.object.author_id}',
+                f'category:{self.object.category_id}',
+                f'location:{self.object.location_id}']
 
-class CategoryDetailView(DetailView):
+
+class PostCommentsView(PostDetailView):
+    """Отдаёт следующую страницу комментариев к посту фрагментом HTML.
+
+    Страница поста показывает только первые комментарии, остальные
+    подгружаются отсюда по ссылке «Показать ещё» (?cursor=).
+    """
+
+    template_name = 'includes/comments.html'
+
+    def get_queryset(self):
+        return Post.objects.all()
+
+    def get_context_data(self, **kwargs):
+        return {
+            'post': self.object,
+            'comments': paginate_comments(
+                self.object, self.request.GET.get('cursor')),
+        }
+
+
+class CategoryDetailView(ReplicaReadMixin, AnonymousCacheMixin,
+                         ObjectMemoMixin, DetailView):
     """Отображает страницу с постами выбранной категории."""
 
     model = Category
@@ -183,13 +220,37 @@ class CategoryDetailView(DetailView):
             raise Http404('Категория недоступна.')
         return category
 
+    def get_cache_tags(self):
+        return ['posts', f'category:{self.object.pk}']
+
     def get_context_data(self, **kwargs):
-        category_slug = self.kwargs.get('slug')
-        category = get_object_or_404(
-            Category.objects.all(), slug=category_slug,
-            is_published=True)
         context = super().get_context_data(**kwargs)
-        posts = get_objects()
+        category = self.object
+        posts = get_objects(feed=True)
         posts = posts.filter(category=category)
-        context['page_obj'] = paginate_queryset(posts, self.request)
+        context['page_obj'] = paginate_queryset(
+            posts, self.request,
+            count_key=feed_count_key(category=category))
+        return context
+
+
+class SearchView(ReplicaReadMixin, ListView):
+    """Поиск по заголовкам и текстам постов, лучшие совпадения первыми.
+
+    Страница не кешируется: каждый новый запрос q дал бы новый ключ
+    кеша, и посетители могли бы заполнить кеш произвольными запросами.
+    """
+
+    template_name = 'blog/search.html'
+    paginate_by = PAGINATE_COUNT
+    paginator_class = CachedCountPaginator
+
+    def get_queryset(self):
+        self.query = self.request.GET.get('q', '').strip()
+        return search_posts(get_objects(feed=True), self.query)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['query'] = self.query
+        context['page_query'] = urlencode({'q': self.query}) + '&'
         return context
@@ -1,4 +1,5 @@
 from pathlib import Path
+from tempfile import gettempdir
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -23,6 +24,25 @@ STATICFILES_DIRS = [
 ]
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Максимальный размер загружаемого изображения, байт.
+BLOG_IMAGE_MAX_SIZE = 25 * 1024 * 1024
+
+# Максимальное число пикселей загружаемого изображения.
+BLOG_IMAGE_MAX_PIXELS = 50_000_000
+
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+    # Изображения постов хранятся один раз под именем по SHA-256.
+    'post_images': {
+        'BACKEND': 'blog.storage.ContentAddressedStorage',
+    },
+}
+
 INSTALLED_APPS = [
     'django_bootstrap5',
     'django.contrib.admin',
@@ -43,6 +63,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'blog.middleware.publication_scheduler_middleware',
+    'blog.middleware.replica_middleware',
 ]
 
 ROOT_URLCONF = 'blogicum.urls'
@@ -60,6 +82,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'blog.context_processors.post_cards',
             ],
         },
     },
@@ -71,7 +94,28 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    },
+    # Реплика для чтения; используется, только если задан BLOG_READ_REPLICA.
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.replica.sqlite3',
+    },
+}
+
+DATABASE_ROUTERS = ['blog.routers.ReplicaRouter']
+
+# Кеш обязан быть общим для всех процессов сайта: в нём версии тегов
+# страниц, счётчики лент, время последней записи и блокировка
+# планировщика публикаций. С кешем в памяти процесса сброс после записи
+# видел бы только один процесс. Кеш в БД не подходит: шаблоны читают
+# его на каждую карточку поста, в том числе из асинхронных страниц.
+# Файловый кеш общий для процессов одной машины; под нагрузкой нужен
+# Redis (см. blogicum.settings_production).
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': Path(gettempdir()) / 'blogicum_cache',
+    },
 }
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -100,3 +144,27 @@ USE_TZ = True
 STATIC_URL = 'static/'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Листать ленты по курсору (pub_date, id) вместо ?page=N.
+BLOG_CURSOR_PAGINATION = False
+
+# Сколько секунд хранить в кеше отрисованные карточки постов.
+BLOG_POST_CARD_TIMEOUT = 60 * 60
+
+# Сколько секунд хранить в кеше страницы для анонимных посетителей.
+BLOG_PAGE_CACHE_TIMEOUT = 60 * 10
+
+# Бэкенд полнотекстового поиска (см. blog.search).
+BLOG_SEARCH_BACKEND = 'blog.search.backends.SQLiteSearchBackend'
+
+# Алиас реплики из DATABASES, из которой читают страницы с
+# ReplicaReadMixin (см. blog.routers), или None — читать из основной БД.
+BLOG_READ_REPLICA = None
+
+# На сколько секунд реплика может отставать от основной БД.
+BLOG_REPLICA_LAG = 10
+
+# Имена URL blog, которые обслуживают асинхронные представления
+# (см. blog.async_views): 'index', 'post_detail', 'category_posts',
+# 'profile'. Выигрыш есть только под ASGI.
+BLOG_ASYNC_VIEWS = []
@@ -0,0 +1,82 @@
+"""Настройки для работы под нагрузкой.
+
+Запуск: DJANGO_SETTINGS_MODULE=blogicum.settings_production.
+Всё, кроме перечисленного ниже, берётся из blogicum.settings.
+Перед первым запуском нужен `manage.py migrate`. Кеш — сервер Redis
+по адресу из переменной окружения BLOG_REDIS_URL.
+"""
+import os
+
+from blogicum.settings import *  # noqa: F401, F403
+from blogicum.settings import DATABASES
+
+DEBUG = False
+
+# Прагмы выполняются при открытии каждого соединения.
+SQLITE_PRAGMAS = {
+    # Читатели не ждут писателя, а писатель — читателей.
+    'journal_mode': 'WAL',
+    # В режиме WAL fsync нужен только при чекпоинте; после сбоя питания
+    # теряются последние транзакции, но база остаётся целой.
+    'synchronous': 'NORMAL',
+    # Файл базы читается через mmap, без копирования в кеш страниц SQLite.
+    'mmap_size': 256 * 2**20,
+    # Кеш страниц соединения: отрицательное значение — в килобайтах.
+    'cache_size': -64 * 2**10,
+    'temp_store': 'MEMORY',
+}
+
+SQLITE_OPTIONS = {
+    'init_command': ';'.join(
+        f'PRAGMA {name}={value}' for name, value in SQLITE_PRAGMAS.items()),
+    # Сколько секунд ждать блокировку, прежде чем вернуть
+    # «database is locked» (PRAGMA busy_timeout).
+    'timeout': 20,
+    # Транзакция сразу берёт блокировку записи: иначе две транзакции,
+    # начавшие с чтения, не могут обе перейти к записи, и одна из них
+    # получает «database is locked» без ожидания.
+    'transaction_mode': 'IMMEDIATE',
+}
+
+# Реплика только читается: прагмы записи ей не нужны, а IMMEDIATE
+# брал бы блокировку записи на каждую транзакцию чтения. query_only
+# не даёт случайно записать в реплику.
+REPLICA_PRAGMAS = {
+    **{name: SQLITE_PRAGMAS[name]
+       for name in ('mmap_size', 'cache_size', 'temp_store')},
+    'query_only': 'ON',
+}
+
+REPLICA_OPTIONS = {
+    'init_command': ';'.join(
+        f'PRAGMA {name}={value}' for name, value in REPLICA_PRAGMAS.items()),
+    'timeout': SQLITE_OPTIONS['timeout'],
+}
+
+
+def production_database(database, options):
+    return {
+        **database,
+        'OPTIONS': {**database.get('OPTIONS', {}), **options},
+        # Соединение живёт между запросами одного потока; перед повторным
+        # использованием проверяется, что оно ещё работает.
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+    }
+
+
+DATABASES = {
+    'default': production_database(DATABASES['default'], SQLITE_OPTIONS),
+    'replica': production_database(DATABASES['replica'], REPLICA_OPTIONS),
+}
+
+# Кеш общий для всех процессов и машин (см. blogicum.settings). В Redis
+# блокировка планировщика (cache.add) атомарна, а вытеснение ключей
+# задаётся политикой maxmemory самого сервера.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ.get(
+            'BLOG_REDIS_URL', 'redis://127.0.0.1:6379/0'),
+    },
+}
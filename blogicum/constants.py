@@ -6,3 +6,29 @@ TEXT_LENGTH = 100
 SLUG_LENGTH = 64
 
 PAGINATE_COUNT = 10
+COMMENTS_PAGINATE_COUNT = 20
+FEED_TEXT_LENGTH = 1000
+FEED_COUNT_TIMEOUT = 60 * 5
+PAGE_RANGE_ON_EACH_SIDE = 2
+
+IMAGE_RENDITION_WIDTHS = (320, 640, 1280)
+IMAGE_CARD_WIDTH = 640
+WEBP_QUALITY = 80
+JPEG_QUALITY = 85
+# Файл изображения, записанный или повторно загруженный недавно, может
+# принадлежать посту, который ещё не сохранён, и не удаляется.
+IMAGE_RELEASE_GRACE = 60 * 60
+
+JOB_MAX_ATTEMPTS = 5
+JOB_RETRY_DELAY = 30
+JOB_STALE_TIMEOUT = 60 * 10
+
+SEARCH_RANK_MAX_DOCS = 50_000
+
+ADMIN_EXACT_COUNT_LIMIT = 10_000
+ADMIN_COUNT_TIMEOUT = 60 * 5
+
+MODERATION_CHUNK_SIZE = 500
+MODERATION_SYNC_LIMIT = 5000
+
+CHOICES_TIMEOUT = 60 * 60
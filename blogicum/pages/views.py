@@ -1,12 +1,14 @@
 from django.shortcuts import render
 from django.views.generic import TemplateView
 
+from blog.mixins import ReplicaReadMixin
 
-class AboutView(TemplateView):
+
+class AboutView(ReplicaReadMixin, TemplateView):
     template_name = 'pages/about.html'
 
 
-class RulesView(TemplateView):
+class RulesView(ReplicaReadMixin, TemplateView):
     template_name = 'pages/rules.html'
 
 
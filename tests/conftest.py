@@ -32,6 +32,29 @@ def enable_debug_false():
         yield
 
 
+@pytest.fixture(autouse=True)
+def clear_cache(settings, tmp_path):
+    """Кеш проекта с тем же бэкендом, но в отдельном для теста каталоге."""
+    from django.core.cache import cache
+    settings.CACHES = {"default": {
+        **settings.CACHES["default"], "LOCATION": tmp_path / "cache",
+    }}
+    cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmp_path):
+    """Загруженные изображения и их копии не остаются в репозитории."""
+    settings.MEDIA_ROOT = tmp_path / "media"
+    return settings.MEDIA_ROOT
+
+
+@pytest.fixture
+def no_release_grace(monkeypatch):
+    """Ненужные файлы изображений удаляются сразу после записи."""
+    monkeypatch.setattr("blog.service.IMAGE_RELEASE_GRACE", 0)
+
+
 class SafeImportFromContextManager:
     def __init__(
             self,
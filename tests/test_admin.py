@@ -0,0 +1,155 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from blog.models import Post
+from blog.pagination import EstimatedCountPaginator
+
+# Сессия, пользователь, счётчик пагинатора, строки страницы и варианты
+# фильтров и полей list_editable — независимо от числа строк. У постов
+# ещё категории для действия переноса.
+CHANGELIST_QUERIES = {
+    "post": 9,
+    "comment": 6,
+}
+
+
+def blend_rows(mixer, count):
+    categories = mixer.cycle(5).blend("blog.Category")
+    locations = mixer.cycle(5).blend("blog.Location")
+    authors = mixer.cycle(count).blend("auth.User")
+    posts = mixer.cycle(count).blend(
+        "blog.Post", author=(author for author in authors),
+        category=mixer.sequence(*categories),
+        location=mixer.sequence(*locations), pub_date=timezone.now())
+    mixer.cycle(count).blend(
+        "blog.Comment", post=(post for post in posts),
+        author=(author for author in authors))
+
+
+def count_queries(client, url):
+    with CaptureQueriesContext(connection) as ctx:
+        response = client.get(url)
+    assert response.status_code == 200
+    return len(ctx.captured_queries)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("model", CHANGELIST_QUERIES)
+@pytest.mark.parametrize("rows", [10, 100])
+def test_admin_changelist_queries(admin_client, mixer, model, rows):
+    blend_rows(mixer, rows)
+    url = f"/admin/blog/{model}/"
+    assert count_queries(admin_client, url) == CHANGELIST_QUERIES[model], (
+        f"Убедитесь, что число запросов к БД на странице `{url}` "
+        "не зависит от числа строк."
+    )
+
+
+@pytest.mark.django_db
+def test_admin_post_change_form_uses_light_widgets(admin_client, mixer):
+    blend_rows(mixer, 1)
+    post = mixer.blend("blog.Post")
+    content = admin_client.get(
+        f"/admin/blog/post/{post.pk}/change/").content.decode()
+    assert 'class="vForeignKeyRawIdAdminField"' in content, (
+        "Убедитесь, что автор поста выбирается по id, а не списком "
+        "всех пользователей."
+    )
+    assert "admin-autocomplete" in content
+
+
+@pytest.mark.django_db
+def test_estimated_count_paginator(monkeypatch, mixer):
+    monkeypatch.setattr("blog.pagination.ADMIN_EXACT_COUNT_LIMIT", 5)
+    posts = mixer.cycle(10).blend("blog.Post")
+    posts[4].delete()
+    assert EstimatedCountPaginator(Post.objects.all(), 2).count == 10, (
+        "Убедитесь, что для большой таблицы без фильтров число строк "
+        "оценивается по диапазону первичного ключа."
+    )
+    small = Post.objects.filter(pk__in=[post.pk for post in posts[:3]])
+    assert EstimatedCountPaginator(small, 2).count == 3
+
+    filtered = Post.objects.exclude(pk=posts[0].pk)
+    assert EstimatedCountPaginator(filtered, 2).count == 8
+    mixer.blend("blog.Post")
+    with CaptureQueriesContext(connection) as ctx:
+        assert EstimatedCountPaginator(filtered, 2).count == 8, (
+            "Убедитесь, что точное число строк с фильтрами берётся из кеша."
+        )
+    assert len(ctx.captured_queries) == 1
+
+
+def changelist_ids(client, model, **params):
+    response = client.get(f"/admin/blog/{model}/", params)
+    assert response.status_code == 200
+    return [obj.pk for obj in response.context["cl"].result_list]
+
+
+@pytest.mark.django_db
+def test_admin_post_search_uses_index(admin_client, mixer, user):
+    in_text = mixer.blend("blog.Post", title="Поход", text="Вершина Эльбруса")
+    in_title = mixer.blend("blog.Post", title="Эльбрус зимой", text="Холод")
+    by_user = mixer.blend("blog.Post", author=user, title="Заметка",
+                          text="Эльбрус")
+    mixer.blend("blog.Post", title="Другое", text="Другое")
+    assert changelist_ids(admin_client, "post", q="эльбрус") == [
+        in_title.pk, by_user.pk, in_text.pk], (
+        "Убедитесь, что поиск в админке находит слова по индексу "
+        "и упорядочивает результаты по релевантности."
+    )
+    assert changelist_ids(admin_client, "post", q="эльбрус", o="1") == [
+        by_user.pk, in_text.pk, in_title.pk], (
+        "Убедитесь, что выбранная сортировка важнее релевантности."
+    )
+    assert changelist_ids(admin_client, "post", q=user.username) == [
+        by_user.pk], "Убедитесь, что посты можно найти по имени автора."
+    assert changelist_ids(
+        admin_client, "post", q=f"{user.username} поход") == []
+    assert changelist_ids(admin_client, "post", q="и") == []
+
+
+@pytest.mark.django_db
+def test_admin_search_by_username_keeps_text_matches(admin_client, mixer):
+    author = mixer.blend("auth.User", username="казбек")
+    by_author = mixer.blend("blog.Post", author=author, title="Заметка",
+                            text="Холод")
+    in_text = mixer.blend("blog.Post", title="Поход", text="Вершина Казбек")
+    mixer.blend("blog.Post", title="Другое", text="Другое")
+    assert changelist_ids(admin_client, "post", q="казбек") == [
+        in_text.pk, by_author.pk], (
+        "Убедитесь, что слово, совпавшее с именем пользователя, "
+        "по-прежнему ищется в тексте постов."
+    )
+    assert changelist_ids(admin_client, "post", q="казбек холод") == [
+        by_author.pk]
+
+
+@pytest.mark.django_db
+def test_admin_comment_search_uses_index(admin_client, mixer, user):
+    comment = mixer.blend("blog.Comment", text="Отличный рецепт")
+    by_user = mixer.blend("blog.Comment", author=user, text="Спасибо")
+    assert changelist_ids(admin_client, "comment", q="рецепты") == [
+        comment.pk]
+    assert changelist_ids(admin_client, "comment", q=user.username) == [
+        by_user.pk]
+
+
+@pytest.mark.django_db
+def test_admin_broad_search_is_not_counted(admin_client, mixer, monkeypatch):
+    monkeypatch.setattr("blog.search.backends.SEARCH_RANK_MAX_DOCS", 1)
+    monkeypatch.setattr("blog.pagination.ADMIN_EXACT_COUNT_LIMIT", 1)
+    posts = mixer.cycle(3).blend("blog.Post", text="Эльбрус")
+    mixer.blend("blog.Post", text="Казбек")
+    with CaptureQueriesContext(connection) as ctx:
+        response = admin_client.get("/admin/blog/post/", {"q": "эльбрус"})
+    assert [post.pk for post in response.context["cl"].result_list] == [
+        post.pk for post in reversed(posts)]
+    assert response.context["cl"].paginator.count == 3
+    assert not any("COUNT(" in query["sql"] and "MATCH" in query["sql"]
+                   for query in ctx.captured_queries), (
+        "Убедитесь, что число результатов частого запроса берётся "
+        "из статистики индекса, а не считается."
+    )
@@ -0,0 +1,94 @@
+import asyncio
+import importlib
+
+import pytest
+from asgiref.sync import iscoroutinefunction
+from django.core.cache import cache
+from django.urls import clear_url_caches, resolve
+
+import blog.urls
+import blogicum.urls
+from blog.async_views import ASYNC_VIEWS
+
+URLS = ("/", "/category/{slug}/", "/posts/{id}/", "/profile/{username}/")
+
+
+@pytest.fixture
+def use_async_views(settings):
+    def use(names):
+        settings.BLOG_ASYNC_VIEWS = names
+        importlib.reload(blog.urls)
+        importlib.reload(blogicum.urls)
+        clear_url_caches()
+
+    yield lambda: use(list(ASYNC_VIEWS))
+    use([])
+
+
+def format_url(url, post):
+    return url.format(slug=post.category.slug, id=post.id,
+                      username=post.author.username)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("url", URLS)
+def test_async_views_render_same_pages(
+        client, post_with_published_location, use_async_views, url):
+    url = format_url(url, post_with_published_location)
+    sync_content = client.get(url).content
+    cache.clear()
+    use_async_views()
+    assert iscoroutinefunction(resolve(url).func), (
+        "Убедитесь, что BLOG_ASYNC_VIEWS подключает асинхронное "
+        "представление."
+    )
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.content == sync_content, (
+        "Убедитесь, что асинхронное представление отдаёт ту же страницу, "
+        "что и синхронное."
+    )
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("url", URLS)
+def test_async_views_for_authenticated_user(
+        user_client, user, post_with_published_location, use_async_views,
+        url):
+    use_async_views()
+    response = user_client.get(
+        format_url(url, post_with_published_location))
+    assert response.status_code == 200
+    content = response.content.decode()
+    assert post_with_published_location.title in content
+    assert f"/profile/{user.username}/" in content
+
+
+@pytest.mark.django_db
+def test_async_views_not_found(client, mixer, use_async_views):
+    category = mixer.blend("blog.Category", is_published=False)
+    use_async_views()
+    assert client.get("/posts/404/").status_code == 404
+    assert client.get(f"/category/{category.slug}/").status_code == 404
+
+
+@pytest.mark.django_db
+def test_async_views_render_templates_outside_event_loop(
+        user_client, post_with_published_location, use_async_views,
+        monkeypatch):
+    from blog.cache import post_card_version
+
+    def checked_version():
+        with pytest.raises(RuntimeError):
+            asyncio.get_running_loop()
+        return post_card_version()
+
+    monkeypatch.setattr(
+        "blog.context_processors.post_card_version", checked_version)
+    use_async_views()
+    response = user_client.get("/")
+    assert response.status_code == 200
+    assert post_with_published_location.title in response.content.decode(), (
+        "Убедитесь, что асинхронное представление отрисовывает шаблон "
+        "вне цикла событий: шаблон читает кеш синхронно."
+    )
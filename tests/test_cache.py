@@ -0,0 +1,228 @@
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+from blog.models import Post
+
+
+@pytest.mark.django_db
+def test_post_cards_are_cached_until_related_data_changes(
+        user_client, post_with_published_location,
+        django_capture_on_commit_callbacks):
+    post = post_with_published_location
+    assert post.title in user_client.get("/").content.decode()
+
+    post.category.title = "Новое название категории"
+    with django_capture_on_commit_callbacks(execute=True):
+        post.category.save()
+    content = user_client.get("/").content.decode()
+    assert "Новое название категории" in content, (
+        "Убедитесь, что кеш карточек сбрасывается при изменении категории."
+    )
+
+    post.title = "Новый заголовок поста"
+    with django_capture_on_commit_callbacks(execute=True):
+        post.save()
+    content = user_client.get("/").content.decode()
+    assert "Новый заголовок поста" in content, (
+        "Убедитесь, что кеш карточки сбрасывается при изменении поста."
+    )
+
+    with django_capture_on_commit_callbacks(execute=True):
+        user_client.post(f"/posts/{post.id}/comment/", data={"text": "Текст"})
+    content = user_client.get("/").content.decode()
+    assert "Комментарии (1)" in content, (
+        "Убедитесь, что кеш карточки сбрасывается при новом комментарии."
+    )
+
+
+@pytest.mark.django_db
+def test_post_card_is_rendered_from_cache(
+        user_client, post_with_published_location):
+    post = post_with_published_location
+    user_client.get("/")
+    Post.objects.filter(pk=post.pk).update(title="Незаметное изменение")
+    content = user_client.get("/").content.decode()
+    assert post.title in content and "Незаметное изменение" not in content, (
+        "Убедитесь, что карточка поста берётся из кеша фрагментов."
+    )
+
+
+def count_queries(client, url):
+    with CaptureQueriesContext(connection) as ctx:
+        assert client.get(url).status_code == 200
+    return len(ctx.captured_queries)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("url", ["/", "/category/{slug}/", "/posts/{id}/"])
+def test_anonymous_pages_are_cached(
+        client, user_client, user, post_with_published_location, url):
+    post = post_with_published_location
+    url = url.format(slug=post.category.slug, id=post.id)
+    client.get(url)
+    assert count_queries(client, url) == 0, (
+        f"Убедитесь, что страница `{url}` отдаётся анонимным посетителям "
+        "из кеша без запросов к БД."
+    )
+    assert count_queries(user_client, url) > 0
+    assert user.username in user_client.get(url).content.decode(), (
+        "Убедитесь, что авторизованный пользователь не получает страницу "
+        "из кеша анонимных посетителей."
+    )
+
+
+@pytest.mark.django_db
+def test_anonymous_page_cache_is_reset_by_signals(
+        client, mixer, post_with_published_location,
+        django_capture_on_commit_callbacks):
+    post = post_with_published_location
+    client.get(f"/posts/{post.id}/")
+    with django_capture_on_commit_callbacks(execute=True):
+        mixer.blend("blog.Comment", post=post, text="Свежий комментарий")
+    content = client.get(f"/posts/{post.id}/").content.decode()
+    assert "Свежий комментарий" in content, (
+        "Убедитесь, что страница поста сбрасывается из кеша при новом "
+        "комментарии."
+    )
+
+    client.get("/")
+    post.location.name = "Новое место"
+    with django_capture_on_commit_callbacks(execute=True):
+        post.location.save()
+    assert "Новое место" in client.get("/").content.decode()
+
+
+@pytest.mark.django_db
+def test_page_cache_is_reset_after_commit(
+        client, post_with_published_location,
+        django_capture_on_commit_callbacks):
+    post = post_with_published_location
+    client.get("/")
+    post.title = "Новый заголовок поста"
+    with django_capture_on_commit_callbacks() as callbacks:
+        post.save()
+        assert "Новый заголовок поста" not in client.get(
+            "/").content.decode(), (
+            "Убедитесь, что кеш сбрасывается только после фиксации "
+            "транзакции: иначе параллельный запрос снова закеширует "
+            "старую страницу."
+        )
+    for callback in callbacks:
+        callback()
+    assert "Новый заголовок поста" in client.get("/").content.decode()
+
+
+@pytest.mark.django_db
+def test_anonymous_page_cache_headers(
+        client, user_client, post_with_published_location):
+    response = client.get("/")
+    assert "Cookie" in response["Vary"]
+    etag = response["ETag"]
+    assert client.get("/", HTTP_IF_NONE_MATCH=etag).status_code == 304
+
+    response = user_client.get("/")
+    assert "private" in response["Cache-Control"]
+    assert "Cookie" in response["Vary"]
+
+
+def form_choices(client, field):
+    form = client.get("/posts/create/").context["form"]
+    return {str(value): label for value, label in form.fields[field].choices}
+
+
+@pytest.mark.django_db
+def test_post_form_choices_are_cached(user_client, mixer, published_category,
+                                      published_location):
+    hidden = mixer.blend("blog.Category", is_published=False)
+    assert form_choices(user_client, "category") == {
+        "": "---------", str(published_category.pk): published_category.title,
+    }, "Убедитесь, что форма поста предлагает только опубликованные категории."
+    assert count_queries(user_client, "/posts/create/") == 2, (
+        "Убедитесь, что варианты категорий и местоположений берутся из кеша."
+    )
+
+    data = {"title": "Заголовок", "text": "Текст",
+            "pub_date": "2024-01-01 10:00",
+            "category": published_category.pk,
+            "location": published_location.pk}
+    with CaptureQueriesContext(connection) as ctx:
+        response = user_client.post("/posts/create/", data=data)
+    assert response.status_code == 302
+    assert not any('FROM "blog_category"' in query["sql"]
+                   for query in ctx.captured_queries), (
+        "Убедитесь, что выбранная категория проверяется по кешу."
+    )
+    post = Post.objects.get(title="Заголовок")
+    assert (post.category, post.location) == (
+        published_category, published_location)
+
+    response = user_client.post(
+        "/posts/create/", data={**data, "category": hidden.pk})
+    assert "category" in response.context["form"].errors
+
+
+@pytest.mark.django_db
+def test_post_form_choices_follow_changes(
+        user_client, admin_client, mixer, published_category,
+        django_capture_on_commit_callbacks):
+    form_choices(user_client, "category")
+    published_category.title = "Новое название"
+    with django_capture_on_commit_callbacks(execute=True):
+        published_category.save()
+    assert form_choices(user_client, "category")[
+        str(published_category.pk)] == "Новое название"
+
+    location = mixer.blend("blog.Location", is_published=False)
+    form_choices(user_client, "location")
+    with django_capture_on_commit_callbacks(execute=True):
+        admin_client.post("/admin/blog/location/", {
+            "action": "publish", "index": "0",
+            "_selected_action": [location.pk],
+        })
+    assert str(location.pk) in form_choices(user_client, "location"), (
+        "Убедитесь, что кеш вариантов сбрасывается массовыми действиями."
+    )
+
+
+def test_project_cache_is_shared_between_processes():
+    from blog.checks import check_shared_cache
+
+    assert check_shared_cache(None) == [], (
+        "Убедитесь, что в настройках задан общий для процессов кеш вне БД."
+    )
+    for backend, error_id in (("locmem.LocMemCache", "blog.W001"),
+                              ("db.DatabaseCache", "blog.W002")):
+        with override_settings(CACHES={"default": {
+            "BACKEND": f"django.core.cache.backends.{backend}",
+            "LOCATION": "blog_cache",
+        }}):
+            assert [error.id for error in check_shared_cache(None)] == [
+                error_id]
+
+
+@pytest.mark.django_db
+def test_evicted_versions_do_not_revive_stale_pages(rf):
+    from django.http import HttpResponse
+
+    from blog.cache import (cache_page, get_cached_page, invalidate_post_cards,
+                            invalidate_tags, post_card_version)
+
+    request = rf.get("/")
+    cache_page(request, HttpResponse("Старая страница"), ["posts"], 60)
+    invalidate_tags("posts")
+    cache.delete("tag:posts")
+    assert get_cached_page(request) is None, (
+        "Убедитесь, что версия тега, вытесненная из кеша, не совпадает с "
+        "версией страниц, сохранённых до сброса."
+    )
+
+    version = post_card_version()
+    invalidate_post_cards()
+    cache.delete("post_card_version")
+    assert post_card_version() != version, (
+        "Убедитесь, что версия карточек постов после вытеснения из кеша "
+        "не повторяет прежнюю."
+    )
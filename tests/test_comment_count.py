@@ -0,0 +1,89 @@
+import pytest
+from django.core.management import call_command
+
+from blog.models import Comment, Post
+
+
+def comment_count(post):
+    return Post.objects.values_list(
+        "comment_count", flat=True).get(pk=post.pk)
+
+
+@pytest.mark.django_db
+def test_comment_count_follows_comments(
+        user_client, post_with_published_location):
+    post = post_with_published_location
+    assert comment_count(post) == 0
+
+    for text in ("Первый", "Второй"):
+        user_client.post(f"/posts/{post.id}/comment/", data={"text": text})
+    assert comment_count(post) == 2, (
+        "Убедитесь, что добавление комментария увеличивает "
+        "`Post.comment_count`."
+    )
+
+    comment = Comment.objects.filter(post=post).first()
+    user_client.post(f"/posts/{post.id}/delete_comment/{comment.id}/")
+    assert comment_count(post) == 1, (
+        "Убедитесь, что удаление комментария уменьшает `Post.comment_count`."
+    )
+
+    response = user_client.get("/")
+    card_post = next(p for p in response.context["page_obj"] if p == post)
+    assert card_post.comment_count == 1
+
+
+@pytest.mark.django_db
+def test_comment_count_follows_bulk_delete(mixer, post_with_published_location):
+    post = post_with_published_location
+    mixer.cycle(3).blend("blog.Comment", post=post)
+    Comment.objects.filter(post=post)[:1].get().delete()
+    Comment.objects.filter(post=post).delete()
+    assert comment_count(post) == 0
+
+
+@pytest.mark.django_db
+def test_recount_comments_repairs_counters(
+        mixer, post_with_published_location):
+    post = post_with_published_location
+    mixer.cycle(3).blend("blog.Comment", post=post)
+    Post.objects.filter(pk=post.pk).update(comment_count=42)
+
+    call_command("recount_comments", batch_size=1)
+    assert comment_count(post) == 3, (
+        "Убедитесь, что команда `recount_comments` восстанавливает "
+        "счётчики комментариев."
+    )
+
+
+@pytest.mark.django_db
+def test_post_save_keeps_concurrent_comment_count(
+        mixer, user_client, post_with_published_location):
+    post = Post.objects.get(pk=post_with_published_location.pk)
+    mixer.blend("blog.Comment", post=post)
+    post.title = "Новый заголовок"
+    post.save()
+    assert comment_count(post) == 1, (
+        "Убедитесь, что сохранение поста не перезаписывает счётчик "
+        "комментариев, изменённый после загрузки поста."
+    )
+
+    user_client.post(f"/posts/{post.id}/edit/", data={
+        "title": "Правка", "text": post.text,
+        "pub_date": "2024-01-01 10:00", "category": post.category_id,
+        "location": post.location_id,
+    })
+    assert Post.objects.get(pk=post.pk).title == "Правка"
+    assert comment_count(post) == 1
+
+
+@pytest.mark.django_db
+def test_comment_delete_with_drifted_counter(mixer,
+                                             post_with_published_location):
+    post = post_with_published_location
+    comment = mixer.blend("blog.Comment", post=post)
+    Post.objects.filter(pk=post.pk).update(comment_count=0)
+    comment.delete()
+    assert comment_count(post) == 0, (
+        "Убедитесь, что счётчик комментариев не опускается ниже нуля."
+    )
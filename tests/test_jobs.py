@@ -0,0 +1,80 @@
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+
+from blog.jobs import HANDLERS, claim_job, enqueue, run_pending
+from blog.models import Job
+from constants import JOB_MAX_ATTEMPTS, JOB_STALE_TIMEOUT
+
+
+@pytest.fixture
+def flaky_handler():
+    calls = []
+
+    def flaky(fail_times):
+        calls.append(fail_times)
+        if len(calls) <= fail_times:
+            raise OSError("хранилище недоступно")
+
+    HANDLERS["flaky"] = flaky
+    yield calls
+    del HANDLERS["flaky"]
+
+
+def make_ready(job):
+    Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+
+
+@pytest.mark.django_db
+def test_failed_job_is_retried_later(flaky_handler):
+    job = enqueue("flaky", fail_times=1)
+    [result] = run_pending()
+    assert result.status == Job.PENDING
+    assert result.run_after > timezone.now(), (
+        "Убедитесь, что упавшая задача повторяется с задержкой."
+    )
+    assert "хранилище недоступно" in result.last_error
+    assert run_pending() == []
+
+    make_ready(job)
+    [result] = run_pending()
+    assert result.status == Job.DONE
+    assert result.attempts == 2
+
+
+@pytest.mark.django_db
+def test_job_fails_after_max_attempts(flaky_handler):
+    job = enqueue("flaky", fail_times=JOB_MAX_ATTEMPTS)
+    for _ in range(JOB_MAX_ATTEMPTS):
+        make_ready(job)
+        run_pending()
+    job.refresh_from_db()
+    assert job.status == Job.FAILED
+    assert len(flaky_handler) == JOB_MAX_ATTEMPTS
+
+
+@pytest.mark.django_db
+def test_job_is_claimed_once(flaky_handler):
+    job = enqueue("flaky", fail_times=0)
+    assert claim_job().pk == job.pk
+    assert claim_job() is None, (
+        "Убедитесь, что задачу, которую уже выполняет воркер, не забирает "
+        "другой воркер."
+    )
+    Job.objects.filter(pk=job.pk).update(
+        started_at=timezone.now() - timedelta(seconds=JOB_STALE_TIMEOUT + 1))
+    assert claim_job().pk == job.pk, (
+        "Убедитесь, что задача упавшего воркера возвращается в очередь."
+    )
+
+
+@pytest.mark.django_db
+def test_run_worker_reports_progress(flaky_handler):
+    enqueue("flaky", fail_times=0)
+    enqueue("flaky", fail_times=5)
+    out = StringIO()
+    call_command("run_worker", "--once", stdout=out)
+    assert "Выполнено задач: 1, с ошибкой: 1" in out.getvalue()
@@ -0,0 +1,221 @@
+from datetime import timedelta
+
+import pytest
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from blog.jobs import run_pending
+from blog.models import Comment, Job, Post
+
+URL = "/admin/blog/post/"
+
+
+@pytest.fixture
+def blend_posts(mixer, user, published_category):
+    def blend(count, **kwargs):
+        fields = {
+            "author": user, "category": published_category,
+            "is_published": True,
+            "pub_date": timezone.now() - timedelta(days=1),
+        }
+        fields.update(kwargs)
+        return mixer.cycle(count).blend("blog.Post", **fields)
+    return blend
+
+
+def run_action(client, action, posts, url=URL, **data):
+    """Применить действие ко всем постам списка («выбрать все»).
+
+    Кеш сбрасывается после фиксации транзакции, поэтому отложенные
+    обработчики выполняются сразу после запроса.
+    """
+    with TestCase.captureOnCommitCallbacks(execute=True):
+        return client.post(url, {
+            "action": action, "select_across": "1", "index": "0",
+            "_selected_action": [posts[0].pk], **data,
+        })
+
+
+def count_action_queries(client, action, posts, **data):
+    with CaptureQueriesContext(connection) as ctx:
+        response = run_action(client, action, posts, **data)
+    assert response.status_code == 302
+    return len(ctx.captured_queries)
+
+
+@pytest.mark.django_db
+def test_publish_actions_use_constant_queries(admin_client, blend_posts):
+    few, many = blend_posts(2), blend_posts(20, is_published=False)
+    queries = count_action_queries(admin_client, "unpublish", few)
+    assert not Post.objects.filter(is_published=True).exists()
+    assert count_action_queries(
+        admin_client, "publish", few + many) == queries, (
+        "Убедитесь, что массовая публикация не обрабатывает посты по одному."
+    )
+    assert Post.objects.filter(is_published=True).count() == 22
+
+
+@pytest.mark.django_db
+def test_publish_action_resets_feeds(client, admin_client, blend_posts):
+    posts = blend_posts(3)
+    assert len(client.get("/").context["page_obj"]) == 3
+    run_action(admin_client, "unpublish", posts)
+    assert len(client.get("/").context["page_obj"]) == 0, (
+        "Убедитесь, что после снятия с публикации кеш ленты сброшен."
+    )
+    run_action(admin_client, "publish", posts)
+    assert len(client.get("/").context["page_obj"]) == 3
+
+
+@pytest.mark.django_db
+def test_move_to_category(client, admin_client, blend_posts, mixer,
+                          published_category):
+    posts = blend_posts(3)
+    target = mixer.blend("blog.Category", is_published=True)
+    category_url = f"/category/{published_category.slug}/"
+    assert len(client.get(category_url).context["page_obj"]) == 3
+    run_action(admin_client, "move_to_category", posts,
+               url=f"{URL}?id__in={posts[0].pk},{posts[1].pk}",
+               category=target.pk)
+    assert set(Post.objects.filter(category=target)) == set(posts[:2]), (
+        "Убедитесь, что «выбрать все» переносит только отфильтрованные "
+        "посты."
+    )
+    assert len(client.get(category_url).context["page_obj"]) == 1
+    assert len(client.get(
+        f"/category/{target.slug}/").context["page_obj"]) == 2
+
+
+@pytest.mark.django_db
+def test_move_without_category_changes_nothing(admin_client, blend_posts,
+                                               published_category):
+    posts = blend_posts(2)
+    response = run_action(admin_client, "move_to_category", posts)
+    assert response.status_code == 302
+    assert Post.objects.filter(category=published_category).count() == 2
+
+
+@pytest.mark.django_db
+def test_delete_with_comments(client, admin_client, blend_posts, mixer):
+    posts = blend_posts(3, title="Ледник")
+    mixer.cycle(3).blend(
+        "blog.Comment", post=(post for post in posts), text="Ледник")
+    response = run_action(admin_client, "delete_with_comments", posts)
+    assert response.status_code == 200
+    content = response.content.decode()
+    assert "Будут удалены посты (3) и все их комментарии (3)" in content, (
+        "Убедитесь, что перед удалением показывается число постов "
+        "и комментариев."
+    )
+    assert Post.objects.count() == 3
+
+    run_action(admin_client, "delete_with_comments", posts, confirm="yes")
+    assert not Post.objects.exists()
+    assert not Comment.objects.exists()
+    assert client.get(
+        "/search/", {"q": "ледник"}).context["page_obj"].paginator.count == 0
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT count(*) FROM blog_comment_search")
+        assert cursor.fetchone() == (0,), (
+            "Убедитесь, что удалённые комментарии убираются из индекса."
+        )
+
+
+@pytest.mark.django_db
+def test_large_selection_runs_in_background(admin_client, blend_posts,
+                                            monkeypatch):
+    monkeypatch.setattr("blog.moderation.MODERATION_SYNC_LIMIT", 4)
+    monkeypatch.setattr("blog.moderation.MODERATION_CHUNK_SIZE", 2)
+    posts = blend_posts(5)
+    response = run_action(admin_client, "unpublish", posts)
+    assert response.status_code == 302
+    assert Job.objects.filter(kind="moderate_posts").count() == 3, (
+        "Убедитесь, что большая выборка разбивается на фоновые задачи."
+    )
+    assert Post.objects.filter(is_published=True).count() == 5
+    assert all(job.status == Job.DONE for job in run_pending())
+    assert not Post.objects.filter(is_published=True).exists()
+
+
+@pytest.mark.django_db
+def test_unpublish_category_resets_pages(client, admin_client, blend_posts,
+                                         published_category):
+    blend_posts(2)
+    assert len(client.get("/").context["page_obj"]) == 2
+    with TestCase.captureOnCommitCallbacks(execute=True):
+        admin_client.post("/admin/blog/category/", {
+            "action": "unpublish", "index": "0",
+            "_selected_action": [published_category.pk],
+        })
+    published_category.refresh_from_db()
+    assert not published_category.is_published
+    assert len(client.get("/").context["page_obj"]) == 0, (
+        "Убедитесь, что снятие категории с публикации сбрасывает кеш ленты."
+    )
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("action", ["unpublish", "delete_with_comments"])
+def test_moderation_resets_comment_pages(client, admin_client, blend_posts,
+                                         action):
+    posts = blend_posts(2)
+    urls = [f"/posts/{post.pk}/comments/" for post in posts]
+    assert all(client.get(url).status_code == 200 for url in urls)
+    run_action(admin_client, action, posts, confirm="yes")
+    assert all(client.get(url).status_code == 404 for url in urls), (
+        "Убедитесь, что массовые действия сбрасывают кеш комментариев "
+        "к постам."
+    )
+
+
+@pytest.mark.django_db
+def test_comment_pages_are_tagged_like_post_page(client, blend_posts, mixer):
+    from blog.cache import invalidate_tags
+
+    post, = blend_posts(1, location=mixer.blend("blog.Location"))
+    url = f"/posts/{post.pk}/comments/"
+    for tag in (f"author:{post.author_id}", f"category:{post.category_id}",
+                f"location:{post.location_id}"):
+        client.get(url)
+        with CaptureQueriesContext(connection) as ctx:
+            client.get(url)
+        assert not ctx.captured_queries
+        invalidate_tags(tag)
+        with CaptureQueriesContext(connection) as ctx:
+            client.get(url)
+        assert ctx.captured_queries, (
+            "Убедитесь, что комментарии к посту помечены теми же тегами, "
+            f"что и страница поста: {tag}."
+        )
+
+
+@pytest.mark.django_db
+def test_moderation_resets_caches_once_after_commit(
+        client, admin_client, blend_posts,
+        django_capture_on_commit_callbacks):
+    from blog.moderation import reset_post_caches
+
+    posts = blend_posts(3)
+    client.get("/")
+    with django_capture_on_commit_callbacks() as callbacks:
+        admin_client.post(URL, {
+            "action": "unpublish", "select_across": "1", "index": "0",
+            "_selected_action": [posts[0].pk],
+        })
+        with CaptureQueriesContext(connection) as ctx:
+            client.get("/")
+        assert not ctx.captured_queries, (
+            "Убедитесь, что массовые действия сбрасывают кеш после "
+            "фиксации транзакции."
+        )
+    resets = [callback for callback in callbacks
+              if getattr(callback, "func", None) is reset_post_caches]
+    assert len(resets) == 1, (
+        "Убедитесь, что кеш пачки постов сбрасывается одним отложенным "
+        "обработчиком."
+    )
+    for callback in callbacks:
+        callback()
+    assert len(client.get("/").context["page_obj"]) == 0
@@ -0,0 +1,133 @@
+import pytest
+from conftest import N_PER_PAGE
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from constants import COMMENTS_PAGINATE_COUNT
+
+
+@pytest.mark.django_db
+@override_settings(BLOG_CURSOR_PAGINATION=True)
+def test_cursor_pagination_walks_whole_feed(
+        user_client, many_posts_with_published_locations):
+    expected_ids = sorted(
+        (post.pub_date, post.id)
+        for post in many_posts_with_published_locations
+    )[::-1]
+    expected_ids = [post_id for _, post_id in expected_ids]
+
+    seen_ids, pages, url = [], [], "/"
+    while url:
+        page_obj = user_client.get(url).context["page_obj"]
+        pages.append(page_obj)
+        seen_ids.extend(post.id for post in page_obj)
+        url = page_obj.has_next() and f"/?cursor={page_obj.next_cursor}"
+    assert seen_ids == expected_ids, (
+        "Убедитесь, что при листании ленты по курсору каждый пост "
+        "показывается ровно один раз в порядке убывания даты публикации."
+    )
+    assert all(len(page) <= N_PER_PAGE for page in pages)
+
+    last_page = pages[-1]
+    previous = user_client.get(
+        f"/?cursor={last_page.previous_cursor}").context["page_obj"]
+    assert [post.id for post in previous] == [
+        post.id for post in pages[-2]
+    ], "Убедитесь, что ссылка на предыдущую страницу ведёт назад по ленте."
+
+
+@pytest.mark.django_db
+@override_settings(BLOG_CURSOR_PAGINATION=True)
+def test_broken_cursor_opens_first_page(
+        user_client, many_posts_with_published_locations):
+    first_page = user_client.get("/").context["page_obj"]
+    response = user_client.get("/?cursor=not-a-cursor")
+    assert response.status_code == 200
+    assert [post.id for post in response.context["page_obj"]] == [
+        post.id for post in first_page
+    ]
+
+
+def total_count_queries(captured_queries):
+    return sum(
+        query["sql"].upper().startswith("SELECT COUNT(*)")
+        for query in captured_queries
+    )
+
+
+@pytest.mark.django_db
+def test_feed_count_is_cached_until_posts_change(
+        mixer, user, user_client, many_posts_with_published_locations,
+        django_capture_on_commit_callbacks):
+    user_client.get("/")
+    with CaptureQueriesContext(connection) as ctx:
+        response = user_client.get("/?page=2")
+    assert total_count_queries(ctx.captured_queries) == 0, (
+        "Убедитесь, что число постов в ленте берётся из кеша."
+    )
+    num_pages = response.context["page_obj"].paginator.num_pages
+
+    post = many_posts_with_published_locations[0]
+    with django_capture_on_commit_callbacks(execute=True):
+        mixer.cycle(N_PER_PAGE).blend(
+            "blog.Post", author=user, category=post.category,
+            pub_date=post.pub_date)
+    response = user_client.get("/")
+    new_num_pages = response.context["page_obj"].paginator.num_pages
+    assert new_num_pages == num_pages + 1, (
+        "Убедитесь, что кеш числа постов сбрасывается при добавлении поста."
+    )
+
+
+@pytest.mark.django_db
+def test_page_range_is_windowed(user_client, published_category, mixer, user):
+    mixer.cycle(N_PER_PAGE * 30).blend(
+        "blog.Post", author=user, category=published_category)
+    page_obj = user_client.get("/?page=15").context["page_obj"]
+    page_range = list(page_obj.elided_page_range)
+    assert len(page_range) < 10
+    assert page_range[0] == 1 and page_range[-1] == 30
+    assert 15 in page_range
+
+
+@pytest.mark.django_db
+def test_comments_are_loaded_by_pages(
+        mixer, user_client, post_with_published_location):
+    post = post_with_published_location
+    comments = mixer.cycle(COMMENTS_PAGINATE_COUNT * 2 + 3).blend(
+        "blog.Comment", post=post)
+    expected_ids = [
+        comment.id
+        for comment in sorted(comments, key=lambda c: (c.created_at, c.id))
+    ]
+
+    response = user_client.get(f"/posts/{post.id}/")
+    page = response.context["comments"]
+    assert len(page) == COMMENTS_PAGINATE_COUNT, (
+        "Убедитесь, что на странице поста сразу отображается только первая "
+        "страница комментариев."
+    )
+    seen_ids = [comment.id for comment in page]
+    while page.has_next():
+        url = reverse("blog:comments", args=(post.id,))
+        response = user_client.get(f"{url}?cursor={page.next_cursor}")
+        assert response.status_code == 200
+        assert "form" not in response.context
+        page = response.context["comments"]
+        seen_ids.extend(comment.id for comment in page)
+    assert seen_ids == expected_ids, (
+        "Убедитесь, что подгружаемые комментарии идут в порядке создания "
+        "и каждый показывается ровно один раз."
+    )
+
+
+@pytest.mark.django_db
+def test_comments_of_hidden_post_are_not_available(
+        client, post_with_published_location):
+    post = post_with_published_location
+    post.is_published = False
+    post.save()
+    response = client.get(reverse("blog:comments", args=(post.id,)))
+    assert response.status_code == 404
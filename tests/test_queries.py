@@ -0,0 +1,121 @@
+from datetime import timedelta
+
+import pytest
+from conftest import N_PER_PAGE
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from mixer.backend.django import Mixer
+
+from blog.scheduler import scheduler
+from blog.urls import urlpatterns
+
+
+def count_queries(client, url):
+    with CaptureQueriesContext(connection) as ctx:
+        response = client.get(url)
+    assert response.status_code == 200, (
+        f"Убедитесь, что страница `{url}` отображается без ошибок."
+    )
+    return len(ctx.captured_queries)
+
+
+def blend_feed_posts(mixer: Mixer, n, author, category, locations):
+    return mixer.cycle(n).blend(
+        "blog.Post",
+        author=author,
+        category=category,
+        location=mixer.sequence(*locations),
+        is_published=True,
+        pub_date=timezone.now() - timedelta(days=1),
+    )
+
+
+@pytest.fixture
+def feed_urls(user, published_category):
+    return (
+        "/",
+        f"/category/{published_category.slug}/",
+        f"/profile/{user.username}/",
+    )
+
+
+@pytest.mark.django_db
+def test_feed_queries_do_not_depend_on_page_size(
+        mixer, user, user_client, published_category, published_locations,
+        feed_urls, django_capture_on_commit_callbacks):
+    blend_feed_posts(
+        mixer, 1, user, published_category, published_locations)
+    single_post_queries = {
+        url: count_queries(user_client, url) for url in feed_urls
+    }
+
+    with django_capture_on_commit_callbacks(execute=True):
+        blend_feed_posts(
+            mixer, N_PER_PAGE, user, published_category, published_locations)
+    for url in feed_urls:
+        full_page_queries = count_queries(user_client, url)
+        assert full_page_queries == single_post_queries[url], (
+            f"Убедитесь, что число запросов к БД на странице `{url}` не "
+            "зависит от количества постов на странице: "
+            f"{single_post_queries[url]} запросов для одного поста и "
+            f"{full_page_queries} для полной страницы."
+        )
+
+
+# Число запросов к БД для каждого маршрута из blog/urls.py
+# (авторизованный автор поста, пустой кеш).
+URL_QUERY_COUNTS = [
+    ("index", "get", {}, 4),
+    ("create_post", "get", {}, 4),
+    ("edit_post", "get", {"post_id"}, 5),
+    ("delete_post", "get", {"post_id"}, 4),
+    ("delete_post", "post", {"post_id"}, 12),
+    ("post_detail", "get", {"post_id"}, 4),
+    ("search", "get", {}, 5),
+    ("category_posts", "get", {"slug"}, 5),
+    ("edit_profile", "get", {}, 2),
+    ("profile", "get", {"username"}, 5),
+    ("comments", "get", {"post_id"}, 4),
+    ("add_comment", "post", {"post_id"}, 7),
+    ("edit_comment", "get", {"post_id", "comment_id"}, 3),
+    ("delete_comment", "get", {"post_id", "comment_id"}, 3),
+    ("delete_comment", "post", {"post_id", "comment_id"}, 8),
+]
+
+
+def test_every_blog_url_has_query_count():
+    covered = {name for name, *_ in URL_QUERY_COUNTS}
+    missing = {pattern.name for pattern in urlpatterns} - covered
+    assert not missing, (
+        f"Добавьте в URL_QUERY_COUNTS проверку маршрутов: {missing}"
+    )
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    ("name", "method", "kwarg_names", "expected"), URL_QUERY_COUNTS,
+    ids=[f"{name}-{method}" for name, method, *_ in URL_QUERY_COUNTS],
+)
+def test_blog_url_query_count(
+        mixer, user, user_client, post_with_published_location,
+        django_assert_num_queries, name, method, kwarg_names, expected):
+    post = post_with_published_location
+    comment = mixer.blend("blog.Comment", post=post, author=user)
+    mixer.cycle(2).blend("blog.Comment", post=post)
+    all_kwargs = {
+        "post_id": post.id,
+        "comment_id": comment.id,
+        "slug": post.category.slug,
+        "username": user.username,
+    }
+    url = reverse(f"blog:{name}", kwargs={
+        kwarg: all_kwargs[kwarg] for kwarg in kwarg_names
+    })
+    scheduler.next_publication()
+
+    with django_assert_num_queries(expected):
+        response = getattr(user_client, method)(
+            url, data={"text": "Текст", "q": post.title})
+    assert response.status_code in (200, 302)
@@ -0,0 +1,102 @@
+from datetime import timedelta
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from blog.models import Comment
+from blog.pagination import CursorPaginator
+from blog.service import get_objects
+
+
+def query_plan(sql, params=()):
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def assert_uses_indexes(plan, description):
+    full_scans = [
+        step for step in plan
+        if step.startswith("SCAN") and "USING" not in step
+    ]
+    assert not full_scans, (
+        f"Убедитесь, что запрос {description} не читает таблицу целиком: "
+        f"{plan}"
+    )
+    assert not any("TEMP B-TREE" in step for step in plan), (
+        f"Убедитесь, что запрос {description} не сортирует строки во "
+        f"временном B-дереве: {plan}"
+    )
+
+
+def cursor_page_plans(queryset, obj, ordering="-pub_date"):
+    paginator = CursorPaginator(queryset, 10, ordering)
+    with CaptureQueriesContext(connection) as ctx:
+        for direction in ("next", "prev"):
+            paginator.get_page(paginator.encode_cursor(direction, obj))
+    return [query_plan(query["sql"]) for query in ctx.captured_queries]
+
+
+@pytest.mark.django_db
+def test_feed_queries_use_indexes(post_with_published_location):
+    post = post_with_published_location
+    feeds = {
+        "общей ленты": get_objects(feed=True),
+        "ленты категории": get_objects(feed=True).filter(
+            category=post.category),
+        "ленты автора": get_objects(profile_user=post.author, feed=True),
+    }
+    for description, feed in feeds.items():
+        sql, params = feed[:10].query.sql_with_params()
+        assert_uses_indexes(query_plan(sql, params), description)
+        for plan in cursor_page_plans(feed, post):
+            assert_uses_indexes(plan, f"{description} по курсору")
+
+
+@pytest.mark.django_db
+def test_comment_listing_uses_index(mixer, post_with_published_location):
+    comments = Comment.objects.filter(post=post_with_published_location)
+    sql, params = comments.query.sql_with_params()
+    assert_uses_indexes(
+        query_plan(sql, params), "комментариев к посту")
+    comment = mixer.blend("blog.Comment", post=post_with_published_location)
+    for plan in cursor_page_plans(comments, comment, "created_at"):
+        assert_uses_indexes(plan, "комментариев к посту по курсору")
+
+
+def count_steps(paginator, cursor):
+    """Число шагов виртуальной машины SQLite на чтение страницы."""
+    steps = 0
+
+    def step():
+        nonlocal steps
+        steps += 1
+
+    connection.ensure_connection()
+    connection.connection.set_progress_handler(step, 1)
+    try:
+        paginator.get_page(cursor)
+    finally:
+        connection.connection.set_progress_handler(None, 1)
+    return steps
+
+
+@pytest.mark.django_db
+def test_deep_cursor_page_costs_like_first_page(mixer, user,
+                                                published_category):
+    now = timezone.now()
+    posts = mixer.cycle(200).blend(
+        "blog.Post", author=user, category=published_category,
+        is_published=True,
+        pub_date=(now - timedelta(hours=hours) for hours in range(1, 201)))
+    feed = get_objects(feed=True)
+    paginator = CursorPaginator(feed, 10)
+    first = count_steps(paginator, None)
+    deep = count_steps(
+        paginator, paginator.encode_cursor("next", posts[-20]))
+    assert deep < first * 2, (
+        "Убедитесь, что страница ленты по курсору ищет диапазон в индексе "
+        "от границы курсора, а не перебирает все более новые посты."
+    )
@@ -0,0 +1,144 @@
+from io import BytesIO, StringIO
+
+import pytest
+from django.core.files.images import ImageFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import DatabaseError
+from PIL import Image
+
+from blog.images import rendition_names
+from blog.jobs import run_pending
+from blog.models import Job, Post
+from constants import IMAGE_RENDITION_WIDTHS
+
+
+def image_file(size, mode="RGB", image_format="JPEG", name="photo.jpg"):
+    buffer = BytesIO()
+    Image.new(mode, size).save(buffer, format=image_format)
+    return ImageFile(buffer, name=name)
+
+
+@pytest.fixture
+def big_image_post(mixer, post_with_published_location):
+    post = post_with_published_location
+    post.image = image_file((1600, 900))
+    post.save()
+    run_pending()
+    post.refresh_from_db()
+    return post
+
+
+@pytest.mark.django_db
+def test_renditions_are_made_in_background(post_with_published_location):
+    post = post_with_published_location
+    post.image = image_file((1600, 900))
+    post.save()
+    assert post.renditions is None, (
+        "Убедитесь, что копии изображения создаются не в запросе, "
+        "а фоновой задачей."
+    )
+    run_pending()
+    post.refresh_from_db()
+    assert post.renditions is not None
+
+
+@pytest.mark.django_db
+def test_renditions_are_made_on_upload(client, big_image_post):
+    post = Post.objects.get(pk=big_image_post.pk)
+    assert [width for _, width in post.image_renditions["webp"]] == list(
+        IMAGE_RENDITION_WIDTHS), (
+        "Убедитесь, что при загрузке изображения создаются его копии "
+        "всех размеров меньше оригинала."
+    )
+    for name in rendition_names(post.image_renditions):
+        assert default_storage.exists(name)
+    with default_storage.open(post.image_renditions["webp"][0][0]) as file:
+        assert Image.open(file).format == "WEBP"
+
+    content = client.get("/").content.decode("utf-8")
+    assert 'type="image/webp"' in content
+    assert post.renditions.srcset in content
+    assert 'width="1600" height="900"' in content, (
+        "Убедитесь, что карточка поста указывает размеры изображения."
+    )
+
+
+@pytest.mark.django_db
+def test_small_and_transparent_images(post_with_published_location):
+    post = post_with_published_location
+    post.image = image_file((100, 50), "RGBA", "PNG", "logo.png")
+    post.save()
+    run_pending()
+    post.refresh_from_db()
+    [[name, width]] = post.image_renditions["fallback"]
+    assert width == 100 and name.endswith(".png"), (
+        "Убедитесь, что изображение не увеличивается, а прозрачность "
+        "сохраняется в запасной копии PNG."
+    )
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures("no_release_grace")
+def test_replaced_image_drops_old_renditions(
+        big_image_post, django_capture_on_commit_callbacks):
+    old_names = rendition_names(big_image_post.image_renditions)
+    big_image_post.image = image_file((800, 600))
+    with django_capture_on_commit_callbacks(execute=True):
+        big_image_post.save()
+        run_pending()
+    big_image_post.refresh_from_db()
+    assert not any(default_storage.exists(name) for name in old_names)
+    assert big_image_post.renditions is not None
+
+    new_names = rendition_names(big_image_post.image_renditions)
+    with django_capture_on_commit_callbacks(execute=True):
+        big_image_post.delete()
+    assert not any(default_storage.exists(name) for name in new_names)
+
+
+@pytest.mark.django_db
+def test_backfill_command(big_image_post):
+    Post.objects.filter(pk=big_image_post.pk).update(image_renditions={})
+    out = StringIO()
+    call_command("make_renditions", workers=1, stdout=out)
+    post = Post.objects.get(pk=big_image_post.pk)
+    assert post.renditions is not None
+    assert "копии созданы для 1" in out.getvalue()
+
+
+@pytest.mark.django_db
+def test_one_pending_renditions_job_per_post(post_with_published_location):
+    post = post_with_published_location
+    run_pending()
+    for size in ((1600, 900), (800, 600)):
+        post.image = image_file(size, name=f"{size[0]}.jpg")
+        post.save()
+    assert Job.objects.filter(
+            kind="renditions", status=Job.PENDING).count() == 1, (
+        "Убедитесь, что для поста с ожидающей задачей на копии изображения "
+        "вторая задача не ставится."
+    )
+    run_pending()
+    post.refresh_from_db()
+    assert post.renditions is not None
+    assert post.image_renditions["source"] == post.image.name
+
+
+@pytest.mark.django_db
+def test_post_is_not_saved_without_renditions_job(
+        monkeypatch, post_with_published_location):
+    def fail(*args, **kwargs):
+        raise DatabaseError("очередь недоступна")
+
+    post = post_with_published_location
+    run_pending()
+    monkeypatch.setattr("blog.signals.enqueue", fail)
+    post.title = "Новый заголовок"
+    post.image = image_file((1600, 900))
+    with pytest.raises(DatabaseError):
+        post.save()
+    assert Post.objects.get(pk=post.pk).title != "Новый заголовок", (
+        "Убедитесь, что пост и задача на копии изображения сохраняются "
+        "в одной транзакции."
+    )
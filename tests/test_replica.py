@@ -0,0 +1,76 @@
+from datetime import timedelta
+
+import pytest
+from django.db import connections, router, transaction
+from django.urls import reverse
+from django.utils import timezone
+
+from blog.models import Post
+from blog.routers import PRIMARY_COOKIE, read_from
+
+pytestmark = pytest.mark.django_db(
+    transaction=True, databases=["default", "replica"])
+
+
+def sync_replica():
+    """Скопировать основную базу в реплику, как это сделала бы репликация."""
+    for alias in ("default", "replica"):
+        connections[alias].ensure_connection()
+    connections["default"].connection.backup(connections["replica"].connection)
+
+
+@pytest.fixture(autouse=True)
+def read_replica(settings):
+    settings.BLOG_READ_REPLICA = "replica"
+
+
+def blend_post(mixer, author, category, title):
+    return mixer.blend(
+        "blog.Post", author=author, category=category, location=None,
+        title=title, is_published=True,
+        pub_date=timezone.now() - timedelta(days=1))
+
+
+def test_anonymous_feed_reads_replica(
+        client, mixer, user, published_category):
+    sync_replica()
+    blend_post(mixer, user, published_category, "Свежий пост")
+    assert "Свежий пост" not in client.get("/").content.decode(), (
+        "Убедитесь, что лента для анонимных посетителей читается из реплики."
+    )
+    sync_replica()
+    assert "Свежий пост" in client.get("/").content.decode(), (
+        "Убедитесь, что страница, прочитанная из отстающей реплики, "
+        "не попадает в кеш."
+    )
+
+
+def test_author_reads_own_writes(
+        user_client, another_user_client, mixer, user, published_category):
+    post = blend_post(mixer, user, published_category, "Пост")
+    sync_replica()
+    url = reverse("blog:post_detail", args=[post.pk])
+    response = user_client.post(
+        reverse("blog:add_comment", args=[post.pk]),
+        {"text": "Новый комментарий"})
+    assert PRIMARY_COOKIE in response.cookies
+    assert "Новый комментарий" in user_client.get(url).content.decode(), (
+        "Убедитесь, что после изменения автор читает данные из основной БД."
+    )
+    assert "Новый комментарий" not in (
+        another_user_client.get(url).content.decode())
+    sync_replica()
+    assert "Новый комментарий" in (
+        another_user_client.get(url).content.decode())
+
+
+def test_writes_go_to_primary():
+    with read_from("replica"):
+        assert router.db_for_read(Post) == "replica"
+        assert router.db_for_write(Post) == "default"
+        with transaction.atomic():
+            assert router.db_for_read(Post) == "default", (
+                "Убедитесь, что внутри транзакции чтение идёт из основной БД."
+            )
+    assert router.db_for_read(Post) == "default"
+
@@ -0,0 +1,78 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+import pytest
+from django.core.management import call_command
+from django.test import RequestFactory
+from django.utils import timezone
+
+from blog.cache import get_cached_page
+from blog.scheduler import post_became_visible, scheduler
+
+
+@pytest.fixture
+def scheduled_post(mixer, post_with_published_location):
+    return mixer.blend(
+        "blog.Post", is_published=True,
+        category=post_with_published_location.category,
+        pub_date=timezone.now() + timedelta(minutes=30))
+
+
+@pytest.mark.django_db
+def test_scheduler_knows_next_publication(
+        post_with_published_location, mixer,
+        django_capture_on_commit_callbacks):
+    assert scheduler.next_publication() is None
+    assert scheduler.limit_timeout(600) == 600
+
+    with django_capture_on_commit_callbacks(execute=True):
+        post = mixer.blend(
+            "blog.Post", is_published=True,
+            pub_date=timezone.now() + timedelta(seconds=90))
+    assert scheduler.next_publication() == post.pub_date, (
+        "Убедитесь, что дата ближайшей публикации обновляется при "
+        "сохранении поста."
+    )
+    assert 0 < scheduler.seconds_until_next() <= 91
+    assert scheduler.limit_timeout(600) <= 91
+
+
+@pytest.mark.django_db
+def test_scheduler_announces_published_posts(client, scheduled_post):
+    client.get("/")
+    received = []
+
+    def on_visible(sender, post, **kwargs):
+        received.append(post)
+
+    post_became_visible.connect(on_visible)
+    try:
+        assert scheduler.check() == []
+        later = scheduled_post.pub_date + timedelta(seconds=1)
+        with mock.patch("blog.scheduler.timezone.now", return_value=later):
+            assert scheduler.check() == [scheduled_post]
+            assert scheduler.check() == []
+    finally:
+        post_became_visible.disconnect(on_visible)
+    assert received == [scheduled_post], (
+        "Убедитесь, что для наступившей публикации ровно один раз "
+        "отправляется сигнал `post_became_visible`."
+    )
+
+
+@pytest.mark.django_db
+def test_publication_resets_cached_pages(
+        client, scheduled_post, django_capture_on_commit_callbacks):
+    client.get("/")
+    request = RequestFactory().get("/")
+    assert get_cached_page(request) is not None
+
+    later = scheduled_post.pub_date + timedelta(seconds=1)
+    with (mock.patch("blog.scheduler.timezone.now", return_value=later),
+          django_capture_on_commit_callbacks(execute=True)):
+        call_command("publish_scheduled", stdout=StringIO())
+    assert get_cached_page(request) is None, (
+        "Убедитесь, что наступление отложенной публикации сбрасывает "
+        "закешированные ленты."
+    )
@@ -0,0 +1,205 @@
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+from conftest import N_PER_PAGE
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.utils import timezone
+
+from blog.models import Comment, Post
+from blog.search import get_backend, search_comments
+from blog.search.analyzers import RussianAnalyzer
+
+
+@pytest.fixture
+def blend_post(mixer, user, published_category):
+    def blend(**kwargs):
+        fields = {
+            "author": user, "category": published_category,
+            "is_published": True,
+            "pub_date": timezone.now() - timedelta(days=1),
+            "title": "Заметка", "text": "Текст",
+        }
+        fields.update(kwargs)
+        return mixer.blend("blog.Post", **fields)
+    return blend
+
+
+def found_ids(client, query, **params):
+    response = client.get("/search/", {"q": query, **params})
+    assert response.status_code == 200
+    return [post.id for post in response.context["page_obj"]]
+
+
+@pytest.mark.django_db
+def test_search_ranks_title_matches_first(client, blend_post):
+    in_text = blend_post(text="Поход на Эльбрус летом")
+    in_title = blend_post(title="Эльбрус", text="Горы")
+    blend_post(title="Байкал", text="Озеро")
+    assert found_ids(client, "эльбрус") == [in_title.id, in_text.id], (
+        "Убедитесь, что поиск находит посты по заголовку и тексту, "
+        "а совпадения в заголовке идут первыми."
+    )
+
+
+@pytest.mark.django_db
+def test_search_respects_visibility(
+        client, blend_post, mixer, published_category):
+    visible = blend_post(text="Секретный пирог")
+    blend_post(text="Секретный пирог", is_published=False)
+    blend_post(text="Секретный пирог",
+               pub_date=timezone.now() + timedelta(days=1))
+    blend_post(text="Секретный пирог", category=mixer.blend(
+        "blog.Category", is_published=False))
+    assert found_ids(client, "пирог") == [visible.id], (
+        "Убедитесь, что поиск показывает только посты, видимые в ленте."
+    )
+
+
+@pytest.mark.django_db
+def test_index_follows_changes(client, blend_post):
+    post = blend_post(title="Клубника")
+    post.title = "Малина"
+    post.save()
+    assert found_ids(client, "клубника") == []
+    assert found_ids(client, "малина") == [post.id]
+    post.delete()
+    assert found_ids(client, "малина") == []
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("query", ['"', "AND OR", "*", "title:x", "NEAR("])
+def test_query_syntax_is_escaped(client, blend_post, query):
+    blend_post()
+    found_ids(client, query)
+
+
+@pytest.mark.django_db
+def test_search_pages_keep_query(client, blend_post):
+    for _ in range(N_PER_PAGE + 1):
+        blend_post(text="Солнце")
+    content = client.get("/search/", {"q": "солнце"}).content.decode()
+    assert "?q=%D1%81%D0%BE%D0%BB%D0%BD%D1%86%D0%B5&amp;page=2" in content, (
+        "Убедитесь, что ссылки на страницы результатов сохраняют запрос."
+    )
+    assert len(found_ids(client, "солнце", page=2)) == 1
+
+
+def test_russian_analyzer():
+    assert RussianAnalyzer().terms("Ёлки в горах и ГОРЫ, café") == [
+        "елк", "гор", "гор", "cafe"], (
+        "Убедитесь, что анализатор приводит слова к основам, заменяет «ё» "
+        "на «е», убирает диакритику и служебные слова."
+    )
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("query", ["горах", "ГОРАМИ", "на горе"])
+def test_search_matches_word_forms(client, blend_post, query):
+    post = blend_post(text="Поход в горы")
+    blend_post(text="Поход на озеро")
+    assert found_ids(client, query) == [post.id], (
+        "Убедитесь, что поиск находит другие формы слова "
+        "и не учитывает служебные слова."
+    )
+
+
+@pytest.mark.django_db
+def test_search_folds_yo(client, blend_post):
+    post = blend_post(title="Ёжик в тумане")
+    assert found_ids(client, "ежик") == [post.id]
+    assert found_ids(client, "ёжики") == [post.id]
+
+
+def term_stats(table):
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT term, docs FROM {table}_terms WHERE docs > 0")
+        return dict(cursor.fetchall())
+
+
+@pytest.mark.django_db
+def test_term_stats_follow_changes(blend_post, mixer):
+    post = blend_post(title="Горы", text="Горы и реки")
+    blend_post(title="Реки")
+    mixer.blend("blog.Comment", post=post, text="Красивые горы")
+    post.title = "Озёра"
+    post.save()
+    assert term_stats("blog_post_search") == {
+        "": 2, "озер": 1, "гор": 1, "рек": 2, "текст": 1}
+    incremental = [term_stats(table) for table in (
+        "blog_post_search", "blog_comment_search")]
+    get_backend().rebuild()
+    assert incremental == [term_stats(table) for table in (
+        "blog_post_search", "blog_comment_search")], (
+        "Убедитесь, что статистика терминов при сохранении постов и "
+        "комментариев совпадает с построенной заново."
+    )
+
+
+@pytest.mark.django_db
+def test_broad_query_is_ordered_by_date(client, blend_post, monkeypatch):
+    monkeypatch.setattr("blog.search.backends.SEARCH_RANK_MAX_DOCS", 1)
+    older = blend_post(title="Эльбрус",
+                       pub_date=timezone.now() - timedelta(days=2))
+    newer = blend_post(text="Поход на Эльбрус")
+    assert found_ids(client, "эльбрус") == [newer.id, older.id], (
+        "Убедитесь, что слишком частые запросы упорядочиваются по дате."
+    )
+
+
+def indexed_comment_ids():
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT rowid FROM blog_comment_search")
+        return {row[0] for row in cursor.fetchall()}
+
+
+@pytest.mark.django_db
+def test_comments_are_indexed(mixer, blend_post):
+    post = blend_post()
+    comment = mixer.blend("blog.Comment", post=post, text="Отличный рецепт")
+    mixer.blend("blog.Comment", post=post, text="Спасибо")
+    assert list(search_comments(Comment.objects.all(), "рецепт")) == [
+        comment]
+    post.delete()
+    assert indexed_comment_ids() == set(), (
+        "Убедитесь, что комментарии удалённого поста убираются из индекса."
+    )
+
+
+@pytest.mark.django_db
+@override_settings(
+    BLOG_SEARCH_BACKEND="blog.search.backends.DatabaseSearchBackend")
+def test_database_backend(client, blend_post):
+    # LIKE в SQLite не различает регистр только у латиницы.
+    post = blend_post(text="горный велосипед")
+    blend_post(text="велосипед")
+    assert found_ids(client, "горный велосипед") == [post.id]
+
+
+@pytest.mark.django_db
+def test_rebuild_search_index(client, blend_post, user, published_category):
+    Post.objects.bulk_create([Post(
+        title="Массовая загрузка", text="Текст", author=user,
+        category=published_category, pub_date=timezone.now())])
+    assert found_ids(client, "массовая") == []
+    call_command("rebuild_search_index", stdout=StringIO())
+    assert len(found_ids(client, "массовая")) == 1
+
+
+@pytest.mark.django_db
+def test_search_page_is_not_cached(client, rf, blend_post):
+    from django.core.cache import cache
+
+    from blog.cache import page_cache_key
+
+    blend_post(title="Эльбрус")
+    keys = []
+    for query in ("эльбрус", "эльбрус " * 100):
+        found_ids(client, query)
+        keys.append(page_cache_key(rf.get("/search/", {"q": query})))
+    assert not cache.get_many(keys), (
+        "Убедитесь, что страницы поиска не кешируются: иначе каждый "
+        "новый запрос занимает место в кеше."
+    )
@@ -0,0 +1,53 @@
+import pytest
+from django.db import connections
+
+from blogicum import settings_production
+
+
+@pytest.mark.django_db
+def test_production_sqlite_pragmas(tmp_path):
+    settings_dict = {
+        **settings_production.DATABASES["default"],
+        "NAME": tmp_path / "db.sqlite3",
+    }
+    connection = connections.create_connection("default")
+    connection.settings_dict = connections.configure_settings(
+        {"default": settings_dict})["default"]
+    try:
+        with connection.cursor() as cursor:
+            pragmas = {}
+            for name in ("journal_mode", "synchronous", "busy_timeout"):
+                cursor.execute(f"PRAGMA {name}")
+                pragmas[name] = cursor.fetchone()[0]
+    finally:
+        connection.close()
+    assert pragmas == {
+        "journal_mode": "wal", "synchronous": 1, "busy_timeout": 20000}, (
+        "Убедитесь, что settings_production включает WAL, "
+        "synchronous=NORMAL и ожидание блокировки."
+    )
+    assert settings_dict["CONN_MAX_AGE"], (
+        "Убедитесь, что в settings_production соединения переиспользуются."
+    )
+
+
+def test_production_replica_is_read_only():
+    replica = settings_production.DATABASES["replica"]
+    assert "transaction_mode" not in replica["OPTIONS"], (
+        "Убедитесь, что транзакции чтения из реплики не берут блокировку "
+        "записи."
+    )
+    init_command = replica["OPTIONS"]["init_command"]
+    assert "query_only=ON" in init_command
+    assert "journal_mode" not in init_command
+
+
+def test_production_cache_is_shared_and_not_in_database():
+    from django.test import override_settings
+
+    from blog.checks import check_shared_cache
+
+    with override_settings(CACHES=settings_production.CACHES):
+        assert check_shared_cache(None) == [], (
+            "Убедитесь, что settings_production задаёт общий кеш вне БД."
+        )
@@ -0,0 +1,142 @@
+import hashlib
+from io import StringIO
+
+import pytest
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.management import call_command
+from test_renditions import image_file
+
+from blog.jobs import run_pending
+from blog.models import Post
+from blog.storage import post_image_storage
+
+
+@pytest.fixture
+def storage():
+    return post_image_storage()
+
+
+def blend_posts_with_image(mixer, post, n, image):
+    return mixer.cycle(n).blend(
+        "blog.Post", author=post.author, category=post.category,
+        image=image)
+
+
+@pytest.mark.django_db
+def test_same_upload_is_stored_once(
+        mixer, storage, post_with_published_location):
+    first, second = blend_posts_with_image(
+        mixer, post_with_published_location, 2, image_file((300, 200)))
+    assert first.image.name == second.image.name, (
+        "Убедитесь, что одинаковые изображения сохраняются в один файл."
+    )
+    with storage.open(first.image.name) as file:
+        digest = hashlib.sha256(file.read()).hexdigest()
+    assert first.image.name == f"post_images/{digest}.jpg"
+    assert len(storage.listdir("post_images")[1]) == 2, (
+        "Убедитесь, что рядом с изображениями не остаётся временных файлов."
+    )
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures("no_release_grace")
+def test_shared_image_is_deleted_with_last_post(
+        mixer, storage, post_with_published_location,
+        django_capture_on_commit_callbacks):
+    first, second = blend_posts_with_image(
+        mixer, post_with_published_location, 2, image_file((800, 600)))
+    run_pending()
+    second.refresh_from_db()
+    names = {second.image.name} | {
+        name for key in ("webp", "fallback")
+        for name, _ in second.image_renditions[key]
+    }
+
+    with django_capture_on_commit_callbacks(execute=True):
+        Post.objects.get(pk=first.pk).delete()
+    assert all(storage.exists(name) for name in names), (
+        "Убедитесь, что изображение другого поста не удаляется."
+    )
+    with django_capture_on_commit_callbacks(execute=True):
+        second.delete()
+    assert not any(storage.exists(name) for name in names), (
+        "Убедитесь, что изображение удаляется вместе с последним постом."
+    )
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures("no_release_grace")
+def test_replaced_image_is_deleted(
+        storage, post_with_published_location,
+        django_capture_on_commit_callbacks):
+    post = post_with_published_location
+    old_name = post.image.name
+    post.image = image_file((50, 50))
+    with django_capture_on_commit_callbacks(execute=True):
+        post.save()
+    assert not storage.exists(old_name)
+    assert storage.exists(post.image.name)
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures("no_release_grace")
+def test_dedupe_media(mixer, storage, post_with_published_location,
+                      django_capture_on_commit_callbacks):
+    # Файлы, загруженные до хранилища по содержимому.
+    legacy_storage = FileSystemStorage(location=storage.location)
+    data = image_file((40, 40)).read()
+    old_names = [
+        legacy_storage.save(
+            f"post_images/image_{number}.gif", ContentFile(data))
+        for number in range(3)
+    ]
+    for name, post in zip(old_names, blend_posts_with_image(
+            mixer, post_with_published_location, 3, None)):
+        Post.objects.filter(pk=post.pk).update(image=name)
+    legacy_storage.save("post_images/orphan.gif", ContentFile(b"orphan"))
+
+    out = StringIO()
+    with django_capture_on_commit_callbacks(execute=True):
+        call_command("dedupe_media", "--delete-orphans", stdout=out)
+    assert "Перенесено файлов: 3, уникальных: 1" in out.getvalue()
+    assert Post.objects.filter(
+        image=f"post_images/{hashlib.sha256(data).hexdigest()}.gif"
+    ).count() == 3
+    assert not any(storage.exists(name) for name in old_names)
+    assert not storage.exists("post_images/orphan.gif")
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures("no_release_grace")
+def test_file_shared_as_rendition_is_kept(
+        mixer, storage, post_with_published_location,
+        django_capture_on_commit_callbacks):
+    post, other = blend_posts_with_image(
+        mixer, post_with_published_location, 2, image_file((800, 600)))
+    run_pending()
+    post.refresh_from_db()
+    # Копия изображения поста другой пост использует как своё изображение.
+    rendition = post.image_renditions["fallback"][0][0]
+    Post.objects.filter(pk=other.pk).update(image=rendition)
+    with django_capture_on_commit_callbacks(execute=True):
+        post.delete()
+    assert storage.exists(rendition), (
+        "Убедитесь, что файл, на который ссылается другой пост, "
+        "не удаляется."
+    )
+
+
+@pytest.mark.django_db
+def test_recently_written_file_is_kept(
+        storage, post_with_published_location,
+        django_capture_on_commit_callbacks):
+    post = post_with_published_location
+    old_name = post.image.name
+    post.image = image_file((50, 50))
+    with django_capture_on_commit_callbacks(execute=True):
+        post.save()
+    assert storage.exists(old_name), (
+        "Убедитесь, что недавно записанный файл не удаляется: его мог "
+        "получить пост, который ещё не сохранён."
+    )
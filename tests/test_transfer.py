@@ -0,0 +1,125 @@
+import json
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+from django.core.management import CommandError, call_command
+from django.utils import timezone
+
+from blog.models import Category, Comment, Post
+from blog.search import search_posts
+from blog.transfer import IdMap
+
+
+def write_lines(path, records):
+    path.write_text("\n".join(
+        json.dumps(record, ensure_ascii=False) for record in records))
+
+
+def import_blog(path, **options):
+    out = StringIO()
+    call_command("import_blog", str(path), stdout=out, **options)
+    return out.getvalue()
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("batch_size", [1, 1000])
+def test_export_and_import(
+        tmp_path, mixer, user, published_category, published_location,
+        batch_size):
+    created_at = timezone.now() - timedelta(days=30)
+    post = mixer.blend(
+        "blog.Post", author=user, category=published_category,
+        location=published_location, title="Горы", text="Поход в горы",
+        is_published=True, pub_date=timezone.now() - timedelta(days=1))
+    mixer.blend("blog.Comment", post=post, author=user)
+    Post.objects.filter(pk=post.pk).update(created_at=created_at)
+    path = tmp_path / "blog.jsonl"
+    call_command("export_blog", output=str(path), stderr=StringIO())
+    assert len(path.read_text().splitlines()) == 4
+
+    import_blog(path, batch_size=batch_size)
+    assert Category.objects.count() == 1, (
+        "Убедитесь, что категории сопоставляются по slug."
+    )
+    copy = Post.objects.exclude(pk=post.pk).get()
+    assert (copy.title, copy.author, copy.category, copy.location) == (
+        post.title, user, published_category, published_location)
+    assert copy.created_at == created_at, (
+        "Убедитесь, что загрузка сохраняет created_at из файла."
+    )
+    assert copy.comment_count == 1, (
+        "Убедитесь, что после загрузки пересчитываются счётчики "
+        "комментариев."
+    )
+    assert Comment.objects.filter(post=copy).count() == 1
+    assert set(search_posts(Post.objects.all(), "горах")) == {post, copy}, (
+        "Убедитесь, что загруженные посты попадают в поисковый индекс."
+    )
+
+
+@pytest.mark.django_db
+def test_import_dumpdata_with_users_last(tmp_path):
+    fields = {"title": "Пост", "text": "Текст", "is_published": True,
+              "pub_date": "2024-01-01T00:00:00Z", "author": 7}
+    write_lines(tmp_path / "dump.jsonl", [
+        {"model": "blog.post", "pk": 1, "fields": fields},
+        {"model": "admin.logentry", "pk": 1, "fields": {}},
+        {"model": "auth.user", "pk": 7, "fields": {
+            "username": "anton", "password": "", "is_staff": True}},
+    ])
+    out = import_blog(tmp_path / "dump.jsonl")
+    post = Post.objects.get()
+    assert post.author.username == "anton"
+    assert not post.author.is_staff, (
+        "Убедитесь, что права пользователей из файла не переносятся."
+    )
+    assert "admin.logentry: пропущено 1" in out
+
+
+@pytest.mark.django_db
+def test_import_reports_missing_reference(tmp_path):
+    write_lines(tmp_path / "broken.jsonl", [{
+        "model": "blog.comment", "pk": 1,
+        "fields": {"text": "Текст", "post": 404, "author": ["anton"]},
+    }])
+    with pytest.raises(CommandError, match="blog.post 404"):
+        import_blog(tmp_path / "broken.jsonl")
+
+
+@pytest.mark.django_db
+def test_import_matches_locations_by_name_and_pk(tmp_path, mixer):
+    first, second = mixer.cycle(2).blend("blog.Location", name="Москва")
+    post_fields = {"title": "Пост", "text": "Текст", "is_published": True,
+                   "pub_date": "2024-01-01T00:00:00Z", "author": ["anton"]}
+    write_lines(tmp_path / "blog.jsonl", [
+        {"model": "blog.location", "pk": second.pk,
+         "fields": {"name": "Москва", "is_published": True}},
+        {"model": "blog.post", "pk": 1,
+         "fields": {**post_fields, "location": second.pk}},
+    ])
+    import_blog(tmp_path / "blog.jsonl")
+    assert Post.objects.get().location == second, (
+        "Убедитесь, что из местоположений с одним именем выбирается то, "
+        "чей pk совпадает с pk в файле."
+    )
+
+    write_lines(tmp_path / "other.jsonl", [
+        {"model": "blog.location", "pk": 404,
+         "fields": {"name": "Москва", "is_published": True}},
+    ])
+    with pytest.raises(CommandError, match="blog.location 404"):
+        import_blog(tmp_path / "other.jsonl")
+
+
+def test_id_map():
+    ids = IdMap()
+    for source, target in [(1, 10), (2, 11), (3, 12), (7, 13), (5, 20)]:
+        ids[source] = target
+    assert [ids[source] for source in (1, 2, 3, 5, 7)] == [
+        10, 11, 12, 20, 13]
+    assert len(ids.starts) == 2, (
+        "Убедитесь, что подряд идущие pk хранятся одним отрезком."
+    )
+    with pytest.raises(KeyError):
+        ids[4]
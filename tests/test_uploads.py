@@ -0,0 +1,119 @@
+from io import BytesIO
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from django.utils import timezone
+from PIL import Image
+
+from blog.models import Post
+
+
+def png_upload(size=(100, 100), name="photo.png"):
+    buffer = BytesIO()
+    Image.new("RGB", size).save(buffer, format="PNG")
+    return SimpleUploadedFile(name, buffer.getvalue(), "image/png")
+
+
+def create_post(client, category, image):
+    return client.post("/posts/create/", {
+        "title": "Пост",
+        "text": "Текст",
+        "pub_date": timezone.now().strftime("%Y-%m-%d %H:%M"),
+        "category": category.id,
+        "image": image,
+    })
+
+
+def image_errors(response):
+    return response.context["form"].errors.get("image", [])
+
+
+@pytest.mark.django_db
+def test_image_upload_is_accepted(user_client, published_category):
+    response = create_post(user_client, published_category, png_upload())
+    assert response.status_code == 302
+    assert Post.objects.get().image.name.endswith(".png")
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(("upload", "message"), [
+    (SimpleUploadedFile("doc.txt", b"not an image" * 10), "JPEG, PNG"),
+    (SimpleUploadedFile("fake.png", b"\x89PNG\r\n\x1a\n" + b"0" * 100),
+     "JPEG, PNG"),
+    (SimpleUploadedFile("empty.png", b""), "JPEG, PNG"),
+], ids=["text", "broken-header", "empty"])
+def test_not_an_image_is_rejected(
+        user_client, published_category, upload, message):
+    response = create_post(user_client, published_category, upload)
+    assert response.status_code == 200
+    assert any(message in error for error in image_errors(response)), (
+        "Убедитесь, что файл, который не является изображением, "
+        "отклоняется с понятной ошибкой."
+    )
+    assert not Post.objects.exists()
+
+
+@pytest.mark.django_db
+@override_settings(BLOG_IMAGE_MAX_SIZE=2 * 1024 * 1024)
+def test_oversized_upload_is_rejected(user_client, published_category):
+    payload = b"\xff\xd8\xff" + b"0" * (3 * 1024 * 1024)
+    response = create_post(
+        user_client, published_category,
+        SimpleUploadedFile("big.jpg", payload, "image/jpeg"))
+    assert image_errors(response) == ["Файл больше 2 МБ."]
+    assert not Post.objects.exists()
+
+
+@pytest.mark.django_db
+@override_settings(BLOG_IMAGE_MAX_PIXELS=1_000_000)
+def test_decompression_bomb_is_rejected(user_client, published_category):
+    response = create_post(
+        user_client, published_category, png_upload((2000, 1000)))
+    assert image_errors(response) == ["Изображение больше 1 мегапикселей."]
+    assert not Post.objects.exists()
+
+
+@pytest.mark.django_db
+def test_rejected_image_keeps_current_one(
+        user_client, post_with_published_location):
+    post = post_with_published_location
+    image_name = post.image.name
+    response = user_client.post(f"/posts/{post.id}/edit/", {
+        "title": post.title,
+        "text": post.text,
+        "pub_date": post.pub_date.strftime("%Y-%m-%d %H:%M"),
+        "category": post.category_id,
+        "image": SimpleUploadedFile("doc.txt", b"text"),
+    })
+    assert image_errors(response)
+    post.refresh_from_db()
+    assert post.image.name == image_name
+
+
+@pytest.mark.django_db
+def test_upload_handler_is_limited_to_post_forms(
+        client, user, published_category):
+    from django.conf import settings
+
+    assert "blog.uploads.ImageUploadHandler" not in (
+        settings.FILE_UPLOAD_HANDLERS), (
+        "Убедитесь, что ImageUploadHandler ставится только страницам "
+        "создания и редактирования поста."
+    )
+    client.force_login(user)
+    client.handler.enforce_csrf_checks = True
+    response = create_post(client, published_category, png_upload())
+    assert response.status_code == 403, (
+        "Убедитесь, что страница создания поста проверяет CSRF-токен."
+    )
+
+    client.get("/posts/create/")
+    response = client.post("/posts/create/", {
+        "title": "Пост", "text": "Текст",
+        "pub_date": timezone.now().strftime("%Y-%m-%d %H:%M"),
+        "category": published_category.id, "image": png_upload(),
+        "csrfmiddlewaretoken": client.cookies["csrftoken"].value,
+    })
+    assert response.status_code == 302
+    assert Post.objects.get().image